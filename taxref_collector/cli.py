@@ -0,0 +1,426 @@
+#! python3  # noqa: E265
+
+"""
+    Command line resolution of the TAXREF names of a CSV file or of a GeoPackage
+    table, without QGIS.
+
+    .. code-block:: bash
+
+        # CSV: written to observations_taxref.csv, unless --output is given
+        python -m taxref_collector.cli gbif observations.csv --field gbif_id
+        # GeoPackage: the table is updated, or a copy if --output is given
+        python -m taxref_collector.cli name observations.gpkg --layer observations \\
+            --name-field scientific_name --rank-field rank --taxref TAXREFv17.txt
+"""
+
+# standard
+import argparse
+import csv
+import shutil
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Mapping, Optional
+
+# project
+from taxref_collector.__about__ import __title__, __version__
+from taxref_collector.core.cache import LookupCache
+from taxref_collector.core.gbif_related import gbif_key
+from taxref_collector.core.progress import ProgressMeter, format_duration
+from taxref_collector.core.ranks import (
+    RANK_PARENTS,
+    RANKS,
+    format_rank_parents,
+    parse_rank_parents,
+    record_name_key,
+)
+from taxref_collector.core.resolver import ClbResolver, GbifResolver
+from taxref_collector.core.taxref_store import TaxrefStore, taxref_values
+
+# ############################################################################
+# ########## Globals ###############
+# ##################################
+
+RESULT_COLUMNS: tuple = ("cd_nom", "taxref_name", "taxref_url")
+RESULT_TYPES: tuple = ("INTEGER", "TEXT", "TEXT")
+
+# seconds between two progress lines
+PROGRESS_INTERVAL = 0.5
+
+# ############################################################################
+# ########## Classes ###############
+# ##################################
+
+
+class CsvTable:
+    """CSV file, read as a stream of records and written to a new file.
+
+    :param path: CSV file, its delimiter is detected
+    :type path: Path
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, newline="", encoding="utf-8-sig") as csv_file:
+            sample = csv_file.read(65536)
+        try:
+            self.dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+        except csv.Error:
+            self.dialect = csv.excel
+        self.fieldnames = next(csv.reader(sample.splitlines(), self.dialect), [])
+
+    def fields(self) -> List[str]:
+        return list(self.fieldnames)
+
+    def records(self, columns: Iterable[str] = None) -> Iterator[Mapping]:
+        with open(self.path, newline="", encoding="utf-8-sig") as csv_file:
+            yield from csv.DictReader(csv_file, dialect=self.dialect)
+
+    def write(self, values_function: Callable, output: Path) -> int:
+        """Copy the records to output, with the values of their taxon.
+
+        :param values_function: returns the (cd_nom, taxref_name, taxref_url) \
+        values of a record, or None
+        :type values_function: Callable
+        :param output: CSV file to write
+        :type output: Path
+
+        :return: number of records with values
+        :rtype: int
+        """
+        fieldnames = self.fieldnames + [
+            column for column in RESULT_COLUMNS if column not in self.fieldnames
+        ]
+        written = 0
+        with open(output, "w", newline="", encoding="utf-8") as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames, dialect=self.dialect)
+            writer.writeheader()
+            for record in self.records():
+                values = values_function(record)
+                if values is not None:
+                    record.update(zip(RESULT_COLUMNS, values))
+                    written += 1
+                writer.writerow(record)
+        return written
+
+
+class GpkgTable:
+    """Table of a GeoPackage, updated in place.
+
+    :param path: GeoPackage file
+    :type path: Path
+    :param layer: table name, defaults to the first table of the GeoPackage
+    :type layer: str, optional
+    """
+
+    def __init__(self, path: Path, layer: str = None):
+        self.connection = sqlite3.connect(str(path))
+        self.connection.row_factory = sqlite3.Row
+        if layer is None:
+            row = self.connection.execute(
+                "SELECT table_name FROM gpkg_contents "
+                "WHERE data_type IN ('features', 'attributes') ORDER BY table_name"
+            ).fetchone()
+            if row is None:
+                raise ValueError("{} has no table".format(path))
+            layer = row[0]
+        self.layer = layer
+        self.columns = {
+            row["name"]: row["pk"]
+            for row in self.connection.execute(
+                "PRAGMA table_info({})".format(quote(layer))
+            )
+        }
+        if not self.columns:
+            raise ValueError("{} has no table {}".format(path, layer))
+        self.primary_key = next(
+            (name for name, pk in self.columns.items() if pk == 1), "rowid"
+        )
+
+    def fields(self) -> List[str]:
+        return list(self.columns)
+
+    def records(self, columns: Iterable[str] = None) -> Iterator[Mapping]:
+        columns = [self.primary_key] + list(columns or self.columns)
+        yield from self.connection.execute(
+            "SELECT {} FROM {}".format(
+                ", ".join(quote(column) for column in columns), quote(self.layer)
+            )
+        )
+
+    def write(self, values_function: Callable, columns: Iterable[str] = None) -> int:
+        """Update the records of the table with the values of their taxon, the
+        result columns are added if needed.
+
+        :param values_function: returns the (cd_nom, taxref_name, taxref_url) \
+        values of a record, or None
+        :type values_function: Callable
+        :param columns: columns read by values_function
+        :type columns: Iterable[str], optional
+
+        :return: number of records with values
+        :rtype: int
+        """
+        with self.connection:
+            for column, column_type in zip(RESULT_COLUMNS, RESULT_TYPES):
+                if column not in self.columns:
+                    self.connection.execute(
+                        "ALTER TABLE {} ADD COLUMN {} {}".format(
+                            quote(self.layer), quote(column), column_type
+                        )
+                    )
+                    self.columns[column] = 0
+            updates = []
+            for record in self.records(columns):
+                values = values_function(record)
+                if values is not None:
+                    updates.append((*values, record[self.primary_key]))
+            self.connection.executemany(
+                "UPDATE {} SET {} WHERE {} = ?".format(
+                    quote(self.layer),
+                    ", ".join("{} = ?".format(quote(c)) for c in RESULT_COLUMNS),
+                    quote(self.primary_key),
+                ),
+                updates,
+            )
+        return len(updates)
+
+    def close(self):
+        self.connection.close()
+
+
+# ############################################################################
+# ########## Functions #############
+# ##################################
+
+
+def quote(identifier: str) -> str:
+    """Quote an SQL identifier."""
+    return '"{}"'.format(identifier.replace('"', '""'))
+
+
+def open_store(path: Path) -> TaxrefStore:
+    """Open a TAXREF store database, or import a TAXREF release in memory.
+
+    :param path: store built by the plugin (.sqlite) or TAXREF release
+    :type path: Path
+
+    :return: local TAXREF
+    :rtype: TaxrefStore
+    """
+    if path.suffix.lower() in (".sqlite", ".db"):
+        return TaxrefStore(path)
+    store = TaxrefStore(":memory:")
+    store.import_release(path)
+    return store
+
+
+def progress_printer() -> Callable[[int, int], None]:
+    """Progress callback printing on stderr, with the throughput and the time \
+    left, at most every PROGRESS_INTERVAL.
+
+    :return: callback taking the number of keys done and of keys
+    :rtype: Callable[[int, int], None]
+    """
+    last = [0.0]
+    meter = ProgressMeter()
+
+    def print_progress(done: int, total: int):
+        now = time.monotonic()
+        if done < total and now - last[0] < PROGRESS_INTERVAL:
+            return
+        last[0] = now
+        stats = meter.update(done, total)
+        sys.stderr.write(
+            "\r{}/{} keys, {:.0f} keys/s, time left {}  ".format(
+                done, total, stats.rate, format_duration(stats.eta)
+            )
+        )
+        if done == total:
+            sys.stderr.write("\n")
+        sys.stderr.flush()
+
+    return print_progress
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m taxref_collector.cli",
+        description="Resolve the TAXREF names of a CSV file or of a GeoPackage "
+        "table, without QGIS.",
+    )
+    parser.add_argument(
+        "--version", action="version", version="{} {}".format(__title__, __version__)
+    )
+    sources = parser.add_subparsers(dest="source", required=True)
+    gbif = sources.add_parser("gbif", help="resolve GBIF taxon ids")
+    gbif.add_argument("--field", required=True, help="field of the GBIF ids")
+    name = sources.add_parser("name", help="resolve scientific names and ranks")
+    name.add_argument("--name-field", required=True, help="field of the names")
+    name.add_argument("--rank-field", required=True, help="field of the ranks")
+    name.add_argument(
+        "--taxref",
+        type=Path,
+        help="TAXREF release (TAXREFvXX.txt, ColDP export) or store (.sqlite) "
+        "looked up before ChecklistBank",
+    )
+    name.add_argument(
+        "--max-distance",
+        type=int,
+        default=2,
+        help="misspelled names are matched to the nearest name of the TAXREF "
+        "release at most this number of edits away, one per word, 0 for none (2)",
+    )
+    name.add_argument(
+        "--rank-fallback",
+        nargs="?",
+        const=format_rank_parents(RANK_PARENTS),
+        metavar="RANK>PARENT,...",
+        help="names without match take the taxon of their parent rank, e.g. "
+        "the genus of a species, with the default hierarchy or the given one, "
+        "whose parents are species or genus",
+    )
+    for source in (gbif, name):
+        source.add_argument("input", type=Path, help="CSV file or GeoPackage")
+        source.add_argument(
+            "--output",
+            type=Path,
+            help="output file, defaults to <input>_taxref.csv for a CSV file and "
+            "to the input itself for a GeoPackage",
+        )
+        source.add_argument("--layer", help="GeoPackage table")
+        source.add_argument("--cache", type=Path, help="lookup cache database")
+        source.add_argument(
+            "--workers", type=int, default=6, help="requests in flight (6)"
+        )
+        source.add_argument(
+            "--rps",
+            type=float,
+            default=10.0,
+            help="requests per second, 0 for no limit (10)",
+        )
+        source.add_argument(
+            "--retries", type=int, default=3, help="retries of a request (3)"
+        )
+        source.add_argument(
+            "--quiet", action="store_true", help="do not print the progress"
+        )
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the command line.
+
+    :param argv: arguments, defaults to sys.argv[1:]
+    :type argv: List[str], optional
+
+    :return: exit code, 1 if some keys could not be resolved
+    :rtype: int
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+
+    if args.input.suffix.lower() == ".gpkg":
+        path = args.input
+        if args.output is not None and args.output != args.input:
+            shutil.copyfile(args.input, args.output)
+            path = args.output
+        table = GpkgTable(path, args.layer)
+        output = path
+    else:
+        table = CsvTable(args.input)
+        output = args.output or args.input.with_name(args.input.stem + "_taxref.csv")
+
+    cache = LookupCache(args.cache) if args.cache else None
+    resolver_options = {
+        "cache": cache,
+        "workers": args.workers,
+        "requests_per_second": args.rps,
+        "max_retries": args.retries,
+    }
+    if args.source == "gbif":
+        columns = [args.field]
+
+        def key_function(record):
+            return gbif_key(record[args.field])
+
+        resolver = GbifResolver(**resolver_options)
+    else:
+        rank_columns = {field for field in table.fields() if field in RANKS}
+        columns = list(rank_columns | {args.name_field, args.rank_field})
+
+        def key_function(record):
+            return record_name_key(
+                record, args.name_field, args.rank_field, rank_columns
+            )
+
+        rank_parents = None
+        if args.rank_fallback is not None:
+            try:
+                rank_parents = parse_rank_parents(args.rank_fallback)
+            except ValueError as err:
+                parser.error(str(err))
+        store = open_store(args.taxref) if args.taxref else None
+        resolver = ClbResolver(
+            store=store,
+            max_distance=args.max_distance,
+            rank_parents=rank_parents,
+            **resolver_options,
+        )
+    missing = [column for column in columns if column not in table.fields()]
+    if missing:
+        parser.error("{} has no field {}".format(args.input, ", ".join(missing)))
+
+    results = resolver.resolve(
+        (key_function(record) for record in table.records(columns)),
+        on_progress=None if args.quiet else progress_printer(),
+    )
+
+    def values_function(record):
+        key = key_function(record)
+        result = results.get(key) if key is not None else None
+        return taxref_values(*result) if result is not None else None
+
+    if isinstance(table, GpkgTable):
+        written = table.write(values_function, columns=columns)
+        table.close()
+    else:
+        written = table.write(values_function, output)
+    if cache is not None:
+        cache.close()
+    if args.source == "name":
+        # misspelled names to check
+        for (name, rank), (taxref_name, distance) in sorted(
+            resolver.approximate.items()
+        ):
+            sys.stderr.write(
+                "approximate match: {} ({}) -> {}, distance {}\n".format(
+                    name, rank, taxref_name, distance
+                )
+            )
+
+    sys.stderr.write(
+        "{} keys: {} matched ({} at a parent rank), {} without match, {} failed; "
+        "{} requests, {} retries; {} records written to {} in {:.1f} s\n".format(
+            len(results) + len(resolver.failed),
+            sum(1 for result in results.values() if result is not None),
+            len(resolver.fallbacks),
+            sum(1 for result in results.values() if result is None),
+            len(resolver.failed),
+            resolver.requests,
+            resolver.retries,
+            written,
+            output,
+            time.perf_counter() - start,
+        )
+    )
+    return 1 if resolver.failed else 0
+
+
+# ############################################################################
+# ####### Stand-alone run ########
+# ################################
+if __name__ == "__main__":
+    sys.exit(main())
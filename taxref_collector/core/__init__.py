@@ -0,0 +1,27 @@
+#! python3  # noqa: E265
+from .cache import CacheEntry, LookupCache, LruCache  # noqa: F401
+from .jobs import JobState, JobTable  # noqa: F401
+from .journal import CheckpointJournal, run_id  # noqa: F401
+from .progress import ProgressMeter, ProgressStats, format_duration  # noqa: F401
+from .ranks import (  # noqa: F401
+    canonical_name,
+    effective_rank,
+    format_rank_parents,
+    name_key,
+    parent_key,
+    parse_rank_parents,
+    record_name_key,
+)
+from .resolution import (  # noqa: F401
+    ClbKeySource,
+    GbifKeySource,
+    KeyResolution,
+    KeySource,
+)
+from .resolver import ClbResolver, GbifResolver, Resolver  # noqa: F401
+from .taxref_store import (  # noqa: F401
+    TaxrefRecord,
+    TaxrefStore,
+    read_taxref_release,
+    taxref_values,
+)
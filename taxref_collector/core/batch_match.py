@@ -0,0 +1,140 @@
+#! python3  # noqa: E265
+
+"""
+    Batch name matching against a bulk endpoint, independent of the QGIS API.
+
+    ChecklistBank has no such endpoint: its name matching answers a GET per name,
+    and its bulk matching goes through file uploads and asynchronous jobs. The
+    bulk endpoint is set by the user, e.g. a matching service hosted next to a
+    TAXREF copy, and must follow this contract: it receives a JSON list of names
+    and answers a JSON list of ChecklistBank name usage matches::
+
+        POST [{"id": "0", "scientificName": "Quercus robur", "rank": "species"}, ...]
+        -> [{"original": {"id": "0"}, "type": "exact",
+             "usage": {"id": "116744", "label": "Quercus robur L.", "status": "accepted"}},
+            ...]
+
+    Matches are mapped back to the names by their input id, or by position when
+    the endpoint does not echo it. A name the reply does not answer is left out,
+    to be asked again rather than remembered without match.
+
+    The plugin holds batch mode back: it is not offered in its settings dialog.
+"""
+
+# standard
+import json
+import urllib.request
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# ############################################################################
+# ########## Globals ###############
+# ##################################
+
+# match types which cannot be used to fill the layer
+REJECTED_MATCH_TYPES: tuple = ("none", "ambiguous", "unsupported")
+ACCEPTED_STATUS: tuple = ("accepted", "provisionally accepted")
+
+# ############################################################################
+# ########## Functions #############
+# ##################################
+
+
+def iter_batches(keys: Iterable, size: int) -> Iterator[list]:
+    """Split keys into lists of at most size keys.
+
+    :param keys: keys to split
+    :type keys: Iterable
+    :param size: maximum size of a batch
+    :type size: int
+
+    :return: batches
+    :rtype: Iterator[list]
+    """
+    batch = []
+    for key in keys:
+        batch.append(key)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def build_batch_payload(keys: List[Tuple[str, str]]) -> bytes:
+    """Build the request body of a batch of (name, rank) keys.
+
+    :param keys: (name, rank) keys
+    :type keys: List[Tuple[str, str]]
+
+    :return: JSON body
+    :rtype: bytes
+    """
+    return json.dumps(
+        [
+            {"id": str(index), "scientificName": name, "rank": rank}
+            for index, (name, rank) in enumerate(keys)
+        ]
+    ).encode("utf-8")
+
+
+def parse_batch_response(
+    data: bytes, keys: List[Tuple[str, str]]
+) -> Dict[Tuple[str, str], Optional[Tuple[str, str]]]:
+    """Map the matches of a batch back to its keys.
+
+    :param data: JSON response body
+    :type data: bytes
+    :param keys: (name, rank) keys sent in the batch, in the same order
+    :type keys: List[Tuple[str, str]]
+
+    :return: (cd_nom, taxref_name) of each key answered, None when there is no \
+    usable match. Keys missing from the reply are left out.
+    :rtype: Dict[Tuple[str, str], Optional[Tuple[str, str]]]
+    """
+    matches = json.loads(data) if data else []
+    if isinstance(matches, dict):
+        matches = matches.get("result", [])
+
+    results = {}
+    for position, match in enumerate(matches):
+        index = (match.get("original") or {}).get("id", match.get("id", position))
+        try:
+            key = keys[int(index)]
+        except (IndexError, TypeError, ValueError):
+            continue
+        usage = match.get("usage")
+        if (
+            not usage
+            or match.get("type") in REJECTED_MATCH_TYPES
+            or usage.get("status", "accepted") not in ACCEPTED_STATUS
+        ):
+            results[key] = None
+            continue
+        results[key] = (str(usage["id"]), usage.get("label"))
+    return results
+
+
+def match_batch(
+    keys: List[Tuple[str, str]], url: str, timeout: int = 60
+) -> Dict[Tuple[str, str], Optional[Tuple[str, str]]]:
+    """Send one batch of keys to the bulk endpoint, without the Qt network stack.
+
+    :param keys: (name, rank) keys
+    :type keys: List[Tuple[str, str]]
+    :param url: bulk matching endpoint
+    :type url: str
+    :param timeout: request timeout in seconds
+    :type timeout: int, optional
+
+    :return: (cd_nom, taxref_name) of each key answered, None when there is no \
+    usable match, see parse_batch_response()
+    :rtype: Dict[Tuple[str, str], Optional[Tuple[str, str]]]
+    """
+    request = urllib.request.Request(
+        url,
+        data=build_batch_payload(keys),
+        headers={"Content-Type": "application/json", "Accept": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return parse_batch_response(response.read(), keys)
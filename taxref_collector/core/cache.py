@@ -0,0 +1,319 @@
+#! python3  # noqa: E265
+
+"""
+    Lookup caches of resolved names, independent of the QGIS API.
+"""
+
+# standard
+import sqlite3
+import time
+from collections import OrderedDict, namedtuple
+from pathlib import Path
+from typing import Callable, Optional, Tuple, Union
+
+# ############################################################################
+# ########## Globals ###############
+# ##################################
+
+DAY = 86400
+
+# cd_nom is None for a cached "no TAXREF match"
+CacheEntry = namedtuple("CacheEntry", ["cd_nom", "taxref_name"])
+
+# ############################################################################
+# ########## Classes ###############
+# ##################################
+
+
+class LookupCache:
+    """SQLite cache of resolved TAXREF names, keyed by source and lookup key.
+
+    Each entry expires after its own TTL: matches are kept for ``ttl`` seconds
+    and "no TAXREF match" answers for the shorter ``negative_ttl``. The database
+    is opened in WAL mode so that several QGIS instances can share it, and is
+    trimmed to ``max_entries`` rows, expired and oldest entries first.
+
+    :param path: database file, or ":memory:"
+    :type path: Union[Path, str]
+    :param ttl: lifetime of a match, in seconds. Defaults to 30 days.
+    :type ttl: int, optional
+    :param negative_ttl: lifetime of a "no match", in seconds. Defaults to 1 day.
+    :type negative_ttl: int, optional
+    :param max_entries: maximum number of rows kept. Defaults to 500 000.
+    :type max_entries: int, optional
+    :param commit_every: number of writes grouped in one transaction.
+    :type commit_every: int, optional
+    """
+
+    def __init__(
+        self,
+        path: Union[Path, str],
+        ttl: int = 30 * DAY,
+        negative_ttl: int = DAY,
+        max_entries: int = 500000,
+        commit_every: int = 500,
+    ):
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.commit_every = max(1, commit_every)
+        self._pending_writes = 0
+
+        # opened in the main thread, used by one resolution task at a time
+        self.connection = sqlite3.connect(
+            str(path), timeout=10, check_same_thread=False
+        )
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS lookup ("
+            "source TEXT NOT NULL, "
+            "key TEXT NOT NULL, "
+            "cd_nom TEXT, "
+            "taxref_name TEXT, "
+            "created_at REAL NOT NULL, "
+            "expires_at REAL NOT NULL, "
+            "PRIMARY KEY (source, key)"
+            ") WITHOUT ROWID"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS lookup_expires_at ON lookup (expires_at)"
+        )
+        self.connection.commit()
+
+    def get(self, source: str, key) -> Optional[CacheEntry]:
+        """Return the cached entry of a key.
+
+        :param source: lookup source, e.g. "gbif" or "clb"
+        :type source: str
+        :param key: lookup key, converted to str
+
+        :return: entry, with cd_nom None for a cached "no match", or None if the \
+        key is unknown or expired
+        :rtype: Optional[CacheEntry]
+        """
+        found = self.get_with_expiry(source, key)
+        return found[0] if found is not None else None
+
+    def get_with_expiry(self, source: str, key) -> Optional[Tuple[CacheEntry, float]]:
+        """Return the cached entry of a key with the time it expires at.
+
+        :param source: lookup source, e.g. "gbif" or "clb"
+        :type source: str
+        :param key: lookup key, converted to str
+
+        :return: entry and UNIX time it expires at, None if the key is unknown \
+        or expired
+        :rtype: Optional[Tuple[CacheEntry, float]]
+        """
+        row = self.connection.execute(
+            "SELECT cd_nom, taxref_name, expires_at FROM lookup "
+            "WHERE source = ? AND key = ? AND expires_at > ?",
+            (source, str(key), time.time()),
+        ).fetchone()
+        if row is None:
+            return None
+        return CacheEntry(*row[:2]), row[2]
+
+    def put(self, source: str, key, cd_nom=None, taxref_name=None):
+        """Store the result of a lookup. A None cd_nom stores a "no match" \
+        with the negative TTL.
+
+        :param source: lookup source, e.g. "gbif" or "clb"
+        :type source: str
+        :param key: lookup key, converted to str
+        :param cd_nom: TAXREF id, or None
+        :param taxref_name: TAXREF scientific name
+        """
+        now = time.time()
+        ttl = self.ttl if cd_nom is not None else self.negative_ttl
+        self.connection.execute(
+            "INSERT OR REPLACE INTO lookup VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                source,
+                str(key),
+                None if cd_nom is None else str(cd_nom),
+                taxref_name,
+                now,
+                now + ttl,
+            ),
+        )
+        self._pending_writes += 1
+        if self._pending_writes >= self.commit_every:
+            self.commit()
+
+    def commit(self):
+        """Write pending entries and trim the cache to its maximum size."""
+        self.evict()
+        self.connection.commit()
+        self._pending_writes = 0
+
+    def evict(self):
+        """Remove expired entries, then the oldest ones above max_entries."""
+        self.connection.execute(
+            "DELETE FROM lookup WHERE expires_at <= ?", (time.time(),)
+        )
+        (count,) = self.connection.execute("SELECT COUNT(*) FROM lookup").fetchone()
+        if count > self.max_entries:
+            self.connection.execute(
+                "DELETE FROM lookup WHERE (source, key) IN ("
+                "SELECT source, key FROM lookup ORDER BY created_at LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def clear(self):
+        """Remove every entry."""
+        self.connection.execute("DELETE FROM lookup")
+        self.connection.commit()
+        self._pending_writes = 0
+
+    def __len__(self) -> int:
+        (count,) = self.connection.execute("SELECT COUNT(*) FROM lookup").fetchone()
+        return count
+
+    def close(self):
+        """Commit pending entries and close the database."""
+        self.commit()
+        self.connection.close()
+
+
+class LruCache:
+    """In-memory least recently used cache of resolved TAXREF names.
+
+    It exposes the same get/put/commit interface as LookupCache and can sit in
+    front of one: a key missing from memory is read from the backend, and every
+    put is written to both. Each entry expires like in LookupCache, an entry
+    read from the backend when it does there.
+
+    :param maxsize: maximum number of entries kept in memory. Defaults to 100 000.
+    :type maxsize: int, optional
+    :param backend: persistent cache read on memory misses. Defaults to None.
+    :type backend: LookupCache, optional
+    :param ttl: lifetime of a match, in seconds. Defaults to 30 days.
+    :type ttl: int, optional
+    :param negative_ttl: lifetime of a "no match", in seconds. Defaults to 1 day.
+    :type negative_ttl: int, optional
+    :param clock: current UNIX time, in seconds
+    :type clock: Callable[[], float], optional
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 100000,
+        backend: LookupCache = None,
+        ttl: int = 30 * DAY,
+        negative_ttl: int = DAY,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.backend = backend
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        # (source, key) -> (entry, expires_at), least recently used first
+        self._entries = OrderedDict()
+        self.maxsize = maxsize
+
+        self.hits = 0
+        self.backend_hits = 0
+        self.misses = 0
+
+    @property
+    def maxsize(self) -> int:
+        return self._maxsize
+
+    @maxsize.setter
+    def maxsize(self, maxsize: int):
+        self._maxsize = max(1, maxsize)
+        self._trim()
+
+    @property
+    def hit_ratio(self) -> float:
+        """Share of lookups answered without a network request."""
+        total = self.hits + self.backend_hits + self.misses
+        return (self.hits + self.backend_hits) / total if total else 0.0
+
+    def get(self, source: str, key) -> Optional[CacheEntry]:
+        """Return the cached entry of a key, from memory or from the backend.
+
+        :param source: lookup source, e.g. "gbif" or "clb"
+        :type source: str
+        :param key: lookup key, converted to str
+
+        :return: entry, with cd_nom None for a cached "no match", or None if the \
+        key is unknown or expired
+        :rtype: Optional[CacheEntry]
+        """
+        cache_key = (source, str(key))
+        found = self._entries.get(cache_key)
+        if found is not None:
+            entry, expires_at = found
+            if expires_at > self.clock():
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                return entry
+            del self._entries[cache_key]
+        if self.backend is not None:
+            found = self.backend.get_with_expiry(source, key)
+            if found is not None:
+                self.backend_hits += 1
+                self._store(cache_key, *found)
+                return found[0]
+        self.misses += 1
+        return None
+
+    def put(self, source: str, key, cd_nom=None, taxref_name=None):
+        """Store the result of a lookup in memory and in the backend.
+
+        :param source: lookup source, e.g. "gbif" or "clb"
+        :type source: str
+        :param key: lookup key, converted to str
+        :param cd_nom: TAXREF id, or None for a "no match"
+        :param taxref_name: TAXREF scientific name
+        """
+        ttl = self.ttl if cd_nom is not None else self.negative_ttl
+        self._store(
+            (source, str(key)),
+            CacheEntry(None if cd_nom is None else str(cd_nom), taxref_name),
+            self.clock() + ttl,
+        )
+        if self.backend is not None:
+            self.backend.put(source, key, cd_nom, taxref_name)
+
+    def _store(self, cache_key: tuple, entry: CacheEntry, expires_at: float):
+        self._entries[cache_key] = (entry, expires_at)
+        self._entries.move_to_end(cache_key)
+        self._trim()
+
+    def _trim(self):
+        while len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+
+    def commit(self):
+        """Commit the backend pending entries."""
+        if self.backend is not None:
+            self.backend.commit()
+
+    def clear(self):
+        """Empty the memory and reset the counters. The backend is kept."""
+        self._entries.clear()
+        self.hits = self.backend_hits = self.misses = 0
+
+    def stats(self) -> dict:
+        """Return the cache counters, useful to size it.
+
+        :return: size, maxsize, hits, backend_hits, misses and hit_ratio
+        :rtype: dict
+        """
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "backend_hits": self.backend_hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hit_ratio, 3),
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
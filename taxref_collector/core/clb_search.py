@@ -0,0 +1,91 @@
+#! python3  # noqa: E265
+
+"""
+    ChecklistBank name usage search of a single name, independent of the QGIS API.
+"""
+
+# standard
+import json
+from typing import Optional, Tuple
+from urllib.parse import quote, urlencode
+
+# ############################################################################
+# ########## Globals ###############
+# ##################################
+
+CLB_SEARCH_URL = "https://api.checklistbank.org/nameusage/search"
+
+# ChecklistBank dataset of TAXREF
+TAXREF_DATASET_KEY = 2008
+
+# facets of the historical query, computed by the server and never read
+LEGACY_FACETS: tuple = (
+    "datasetKey",
+    "rank",
+    "issue",
+    "status",
+    "nomStatus",
+    "nameType",
+    "field",
+    "authorship",
+    "authorshipYear",
+    "extinct",
+    "environment",
+    "origin",
+)
+
+# ############################################################################
+# ########## Functions #############
+# ##################################
+
+
+def build_search_url(
+    name: str, rank: str, lean: bool = True, url: str = CLB_SEARCH_URL
+) -> str:
+    """Build the search URL of an accepted TAXREF name at a rank.
+
+    The lean query matches the exact name, without facets, and asks for two
+    results: enough to tell a unique match from an ambiguous one. The legacy
+    query is the prefix search with facets used by the first versions.
+
+    :param name: scientific name
+    :type name: str
+    :param rank: rank, e.g. "species"
+    :type rank: str
+    :param lean: build the lean query, defaults to True
+    :type lean: bool, optional
+    :param url: search endpoint
+    :type url: str, optional
+
+    :return: URL
+    :rtype: str
+    """
+    params = [
+        ("content", "SCIENTIFIC_NAME"),
+        ("datasetKey", TAXREF_DATASET_KEY),
+        ("q", name),
+        ("rank", rank),
+        ("status", "accepted"),
+    ]
+    if lean:
+        params += [("type", "EXACT"), ("limit", 2)]
+    else:
+        params += [("facet", facet) for facet in LEGACY_FACETS]
+        params += [("type", "PREFIX"), ("limit", 50), ("offset", 0)]
+    return "{}?{}".format(url, urlencode(params, quote_via=quote))
+
+
+def parse_search_response(data: bytes) -> Optional[Tuple[str, str]]:
+    """Read the match of a search, used only when it is the single result.
+
+    :param data: JSON response body
+    :type data: bytes
+
+    :return: (cd_nom, taxref_name), None when there is no unique match
+    :rtype: Optional[Tuple[str, str]]
+    """
+    response = json.loads(data) if data else {}
+    if response.get("total") != 1 or not response.get("result"):
+        return None
+    match = response["result"][0]
+    return str(match["id"]), match["usage"]["label"]
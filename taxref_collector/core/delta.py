@@ -0,0 +1,94 @@
+#! python3  # noqa: E265
+
+"""
+    Fingerprints of the key fields of the features, to resolve only the features
+    changed since the last run. Independent of the QGIS API.
+"""
+
+# standard
+from typing import Iterable, List
+
+# ############################################################################
+# ########## Globals ###############
+# ##################################
+
+# field holding the fingerprint of the key fields a result was resolved from
+FINGERPRINT_FIELD = "taxref_key"
+FINGERPRINT_SEPARATOR = "|"
+# stands for a NULL key field, which would make the whole concatenation NULL
+FINGERPRINT_NULL = "<null>"
+
+# ############################################################################
+# ########## Functions #############
+# ##################################
+
+
+def quote_column(name: str) -> str:
+    """Quote a field name in a QGIS expression."""
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+def is_null(value) -> bool:
+    """Tell if a field value is NULL: None, or a NULL QVariant."""
+    if value is None:
+        return True
+    is_null_method = getattr(value, "isNull", None)
+    return callable(is_null_method) and is_null_method()
+
+
+def fingerprint(values: Iterable) -> str:
+    """Fingerprint of the key fields of a feature, the same string as the one
+    built by fingerprint_expression() from the field values.
+
+    :param values: values of the key fields, in the order of their names
+    :type values: Iterable
+
+    :return: values joined by FINGERPRINT_SEPARATOR, FINGERPRINT_NULL for NULL
+    :rtype: str
+    """
+    parts = []
+    for value in values:
+        if is_null(value):
+            value = FINGERPRINT_NULL
+        elif isinstance(value, float) and value.is_integer():
+            # integral ids stored as reals, e.g. GBIF ids read from a CSV
+            value = int(value)
+        parts.append(str(value))
+    return FINGERPRINT_SEPARATOR.join(parts)
+
+
+def fingerprint_expression(field_names: List[str]) -> str:
+    """Expression building the fingerprint of the key fields of a feature.
+
+    Only coalesce() and the concatenation operator are used, so that providers
+    compiling expressions to SQL evaluate it on their side.
+
+    :param field_names: key fields
+    :type field_names: List[str]
+
+    :return: QGIS expression
+    :rtype: str
+    """
+    expression = " || '{}' || ".format(FINGERPRINT_SEPARATOR).join(
+        "coalesce({}, '{}')".format(quote_column(name), FINGERPRINT_NULL)
+        for name in field_names
+    )
+    if len(field_names) == 1:
+        # a single numeric field is converted to text
+        expression += " || ''"
+    return expression
+
+
+def changed_filter(field_names: List[str]) -> str:
+    """Filter expression of the features never resolved, or whose key fields
+    changed since they were.
+
+    :param field_names: key fields
+    :type field_names: List[str]
+
+    :return: QGIS expression
+    :rtype: str
+    """
+    return "{0} IS NULL OR {0} <> ({1})".format(
+        quote_column(FINGERPRINT_FIELD), fingerprint_expression(field_names)
+    )
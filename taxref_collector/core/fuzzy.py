@@ -0,0 +1,102 @@
+#! python3  # noqa: E265
+
+"""
+    Approximate matching of misspelled scientific names, independent of the QGIS
+    API.
+"""
+
+# standard
+from typing import Iterator, List, Set, Tuple
+
+# ############################################################################
+# ########## Globals ###############
+# ##################################
+
+# shorter words, e.g. "sp." or "var.", are only matched exactly
+MIN_WORD_LENGTH = 4
+# edits allowed in each word of a name, the most word_variants() finds for sure
+MAX_WORD_DISTANCE = 1
+
+# ############################################################################
+# ########## Functions #############
+# ##################################
+
+
+def word_variants(word: str) -> Set[str]:
+    """Variants of a word indexing it: the word and the words left by deleting
+    one of its letters.
+
+    Two words one edit apart, an insertion, a deletion, a substitution or a
+    transposition, always share a variant, so that the candidates of a misspelled
+    word are found by looking its own variants up. Words two edits apart are only
+    found by chance, hence MAX_WORD_DISTANCE.
+
+    :param word: lower-case word
+    :type word: str
+
+    :return: variants of the word
+    :rtype: Set[str]
+    """
+    if len(word) < MIN_WORD_LENGTH:
+        return {word}
+    return {word} | {word[:i] + word[i + 1 :] for i in range(len(word))}
+
+
+def edit_distance(first: str, second: str, max_distance: int) -> int:
+    """Number of insertions, deletions, substitutions and transpositions of \
+    adjacent letters turning a string into another one (optimal string alignment).
+
+    :param first: first string
+    :type first: str
+    :param second: second string
+    :type second: str
+    :param max_distance: distance above which the computation stops
+    :type max_distance: int
+
+    :return: distance, or max_distance + 1 if it is greater than max_distance
+    :rtype: int
+    """
+    if abs(len(first) - len(second)) > max_distance:
+        return max_distance + 1
+    before_previous_row = previous_row = None
+    row = list(range(len(second) + 1))
+    for i in range(1, len(first) + 1):
+        previous_row, row = row, [i] + [0] * len(second)
+        for j in range(1, len(second) + 1):
+            cost = first[i - 1] != second[j - 1]
+            row[j] = min(
+                row[j - 1] + 1, previous_row[j] + 1, previous_row[j - 1] + cost
+            )
+            if (
+                i > 1
+                and j > 1
+                and first[i - 1] == second[j - 2]
+                and first[i - 2] == second[j - 1]
+            ):
+                row[j] = min(row[j], before_previous_row[j - 2] + 1)
+        if min(row) > max_distance:
+            return max_distance + 1
+        before_previous_row = previous_row
+    return min(row[-1], max_distance + 1)
+
+
+def combine_words(
+    candidates: List[List[Tuple[str, int]]], max_distance: int
+) -> Iterator[Tuple[List[str], int]]:
+    """Combine the candidates of each word of a name, within a total distance.
+
+    :param candidates: (word, distance) candidates of each word
+    :type candidates: List[List[Tuple[str, int]]]
+    :param max_distance: maximum sum of the distances of the words
+    :type max_distance: int
+
+    :return: (words, distance) combinations
+    :rtype: Iterator[Tuple[List[str], int]]
+    """
+    if not candidates:
+        yield [], 0
+        return
+    for words, distance in combine_words(candidates[1:], max_distance):
+        for word, word_distance in candidates[0]:
+            if distance + word_distance <= max_distance:
+                yield [word] + words, distance + word_distance
@@ -0,0 +1,118 @@
+#! python3  # noqa: E265
+
+"""
+    TAXREF usage related to a GBIF taxon, through the GBIF v1 API, independent
+    of the QGIS API.
+
+    GBIF links each taxon of its backbone to the usages of the same name in the
+    other checklists. The related usages are requested for the TAXREF checklist
+    only, page by page::
+
+        GET https://api.gbif.org/v1/species/2878688/related?datasetKey=...
+        -> {"offset": 0, "limit": 20, "endOfRecords": true,
+            "results": [{"taxonID": "116744", "scientificName": "Quercus robur L.",
+                         "taxonomicStatus": "ACCEPTED", ...}]}
+"""
+
+# standard
+import json
+from typing import Optional, Tuple
+from urllib.parse import urlencode
+
+# ############################################################################
+# ########## Globals ###############
+# ##################################
+
+GBIF_API_URL = "https://api.gbif.org/v1"
+
+# GBIF dataset of the TAXREF checklist
+GBIF_TAXREF_DATASET_KEY = "0e61f8fe-7d25-4f81-ada7-d970bbb2c6d6"
+
+RELATED_PAGE_SIZE = 20
+
+# ############################################################################
+# ########## Functions #############
+# ##################################
+
+
+def gbif_key(value):
+    """Normalize a GBIF taxon id read from a layer or a file.
+
+    :param value: id, e.g. 2878688, 2878688.0 or "2878688"
+
+    :return: id, as an integer when it is one, None if empty
+    """
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        try:
+            number = float(value)
+        except ValueError:
+            return value or None
+        value = number
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def build_related_url(
+    gbif_id,
+    offset: int = 0,
+    limit: int = RELATED_PAGE_SIZE,
+    dataset_key: str = GBIF_TAXREF_DATASET_KEY,
+    url: str = GBIF_API_URL,
+) -> str:
+    """Build the URL of a page of the TAXREF usages related to a GBIF taxon.
+
+    :param gbif_id: GBIF taxon key
+    :param offset: index of the first usage of the page
+    :type offset: int, optional
+    :param limit: size of a page
+    :type limit: int, optional
+    :param dataset_key: GBIF dataset of the checklist
+    :type dataset_key: str, optional
+    :param url: GBIF API root
+    :type url: str, optional
+
+    :return: URL
+    :rtype: str
+    """
+    return "{}/species/{}/related?{}".format(
+        url.rstrip("/"),
+        gbif_id,
+        urlencode({"datasetKey": dataset_key, "offset": offset, "limit": limit}),
+    )
+
+
+def parse_related_response(
+    data: bytes,
+) -> Tuple[Optional[Tuple[str, str]], bool, Optional[int]]:
+    """Read a page of related usages in a single pass.
+
+    :param data: JSON response body
+    :type data: bytes
+
+    :return: (cd_nom, taxref_name) of the first accepted usage of the page, or \
+    of its first usage if none is accepted, None if the page is empty; True if \
+    the usage is accepted; offset of the next page, None on the last page
+    :rtype: Tuple[Optional[Tuple[str, str]], bool, Optional[int]]
+    """
+    page = json.loads(data) if data else {}
+    results = page.get("results") or []
+    match = None
+    accepted = False
+    for usage in results:
+        if not usage.get("taxonID"):
+            continue
+        if usage.get("taxonomicStatus", "ACCEPTED").upper() == "ACCEPTED":
+            match = (str(usage["taxonID"]), usage.get("scientificName"))
+            accepted = True
+            break
+        if match is None:
+            match = (str(usage["taxonID"]), usage.get("scientificName"))
+
+    next_offset = None
+    if results and not page.get("endOfRecords", True):
+        next_offset = page.get("offset", 0) + len(results)
+    return match, accepted, next_offset
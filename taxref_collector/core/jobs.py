@@ -0,0 +1,125 @@
+#! python3  # noqa: E265
+
+"""
+    State of the lookup keys of a run, independent of the QGIS API.
+"""
+
+# standard
+from enum import Enum
+from typing import Hashable, List, Optional
+
+# ############################################################################
+# ########## Classes ###############
+# ##################################
+
+
+class JobState(Enum):
+    """State of a lookup key. A key is created PENDING and moves once, to
+    RESOLVED or FAILED."""
+
+    PENDING = "pending"
+    RESOLVED = "resolved"
+    FAILED = "failed"
+
+
+class JobTable:
+    """Lookup keys of a run, the features waiting for them and their results.
+
+    Every operation is O(1). A transition from a state other than PENDING, e.g.
+    a late or duplicate reply, is ignored so that each key is counted once.
+    """
+
+    def __init__(self):
+        self._states = {}
+        # pending key -> ids of the features sharing it
+        self._features = {}
+        # resolved key -> (cd_nom, taxref_name), or None if TAXREF has no match
+        self._results = {}
+        self._counts = {state: 0 for state in JobState}
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._states
+
+    @property
+    def pending(self) -> int:
+        return self._counts[JobState.PENDING]
+
+    @property
+    def resolved(self) -> int:
+        return self._counts[JobState.RESOLVED]
+
+    @property
+    def failed(self) -> int:
+        return self._counts[JobState.FAILED]
+
+    def state(self, key: Hashable) -> Optional[JobState]:
+        return self._states.get(key)
+
+    def result(self, key: Hashable) -> Optional[tuple]:
+        return self._results.get(key)
+
+    def add(self, key: Hashable, feature_id: int) -> Optional[JobState]:
+        """Attach a feature to its key, a new key is created PENDING.
+
+        :param key: lookup key
+        :type key: Hashable
+        :param feature_id: id of the feature
+        :type feature_id: int
+
+        :return: state of the key before the call, None if the key is new and \
+        must be resolved
+        :rtype: Optional[JobState]
+        """
+        state = self._states.get(key)
+        if state is None:
+            self._states[key] = JobState.PENDING
+            self._features[key] = [feature_id]
+            self._counts[JobState.PENDING] += 1
+        elif state is JobState.PENDING:
+            self._features[key].append(feature_id)
+        return state
+
+    def resolve(self, key: Hashable, result: Optional[tuple]) -> Optional[List[int]]:
+        """Move a key from PENDING to RESOLVED.
+
+        :param key: lookup key
+        :type key: Hashable
+        :param result: (cd_nom, taxref_name), or None if TAXREF has no match
+        :type result: Optional[tuple]
+
+        :return: ids of the features waiting for the key, None if the key was \
+        not pending
+        :rtype: Optional[List[int]]
+        """
+        if not self._leave_pending(key, JobState.RESOLVED):
+            return None
+        self._results[key] = result
+        return self._features.pop(key)
+
+    def fail(self, key: Hashable) -> bool:
+        """Move a key from PENDING to FAILED, its features are dropped.
+
+        :param key: lookup key
+        :type key: Hashable
+
+        :return: True if the key was pending
+        :rtype: bool
+        """
+        if not self._leave_pending(key, JobState.FAILED):
+            return False
+        del self._features[key]
+        return True
+
+    def _leave_pending(self, key: Hashable, state: JobState) -> bool:
+        if self._states.get(key) is not JobState.PENDING:
+            return False
+        self._states[key] = state
+        self._counts[JobState.PENDING] -= 1
+        self._counts[state] += 1
+        return True
+
+    def pending_keys(self) -> List[Hashable]:
+        return list(self._features)
@@ -0,0 +1,151 @@
+#! python3  # noqa: E265
+
+"""
+    Checkpoint journal of the keys completed by a run, independent of the QGIS
+    API.
+"""
+
+# standard
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+# project
+from taxref_collector.core.cache import CacheEntry
+
+# ############################################################################
+# ########## Functions #############
+# ##################################
+
+
+def run_id(*parts) -> str:
+    """Identify the runs resolving the same keys of the same layer.
+
+    :param parts: e.g. layer source, lookup source and key fields
+
+    :return: identifier of the run
+    :rtype: str
+    """
+    return hashlib.sha1("\x1f".join(str(part) for part in parts).encode()).hexdigest()
+
+
+# ############################################################################
+# ########## Classes ###############
+# ##################################
+
+
+class CheckpointJournal:
+    """SQLite journal of the keys completed by a run, with their results.
+
+    Completed keys are buffered and flushed every ``flush_every`` keys or
+    ``flush_interval`` seconds, so that a run interrupted by a crash or a
+    network outage resumes without requesting them again. Failed keys are not
+    recorded: a resumed run retries them.
+
+    :param path: database file, or ":memory:"
+    :type path: Union[Path, str]
+    :param run: identifier of the run, see run_id()
+    :type run: str
+    :param flush_every: number of keys buffered before a flush
+    :type flush_every: int, optional
+    :param flush_interval: maximum age of the buffer, in seconds
+    :type flush_interval: float, optional
+    """
+
+    def __init__(
+        self,
+        path: Union[Path, str],
+        run: str,
+        flush_every: int = 500,
+        flush_interval: float = 10.0,
+    ):
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.run = run
+        self.flush_every = max(1, flush_every)
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._flushed_at = time.monotonic()
+
+        # opened in the main thread, used by one resolution task at a time
+        self.connection = sqlite3.connect(
+            str(path), timeout=10, check_same_thread=False
+        )
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS journal ("
+            "run TEXT NOT NULL, "
+            "key TEXT NOT NULL, "
+            "cd_nom TEXT, "
+            "taxref_name TEXT, "
+            "PRIMARY KEY (run, key)"
+            ") WITHOUT ROWID"
+        )
+        self.connection.commit()
+
+    def __len__(self) -> int:
+        (count,) = self.connection.execute(
+            "SELECT count(*) FROM journal WHERE run = ?", (self.run,)
+        ).fetchone()
+        return count + len(self._buffer)
+
+    def get(self, key) -> Optional[CacheEntry]:
+        """Return the result of a key completed by the run.
+
+        :param key: lookup key, converted to str
+
+        :return: entry, with cd_nom None for a "no match", or None if the key \
+        was not completed
+        :rtype: Optional[CacheEntry]
+        """
+        row = self.connection.execute(
+            "SELECT cd_nom, taxref_name FROM journal WHERE run = ? AND key = ?",
+            (self.run, str(key)),
+        ).fetchone()
+        if row is None:
+            return None
+        return CacheEntry(*row)
+
+    def record(self, key, cd_nom=None, taxref_name=None):
+        """Record a completed key, a None cd_nom records a "no match".
+
+        :param key: lookup key, converted to str
+        :param cd_nom: TAXREF id, or None
+        :param taxref_name: TAXREF scientific name
+        """
+        self._buffer.append(
+            (
+                self.run,
+                str(key),
+                None if cd_nom is None else str(cd_nom),
+                taxref_name,
+            )
+        )
+        if (
+            len(self._buffer) >= self.flush_every
+            or time.monotonic() - self._flushed_at >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self):
+        """Write the buffered keys in one transaction."""
+        if self._buffer:
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO journal VALUES (?, ?, ?, ?)",
+                    self._buffer,
+                )
+            self._buffer = []
+        self._flushed_at = time.monotonic()
+
+    def clear(self):
+        """Forget the keys of the run, e.g. once it went to its end."""
+        self._buffer = []
+        with self.connection:
+            self.connection.execute("DELETE FROM journal WHERE run = ?", (self.run,))
+
+    def close(self):
+        self.flush()
+        self.connection.close()
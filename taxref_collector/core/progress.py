@@ -0,0 +1,106 @@
+#! python3  # noqa: E265
+
+"""
+    Throughput and remaining time of a resolution, independent of the QGIS API.
+"""
+
+# standard
+import time
+from collections import deque, namedtuple
+from typing import Callable, Optional
+
+# ############################################################################
+# ########## Globals ###############
+# ##################################
+
+# progress of a run at one moment, see ProgressMeter.update(). rate is in keys
+# per second, eta in seconds, None while unknown.
+ProgressStats = namedtuple(
+    "ProgressStats",
+    ["done", "total", "rate", "eta", "hit_ratio", "in_flight"],
+    defaults=(0.0, 0),
+)
+
+# seconds of the run the throughput is measured on
+RATE_WINDOW = 10.0
+
+# ############################################################################
+# ########## Functions #############
+# ##################################
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    """Write a duration as h:mm:ss, or m:ss under an hour.
+
+    :param seconds: duration, None if unknown
+    :type seconds: Optional[float]
+
+    :return: formatted duration, "--:--" if unknown
+    :rtype: str
+    """
+    if seconds is None:
+        return "--:--"
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return "{}:{:02d}:{:02d}".format(hours, minutes, seconds)
+    return "{}:{:02d}".format(minutes, seconds)
+
+
+# ############################################################################
+# ########## Classes ###############
+# ##################################
+
+
+class ProgressMeter:
+    """Measure the throughput of a run on its last seconds, and the time left at
+    that pace.
+
+    The total grows while the layer is scanned, so that the time left is that of
+    the keys found so far.
+
+    :param window: seconds the throughput is measured on
+    :type window: float, optional
+    :param clock: returns the current time in seconds
+    :type clock: Callable[[], float], optional
+    """
+
+    def __init__(
+        self, window: float = RATE_WINDOW, clock: Callable[[], float] = time.monotonic
+    ):
+        self.window = window
+        self.clock = clock
+        # (time, keys done) of the updates within the window, and the one before
+        self._samples = deque()
+
+    def update(
+        self, done: int, total: int, hit_ratio: float = 0.0, in_flight: int = 0
+    ) -> ProgressStats:
+        """Record the keys done by now and return the progress of the run.
+
+        :param done: keys done
+        :type done: int
+        :param total: keys found so far
+        :type total: int
+        :param hit_ratio: share of the keys resolved without request
+        :type hit_ratio: float, optional
+        :param in_flight: requests in flight
+        :type in_flight: int, optional
+
+        :return: progress of the run
+        :rtype: ProgressStats
+        """
+        now = self.clock()
+        self._samples.append((now, done))
+        while len(self._samples) > 2 and now - self._samples[1][0] >= self.window:
+            self._samples.popleft()
+        start, start_done = self._samples[0]
+
+        rate = (done - start_done) / (now - start) if now > start else 0.0
+        if done >= total:
+            eta = 0.0
+        elif rate > 0:
+            eta = (total - done) / rate
+        else:
+            eta = None
+        return ProgressStats(done, total, rate, eta, hit_ratio, in_flight)
@@ -0,0 +1,262 @@
+#! python3  # noqa: E265
+
+"""
+    Taxonomic ranks and name keys, independent of the QGIS API.
+"""
+
+# standard
+from typing import Iterable, Optional, Tuple
+
+# ############################################################################
+# ########## Globals ###############
+# ##################################
+
+# TAXREF rank codes (RANG column) to the english ranks used by ChecklistBank
+TAXREF_RANKS: dict = {
+    "DO": "domain",
+    "SPRG": "superkingdom",
+    "KD": "kingdom",
+    "SSRG": "subkingdom",
+    "IFRG": "infrakingdom",
+    "PH": "phylum",
+    "SBPH": "subphylum",
+    "IFPH": "infraphylum",
+    "DV": "division",
+    "SBDV": "subdivision",
+    "SPCL": "superclass",
+    "CLAD": "cladus",
+    "CL": "class",
+    "SBCL": "subclass",
+    "IFCL": "infraclass",
+    "LEG": "legion",
+    "SPOR": "superorder",
+    "COH": "cohort",
+    "OR": "order",
+    "SBOR": "suborder",
+    "IFOR": "infraorder",
+    "PVOR": "parvorder",
+    "SPFM": "superfamily",
+    "FM": "family",
+    "SBFM": "subfamily",
+    "TR": "tribe",
+    "SSTR": "subtribe",
+    "GN": "genus",
+    "SSGN": "subgenus",
+    "SC": "section",
+    "SBSC": "subsection",
+    "SER": "series",
+    "SSER": "subseries",
+    "AGES": "aggregate",
+    "ES": "species",
+    "SMES": "semispecies",
+    "MES": "microspecies",
+    "SSES": "subspecies",
+    "NAT": "natio",
+    "VAR": "variety",
+    "SVAR": "subvariety",
+    "FO": "form",
+    "SSFO": "subform",
+    "FOES": "forma specialis",
+    "LIN": "linea",
+    "CLO": "clone",
+    "RACE": "race",
+    "CAR": "cultivar",
+    "MO": "morpha",
+    "AB": "abberatio",
+}
+
+# english ranks, as used for the rank columns of the layers
+RANKS: frozenset = frozenset(TAXREF_RANKS.values())
+
+# ranks which are not known by TAXREF and are looked up at another rank
+RANK_REMAPPING: dict = {
+    "complex": "species",
+    "hybrid": "species",
+    "epifamily": "genus",
+    "section": "genus",
+    "subtribe": "family",
+}
+
+# ranks which cannot be matched against TAXREF
+SKIPPED_RANKS: tuple = ("stateofmatter",)
+
+# rank a name without match falls back to, see parent_key()
+RANK_PARENTS: dict = {
+    "subspecies": "species",
+    "natio": "species",
+    "variety": "species",
+    "subvariety": "species",
+    "form": "species",
+    "subform": "species",
+    "forma specialis": "species",
+    "linea": "species",
+    "clone": "species",
+    "race": "species",
+    "cultivar": "species",
+    "morpha": "species",
+    "abberatio": "species",
+    "species": "genus",
+    "semispecies": "genus",
+    "microspecies": "genus",
+    "aggregate": "genus",
+    "subgenus": "genus",
+    "subsection": "genus",
+    "series": "genus",
+    "subseries": "genus",
+}
+
+# number of words of the names of the ranks a name can fall back to, the name
+# of the parent taxon being the first words of the name of its child
+PARENT_NAME_WORDS: dict = {"species": 2, "genus": 1}
+
+# ############################################################################
+# ########## Functions #############
+# ##################################
+
+
+def effective_rank(rank: str) -> str:
+    """Return the lower-cased rank used to query TAXREF.
+
+    :param rank: rank as stored in the layer, e.g. "SPECIES" or "complex"
+    :type rank: str
+
+    :return: rank to query, e.g. "species"
+    :rtype: str
+    """
+    rank = rank.strip().lower()
+    return RANK_REMAPPING.get(rank, rank)
+
+
+def canonical_name(name: str) -> str:
+    """Normalize a scientific name so that spelling variants of the same name \
+    share one key: surrounding and repeated whitespaces are removed and only the \
+    first letter is upper-cased.
+
+    :param name: scientific name
+    :type name: str
+
+    :return: canonical name
+    :rtype: str
+    """
+    name = " ".join(str(name).split())
+    return name[:1].upper() + name[1:].lower()
+
+
+def name_key(name, rank) -> Optional[Tuple[str, str]]:
+    """Build the (canonical name, effective rank) key of an observation.
+
+    :param name: scientific name, may be NULL
+    :param rank: rank of the observation, may be NULL
+
+    :return: lookup key or None if the observation cannot be looked up
+    :rtype: Optional[Tuple[str, str]]
+    """
+    if not name or not rank:
+        return None
+    if str(rank).strip().lower() in SKIPPED_RANKS:
+        return None
+    name = canonical_name(name)
+    if not name:
+        return None
+    return name, effective_rank(str(rank))
+
+
+def record_name_key(
+    record, field_name: str, field_rank: str, rank_columns: Iterable[str] = ()
+) -> Optional[Tuple[str, str]]:
+    """Build the key of a record holding a scientific name and a rank.
+
+    The name is read in the column of the rank it is looked up at, if the record
+    has one, e.g. the "species" column for a "complex" observation.
+
+    :param record: feature, or any mapping of field names to values
+    :param field_name: field of the scientific name
+    :type field_name: str
+    :param field_rank: field of the rank
+    :type field_rank: str
+    :param rank_columns: fields of the record named after a rank
+    :type rank_columns: Iterable[str], optional
+
+    :return: lookup key or None if the record cannot be looked up
+    :rtype: Optional[Tuple[str, str]]
+    """
+    rank = record[field_rank]
+    if not rank:
+        return None
+    rank_column = effective_rank(str(rank))
+    if rank_column in rank_columns:
+        name = record[rank_column]
+    else:
+        name = record[field_name]
+    return name_key(name, rank)
+
+
+def parent_key(
+    key: Tuple[str, str], rank_parents: dict = RANK_PARENTS
+) -> Optional[Tuple[str, str]]:
+    """Build the key of the parent taxon of a name, to look it up when the name \
+    has no match, e.g. ("Quercus robur", "species") for ("Quercus robur \
+    pedunculata", "subspecies").
+
+    :param key: (canonical name, effective rank) key
+    :type key: Tuple[str, str]
+    :param rank_parents: rank each rank falls back to
+    :type rank_parents: dict, optional
+
+    :return: key of the parent, None if the rank has no parent or the name of \
+    the parent cannot be read from the name
+    :rtype: Optional[Tuple[str, str]]
+    """
+    name, rank = key
+    parent_rank = rank_parents.get(rank)
+    word_count = PARENT_NAME_WORDS.get(parent_rank)
+    words = name.split()
+    if word_count is None or len(words) < word_count:
+        return None
+    parent = canonical_name(" ".join(words[:word_count])), parent_rank
+    return parent if parent != key else None
+
+
+def parse_rank_parents(text: str) -> dict:
+    """Read a rank hierarchy written as comma separated "rank>parent" pairs, \
+    e.g. "subspecies>species, species>genus".
+
+    :param text: rank hierarchy, empty for none
+    :type text: str
+
+    :raises ValueError: if a pair is not of the form "rank>parent", or falls \
+    back to a rank other than those of PARENT_NAME_WORDS
+
+    :return: rank each rank falls back to
+    :rtype: dict
+    """
+    rank_parents = {}
+    for pair in text.split(","):
+        if not pair.strip():
+            continue
+        rank, separator, parent = (part.strip().lower() for part in pair.partition(">"))
+        if not separator or not rank or not parent:
+            raise ValueError("Invalid rank fallback: {}".format(pair.strip()))
+        if parent not in PARENT_NAME_WORDS:
+            # the name of the parent is cut from the name, at these ranks only
+            raise ValueError(
+                "Unsupported parent rank: {} ({})".format(
+                    parent, ", ".join(PARENT_NAME_WORDS)
+                )
+            )
+        rank_parents[rank] = parent
+    return rank_parents
+
+
+def format_rank_parents(rank_parents: dict) -> str:
+    """Write a rank hierarchy as read by parse_rank_parents().
+
+    :param rank_parents: rank each rank falls back to
+    :type rank_parents: dict
+
+    :return: comma separated "rank>parent" pairs
+    :rtype: str
+    """
+    return ", ".join(
+        "{}>{}".format(rank, parent) for rank, parent in rank_parents.items()
+    )
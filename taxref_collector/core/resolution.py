@@ -0,0 +1,314 @@
+#! python3  # noqa: E265
+
+"""
+    Resolution of the lookup keys of a run, independent of the QGIS API and of
+    the network stack.
+
+    A key source tells what is known of a key without network: from the
+    checkpoint journal, the caches or a local TAXREF release, and the key a key
+    without match falls back to. A KeyResolution follows the keys of a run, the
+    targets waiting for them and their results, whatever sends the requests: the
+    Qt network stack of QGIS, see processing.collector, or a pool of threads, see
+    core.resolver.
+"""
+
+# standard
+from typing import Callable, Hashable, Iterable, Optional, Tuple
+
+# project
+from taxref_collector.core.cache import CacheEntry
+from taxref_collector.core.jobs import JobState, JobTable
+from taxref_collector.core.ranks import parent_key
+
+# ############################################################################
+# ########## Classes ###############
+# ##################################
+
+
+class KeySource:
+    """Lookups of the keys of a source without network, and records of the
+    results fetched through the network.
+
+    :param cache: lookup cache, read after the journal and filled with the \
+    results fetched
+    :type cache: Union[LookupCache, LruCache], optional
+    :param journal: checkpoint journal of the run, read first and filled with \
+    the results fetched
+    :type journal: CheckpointJournal, optional
+    """
+
+    # name of the source in the caches
+    cache_source: str = None
+
+    def __init__(self, cache=None, journal=None):
+        self.cache = cache
+        self.journal = journal
+
+    def cache_key(self, key: Hashable) -> str:
+        return str(key)
+
+    def lookup_local(self, key: Hashable) -> Optional[CacheEntry]:
+        """Return the result of a key known without network, if any.
+
+        :param key: lookup key
+        :type key: Hashable
+
+        :return: entry, with cd_nom None for a known "no match", or None if the \
+        key must be fetched
+        :rtype: Optional[CacheEntry]
+        """
+        if self.journal is not None:
+            entry = self.journal.get(self.cache_key(key))
+            if entry is not None:
+                return entry
+        if self.cache is None:
+            return None
+        return self.cache.get(self.cache_source, self.cache_key(key))
+
+    def parent_key(self, key: Hashable) -> Optional[Hashable]:
+        """Return the key looked up when a key has no match, if any.
+
+        :param key: lookup key without match
+        :type key: Hashable
+
+        :return: key of the parent taxon, None to keep "no match"
+        :rtype: Optional[Hashable]
+        """
+        return None
+
+    def record(self, key: Hashable, result: Optional[Tuple[str, str]]):
+        """Record the result of a key fetched through the network in the journal \
+        and the cache.
+
+        :param key: lookup key
+        :type key: Hashable
+        :param result: (cd_nom, taxref_name), or None if TAXREF has no match
+        :type result: Optional[Tuple[str, str]]
+        """
+        if self.journal is not None:
+            self.journal.record(self.cache_key(key), *(result or ()))
+        if self.cache is not None:
+            self.cache.put(self.cache_source, self.cache_key(key), *(result or ()))
+
+    def commit(self):
+        """Write the records of the run to the journal and the cache."""
+        if self.journal is not None:
+            self.journal.flush()
+        if self.cache is not None:
+            self.cache.commit()
+
+
+class GbifKeySource(KeySource):
+    """GBIF taxon ids."""
+
+    cache_source = "gbif"
+
+
+class ClbKeySource(KeySource):
+    """(name, rank) keys, read from a local TAXREF release before the caches.
+
+    Names unknown to the local release, or without match, are matched to its
+    nearest name when it is at most max_distance edits away. These approximate
+    matches are listed with their distance in approximate, to be checked.
+
+    :param store: local TAXREF release
+    :type store: TaxrefStore, optional
+    :param max_distance: maximum distance of an approximate match, 0 for none
+    :type max_distance: int, optional
+    :param rank_parents: rank each rank falls back to when a name has no match, \
+    e.g. RANK_PARENTS, None for no fallback
+    :type rank_parents: dict, optional
+    """
+
+    cache_source = "clb"
+
+    def __init__(
+        self,
+        cache=None,
+        journal=None,
+        store=None,
+        max_distance: int = 2,
+        rank_parents: dict = None,
+    ):
+        super().__init__(cache=cache, journal=journal)
+        self.store = store
+        self.max_distance = max_distance
+        self.rank_parents = rank_parents or {}
+        # key -> (TAXREF name, distance) of the approximate matches
+        self.approximate = {}
+
+    def cache_key(self, key) -> str:
+        return "|".join(key)
+
+    def lookup_local(self, key) -> Optional[CacheEntry]:
+        if self.store is not None:
+            # the store is read from the calling thread only
+            record = self.store.by_name(*key)
+            if record is not None:
+                return CacheEntry(record.cd_nom, record.label)
+        entry = super().lookup_local(key)
+        if (entry is None or entry.cd_nom is None) and self.store is not None:
+            # misspelled name, matched to the nearest name of the release
+            match = self.store.nearest(*key, max_distance=self.max_distance)
+            if match is not None:
+                record, distance = match
+                self.approximate[key] = (record.name, distance)
+                return CacheEntry(record.cd_nom, record.label)
+        return entry
+
+    def parent_key(self, key) -> Optional[Tuple[str, str]]:
+        return parent_key(key, self.rank_parents)
+
+
+class KeyResolution:
+    """Lookup keys of a run, each resolved once whatever the number of targets
+    sharing it.
+
+    A new key is looked up in the key source, and handed to fetch when unknown:
+    whatever sends its request then calls set_result() or set_failed(). The
+    result of a key is handed to write with the targets waiting for it,
+    including the targets attached after the answer arrived. The state of each
+    key is kept in a JobTable: a key is resolved or failed exactly once.
+
+    A key without match hands its targets over to its parent key, if any, see
+    KeySource.parent_key(). The parent is a key like any other: resolved once,
+    whatever the number of keys falling back to it.
+
+    :param source: lookups and records of the keys
+    :type source: KeySource
+    :param fetch: called with each key to request
+    :type fetch: Callable[[Hashable], None]
+    :param write: called with the targets of a key and its result, None when \
+    TAXREF has no match
+    :type write: Callable[[list, Optional[tuple]], None], optional
+    """
+
+    def __init__(
+        self,
+        source: KeySource,
+        fetch: Callable[[Hashable], None],
+        write: Callable[[list, Optional[tuple]], None] = None,
+    ):
+        self.source = source
+        self.fetch = fetch
+        self.write = write
+        self.jobs = JobTable()
+        # key without match -> parent key its targets were handed over to
+        self.fallbacks = {}
+        # keys resolved or failed, keys handed to fetch
+        self.done = 0
+        self.fetched = 0
+
+    def __len__(self) -> int:
+        return len(self.jobs)
+
+    @property
+    def hit_ratio(self) -> float:
+        """Share of the keys resolved without request."""
+        if not self.jobs:
+            return 0.0
+        return 1 - self.fetched / len(self.jobs)
+
+    def final_key(self, key: Hashable) -> Hashable:
+        """Return the key whose result is written to the targets of a key: its \
+        nearest parent when it has no match, else itself."""
+        while key in self.fallbacks:
+            key = self.fallbacks[key]
+        return key
+
+    def result(self, key: Hashable) -> Optional[tuple]:
+        """Return the result written to the targets of a key.
+
+        :param key: lookup key
+        :type key: Hashable
+
+        :return: (cd_nom, taxref_name), None if unresolved or without match
+        :rtype: Optional[tuple]
+        """
+        return self.jobs.result(self.final_key(key))
+
+    def attach(self, pairs: Iterable[tuple]):
+        """Attach targets to their keys and resolve the new keys.
+
+        :param pairs: (key, target) pairs
+        :type pairs: Iterable[tuple]
+        """
+        new_keys = []
+        for key, target in pairs:
+            key = self.final_key(key)
+            state = self.jobs.add(key, target)
+            if state is None:
+                new_keys.append(key)
+            elif state is JobState.RESOLVED:
+                # the answer arrived before this target was met
+                self._write([target], self.jobs.result(key))
+
+        for key in new_keys:
+            entry = self.source.lookup_local(key)
+            if entry is None:
+                self.fetched += 1
+                self.fetch(key)
+            elif entry.cd_nom is None:
+                self.set_result(key, None, from_network=False)
+            else:
+                self.set_result(
+                    key, (entry.cd_nom, entry.taxref_name), from_network=False
+                )
+
+    def set_result(
+        self, key: Hashable, result: Optional[tuple], from_network: bool = True
+    ):
+        """Write the result of a pending key to its targets and remember it.
+
+        The targets of a key without match are handed over to its parent key,
+        if any, the key itself being remembered without match.
+
+        :param key: lookup key
+        :type key: Hashable
+        :param result: (cd_nom, taxref_name), or None if TAXREF has no match
+        :type result: Optional[tuple]
+        :param from_network: record the result in the journal and the cache
+        :type from_network: bool, optional
+        """
+        targets = self.jobs.resolve(key, result)
+        if targets is None:
+            return
+        parent = self.source.parent_key(key) if result is None else None
+        if parent is not None:
+            self.fallbacks[key] = parent
+            self.attach([(parent, target) for target in targets])
+        else:
+            self._write(targets, result)
+        if from_network:
+            self.source.record(key, result)
+        self.done += 1
+
+    def set_failed(self, key: Hashable) -> bool:
+        """Give up a pending key whose request failed or whose reply could not be \
+        read, it is neither written nor recorded.
+
+        :param key: lookup key
+        :type key: Hashable
+
+        :return: True if the key was pending
+        :rtype: bool
+        """
+        if not self.jobs.fail(key):
+            return False
+        self.done += 1
+        return True
+
+    def finish(self) -> int:
+        """Give up the keys still pending at the end of the run.
+
+        :return: number of keys given up
+        :rtype: int
+        """
+        pending_keys = self.jobs.pending_keys()
+        for key in pending_keys:
+            self.set_failed(key)
+        return len(pending_keys)
+
+    def _write(self, targets: list, result: Optional[tuple]):
+        if self.write is not None:
+            self.write(targets, result)
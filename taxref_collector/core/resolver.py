@@ -0,0 +1,368 @@
+#! python3  # noqa: E265
+
+"""
+    Resolution of lookup keys into TAXREF names, independent of the QGIS API.
+
+    A resolver takes an iterable of keys and returns the result of each distinct
+    key, with its progress reported to a callback. Its keys are followed by the
+    KeyResolution of the plugin, see core.resolution: only the transport
+    differs. The requests are sent from a pool of threads, each keeping its
+    connections alive, with the rate limit and the retry delays of the plugin,
+    see core.throttle. The plugin sends them with the Qt network stack of QGIS,
+    see processing.collector.
+"""
+
+# standard
+import gzip
+import http.client
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Hashable, Iterable, Optional, Tuple
+from urllib.parse import urlsplit
+
+# project
+from taxref_collector.__about__ import __title_clean__, __uri_homepage__, __version__
+from taxref_collector.core.clb_search import (
+    CLB_SEARCH_URL,
+    build_search_url,
+    parse_search_response,
+)
+from taxref_collector.core.gbif_related import (
+    GBIF_API_URL,
+    build_related_url,
+    parse_related_response,
+)
+from taxref_collector.core.resolution import (
+    ClbKeySource,
+    GbifKeySource,
+    KeyResolution,
+    KeySource,
+)
+from taxref_collector.core.throttle import (
+    RETRY_HTTP_STATUS,
+    TokenBucket,
+    parse_retry_after,
+    retry_delay,
+)
+
+# ############################################################################
+# ########## Globals ###############
+# ##################################
+
+USER_AGENT: str = "{}/{} (+{})".format(__title_clean__, __version__, __uri_homepage__)
+
+# errors of a request worth a new attempt, on a new connection
+NETWORK_ERRORS: tuple = (OSError, http.client.HTTPException)
+
+# ############################################################################
+# ########## Classes ###############
+# ##################################
+
+
+class Resolver:
+    """Resolve lookup keys into (cd_nom, taxref_name) results.
+
+    The keys are followed by a KeyResolution, the same as the plugin's: the
+    lookups without network, the parent fallback and the records in the cache
+    are those of the key source. Subclasses define the key source and how to
+    fetch a key.
+
+    :param source: lookups and records of the keys
+    :type source: KeySource
+    :param workers: number of requests in flight
+    :type workers: int, optional
+    :param requests_per_second: rate limit of the requests, 0 for none
+    :type requests_per_second: float, optional
+    :param max_retries: new attempts of a throttled, failed or timed out request
+    :type max_retries: int, optional
+    :param timeout: timeout of a request, in seconds
+    :type timeout: float, optional
+    """
+
+    def __init__(
+        self,
+        source: KeySource,
+        workers: int = 6,
+        requests_per_second: float = 10.0,
+        max_retries: int = 3,
+        timeout: float = 30.0,
+    ):
+        self.source = source
+        self.workers = max(1, workers)
+        self.max_retries = max(0, max_retries)
+        self.timeout = timeout
+        # keys whose requests failed in the last run
+        self.failed = []
+        # key -> parent key whose result it took in the last run
+        self.fallbacks = {}
+        self.requests = 0
+        self.retries = 0
+
+        self._bucket = TokenBucket(requests_per_second)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # state of the current run, see resolve()
+        self._executor = None
+        self._futures = {}
+        self._resolved = {}
+
+    def fetch(self, key: Hashable) -> Optional[Tuple[str, str]]:
+        """Request the result of a key, from a thread of the pool.
+
+        :param key: lookup key
+        :type key: Hashable
+
+        :return: (cd_nom, taxref_name), None if TAXREF has no match
+        :rtype: Optional[Tuple[str, str]]
+        """
+        raise NotImplementedError
+
+    def resolve(
+        self,
+        keys: Iterable[Hashable],
+        on_progress: Callable[[int, int], None] = None,
+    ) -> Dict[Hashable, Optional[Tuple[str, str]]]:
+        """Resolve the distinct keys of an iterable, None keys are skipped.
+
+        A key without match takes the result of its parent, see \
+        KeySource.parent_key(), recorded in fallbacks. Each parent is resolved \
+        once, whatever the number of its children.
+
+        :param keys: lookup keys, with duplicates
+        :type keys: Iterable[Hashable]
+        :param on_progress: called with the number of keys done and the number \
+        of distinct keys and parents, from the calling thread
+        :type on_progress: Callable[[int, int], None], optional
+
+        :return: result of each resolved key, None when TAXREF has no match at \
+        its rank nor at its parent ranks. Keys whose requests failed are left out \
+        and listed in failed.
+        :rtype: Dict[Hashable, Optional[Tuple[str, str]]]
+        """
+        keys = [key for key in dict.fromkeys(keys) if key is not None]
+        self._resolved = {}
+        self._futures = {}
+        resolution = KeyResolution(self.source, fetch=self._submit, write=self._write)
+        with ThreadPoolExecutor(max_workers=self.workers) as self._executor:
+            # each key is its own target
+            resolution.attach((key, key) for key in keys)
+            if on_progress is not None:
+                on_progress(resolution.done, len(resolution))
+            while self._futures:
+                finished, _ = wait(self._futures, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    key = self._futures.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception:
+                        # failed request or unreadable reply, asked again by the
+                        # next run
+                        resolution.set_failed(key)
+                    else:
+                        # may submit the parent of a key without match
+                        resolution.set_result(key, result)
+                    if on_progress is not None:
+                        on_progress(resolution.done, len(resolution))
+        resolution.finish()
+        self.source.commit()
+
+        resolved, self._resolved = self._resolved, {}
+        self.fallbacks = {}
+        for key, result in resolved.items():
+            parent = resolution.final_key(key)
+            if parent != key and result is not None:
+                self.fallbacks[key] = parent
+        self.failed = [key for key in keys if key not in resolved]
+        return resolved
+
+    def _submit(self, key: Hashable):
+        self._futures[self._executor.submit(self.fetch, key)] = key
+
+    def _write(self, targets: list, result: Optional[Tuple[str, str]]):
+        for key in targets:
+            self._resolved[key] = result
+
+    def request(self, url: str, data: bytes = None) -> bytes:
+        """Send a GET, or a POST if data is given, and return the response body.
+
+        Throttled (429), server side (5xx) and timed out requests are sent again
+        up to max_retries times, after their Retry-After delay or an exponential
+        backoff.
+
+        :param url: URL to request
+        :type url: str
+        :param data: JSON body to post
+        :type data: bytes, optional
+
+        :raises ConnectionError: the service answered with an error status
+        :raises OSError: the request failed after its retries
+
+        :return: response body
+        :rtype: bytes
+        """
+        parts = urlsplit(url)
+        target = "{}?{}".format(parts.path, parts.query) if parts.query else parts.path
+        headers = {
+            "User-Agent": USER_AGENT,
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip",
+        }
+        if data is not None:
+            headers["Content-Type"] = "application/json"
+
+        attempt = 0
+        while True:
+            self._throttle()
+            retry_after = None
+            try:
+                connection = self._connection(parts.scheme, parts.netloc)
+                connection.request(
+                    "GET" if data is None else "POST",
+                    target,
+                    body=data,
+                    headers=headers,
+                )
+                response = connection.getresponse()
+                body = response.read()
+            except NETWORK_ERRORS:
+                self._close_connection(parts.scheme, parts.netloc)
+                if attempt >= self.max_retries:
+                    raise
+            else:
+                if response.status not in RETRY_HTTP_STATUS:
+                    if response.status >= 400:
+                        raise ConnectionError(
+                            "HTTP {} {}: {}".format(
+                                response.status, response.reason, url
+                            )
+                        )
+                    if response.getheader("Content-Encoding") == "gzip":
+                        body = gzip.decompress(body)
+                    return body
+                retry_after = parse_retry_after(response.getheader("Retry-After"))
+
+            delay = retry_delay(attempt, self.max_retries, retry_after)
+            if delay is None:
+                raise ConnectionError(
+                    "HTTP {} {} after {} attempts: {}".format(
+                        response.status, response.reason, attempt + 1, url
+                    )
+                )
+            with self._lock:
+                self.retries += 1
+            time.sleep(delay)
+            attempt += 1
+
+    def _throttle(self):
+        # requests wait in turn for a token of the shared bucket
+        with self._lock:
+            while not self._bucket.take():
+                time.sleep(self._bucket.wait_time())
+            self.requests += 1
+
+    def _connection(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        """Connection of the current thread to a host, kept alive between \
+        requests."""
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = {}
+        connection = connections.get((scheme, netloc))
+        if connection is None:
+            if scheme == "https":
+                connection = http.client.HTTPSConnection(netloc, timeout=self.timeout)
+            else:
+                connection = http.client.HTTPConnection(netloc, timeout=self.timeout)
+            connections[(scheme, netloc)] = connection
+        return connection
+
+    def _close_connection(self, scheme: str, netloc: str):
+        connections = getattr(self._local, "connections", {})
+        connection = connections.pop((scheme, netloc), None)
+        if connection is not None:
+            connection.close()
+
+
+class GbifResolver(Resolver):
+    """Resolve GBIF taxon ids from their related TAXREF usages.
+
+    :param cache: lookup cache, read before and filled after the requests
+    :type cache: Union[LookupCache, LruCache], optional
+    :param url: GBIF API root
+    :type url: str, optional
+    """
+
+    def __init__(self, cache=None, url: str = GBIF_API_URL, **kwargs):
+        super().__init__(GbifKeySource(cache=cache), **kwargs)
+        self.url = url
+
+    def fetch(self, gbif_id) -> Optional[Tuple[str, str]]:
+        fallback = None
+        offset = 0
+        while True:
+            match, accepted, offset = parse_related_response(
+                self.request(build_related_url(gbif_id, offset=offset, url=self.url))
+            )
+            if accepted:
+                return match
+            fallback = fallback or match
+            if offset is None:
+                return fallback
+
+
+class ClbResolver(Resolver):
+    """Resolve (name, rank) keys, from a local TAXREF release first, then
+    through the ChecklistBank name search, see ClbKeySource.
+
+    :param cache: lookup cache, read before and filled after the requests
+    :type cache: Union[LookupCache, LruCache], optional
+    :param store: local TAXREF release
+    :type store: TaxrefStore, optional
+    :param lean: use the lean exact-name query
+    :type lean: bool, optional
+    :param url: ChecklistBank search endpoint
+    :type url: str, optional
+    :param max_distance: maximum distance of an approximate match, 0 for none
+    :type max_distance: int, optional
+    :param rank_parents: rank each rank falls back to when a name has no match, \
+    e.g. RANK_PARENTS, None for no fallback
+    :type rank_parents: dict, optional
+    """
+
+    def __init__(
+        self,
+        cache=None,
+        store=None,
+        lean: bool = True,
+        url: str = CLB_SEARCH_URL,
+        max_distance: int = 2,
+        rank_parents: dict = None,
+        **kwargs,
+    ):
+        super().__init__(
+            ClbKeySource(
+                cache=cache,
+                store=store,
+                max_distance=max_distance,
+                rank_parents=rank_parents,
+            ),
+            **kwargs,
+        )
+        self.lean = lean
+        self.url = url
+
+    @property
+    def approximate(self) -> dict:
+        """(TAXREF name, distance) of the approximate matches of the last run, \
+        by key."""
+        return self.source.approximate
+
+    def resolve(self, keys, on_progress=None):
+        self.source.approximate = {}
+        return super().resolve(keys, on_progress=on_progress)
+
+    def fetch(self, key) -> Optional[Tuple[str, str]]:
+        name, rank = key
+        return parse_search_response(
+            self.request(build_search_url(name, rank, lean=self.lean, url=self.url))
+        )
@@ -0,0 +1,374 @@
+#! python3  # noqa: E265
+
+"""
+    Local TAXREF release, independent of the QGIS API.
+"""
+
+# standard
+import csv
+import io
+import sqlite3
+import time
+import zipfile
+from collections import namedtuple
+from pathlib import Path
+from typing import Callable, Iterator, Optional, Tuple, Union
+
+# project
+from taxref_collector.core.fuzzy import (
+    MAX_WORD_DISTANCE,
+    combine_words,
+    edit_distance,
+    word_variants,
+)
+from taxref_collector.core.ranks import TAXREF_RANKS, canonical_name
+
+# ############################################################################
+# ########## Globals ###############
+# ##################################
+
+TaxrefRecord = namedtuple(
+    "TaxrefRecord", ["cd_nom", "cd_ref", "rank", "name", "label", "accepted"]
+)
+
+# INPN page of a taxon
+TAXREF_URL = "https://inpn.mnhn.fr/espece/cd_nom/{cd_nom}"
+
+# ############################################################################
+# ########## Functions #############
+# ##################################
+
+
+def read_taxref_release(path: Union[Path, str]) -> Iterator[TaxrefRecord]:
+    """Read the taxa of a TAXREF release: the TAXREFvXX.txt file of the official \
+    archive, or the NameUsage.tsv file of the ColDP export of ChecklistBank \
+    dataset 2008. Zip archives are opened in place.
+
+    :param path: zip archive, TAXREFvXX.txt or NameUsage.tsv file
+    :type path: Union[Path, str]
+
+    :raises ValueError: if no TAXREF table is found
+
+    :return: taxa records
+    :rtype: Iterator[TaxrefRecord]
+    """
+    path = Path(path)
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            members = [
+                member
+                for member in archive.namelist()
+                if Path(member).name.lower() == "nameusage.tsv"
+                or (
+                    Path(member).name.upper().startswith("TAXREF")
+                    and member.lower().endswith(".txt")
+                )
+            ]
+            if not members:
+                raise ValueError(f"No TAXREF table found in {path}")
+            with archive.open(members[0]) as raw:
+                text = io.TextIOWrapper(raw, encoding="utf-8-sig", errors="replace")
+                yield from _read_table(text)
+    else:
+        with path.open(encoding="utf-8-sig", errors="replace", newline="") as text:
+            yield from _read_table(text)
+
+
+def _read_table(text) -> Iterator[TaxrefRecord]:
+    reader = csv.DictReader(text, delimiter="\t", quoting=csv.QUOTE_NONE)
+    if reader.fieldnames is None:
+        raise ValueError("Empty TAXREF table")
+    if "CD_NOM" in reader.fieldnames:
+        for row in reader:
+            if not row.get("LB_NOM"):
+                continue
+            rank = row.get("RANG", "").strip()
+            yield TaxrefRecord(
+                cd_nom=row["CD_NOM"],
+                cd_ref=row.get("CD_REF") or row["CD_NOM"],
+                rank=TAXREF_RANKS.get(rank, rank.lower()),
+                name=canonical_name(row["LB_NOM"]),
+                label=row.get("NOM_COMPLET") or row["LB_NOM"],
+                accepted=row.get("CD_REF", row["CD_NOM"]) == row["CD_NOM"],
+            )
+    elif "col:ID" in reader.fieldnames:
+        for row in reader:
+            if not row.get("col:scientificName"):
+                continue
+            status = row.get("col:status", "accepted")
+            accepted = status in ("accepted", "provisionally accepted")
+            label = row["col:scientificName"]
+            if row.get("col:authorship"):
+                label = f"{label} {row['col:authorship']}"
+            yield TaxrefRecord(
+                cd_nom=row["col:ID"],
+                cd_ref=row["col:ID"] if accepted else row.get("col:parentID", ""),
+                rank=row.get("col:rank", "").lower(),
+                name=canonical_name(row["col:scientificName"]),
+                label=label,
+                accepted=accepted,
+            )
+    else:
+        raise ValueError("Unknown TAXREF table columns: {}".format(reader.fieldnames))
+
+
+def taxref_values(taxref_id, taxref_name) -> tuple:
+    """Values of the cd_nom, taxref_name and taxref_url fields of a taxon.
+
+    :param taxref_id: TAXREF cd_nom
+    :param taxref_name: TAXREF scientific name
+    :type taxref_name: str
+
+    :return: (cd_nom, taxref_name, taxref_url)
+    :rtype: tuple
+    """
+    cd_nom = int(taxref_id) if str(taxref_id).isdigit() else taxref_id
+    return cd_nom, taxref_name, TAXREF_URL.format(cd_nom=taxref_id)
+
+
+# ############################################################################
+# ########## Classes ###############
+# ##################################
+
+
+class TaxrefStore:
+    """Indexed SQLite copy of a TAXREF release, to resolve names without network.
+
+    The words of the names are indexed by their one-letter deletions, so that a
+    misspelled name is matched to the nearest TAXREF name with a few indexed
+    queries, see nearest().
+
+    :param path: database file, or ":memory:"
+    :type path: Union[Path, str]
+    """
+
+    def __init__(self, path: Union[Path, str]):
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # opened in the main thread, used by one resolution task at a time
+        self.connection = sqlite3.connect(str(path), check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS taxa ("
+            "cd_nom TEXT PRIMARY KEY, "
+            "cd_ref TEXT, "
+            "rank TEXT, "
+            "name TEXT, "
+            "label TEXT, "
+            "accepted INTEGER"
+            ")"
+        )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS taxa_name_rank ON taxa (name, rank, accepted)"
+        )
+        # word variant -> word of the names, see word_variants()
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS words (variant TEXT, word TEXT)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS words_variant ON words (variant)"
+        )
+        self.connection.commit()
+        self._words_indexed = False
+
+    def import_release(
+        self,
+        path: Union[Path, str],
+        feedback: Callable[[int], None] = None,
+        chunk_size: int = 10000,
+    ) -> int:
+        """Replace the stored taxa with those of a TAXREF release.
+
+        :param path: zip archive, TAXREFvXX.txt or NameUsage.tsv file
+        :type path: Union[Path, str]
+        :param feedback: called with the number of imported taxa after each chunk
+        :type feedback: Callable[[int], None], optional
+        :param chunk_size: number of taxa inserted at once
+        :type chunk_size: int, optional
+
+        :return: number of imported taxa
+        :rtype: int
+        """
+        count = 0
+        with self.connection:
+            self.connection.execute("DELETE FROM taxa")
+            self.connection.execute("DROP INDEX IF EXISTS taxa_name_rank")
+            chunk = []
+            for record in read_taxref_release(path):
+                chunk.append(tuple(record))
+                if len(chunk) >= chunk_size:
+                    count += self._insert(chunk)
+                    chunk = []
+                    if feedback:
+                        feedback(count)
+            count += self._insert(chunk)
+            self.connection.execute(
+                "CREATE INDEX taxa_name_rank ON taxa (name, rank, accepted)"
+            )
+            self._index_words()
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO metadata VALUES (?, ?)",
+                (
+                    ("release", Path(path).name),
+                    ("imported_at", str(time.time())),
+                    ("count", str(count)),
+                ),
+            )
+        if feedback:
+            feedback(count)
+        return count
+
+    def _index_words(self):
+        words = set()
+        for (name,) in self.connection.execute("SELECT DISTINCT name FROM taxa"):
+            words.update(name.lower().split())
+        self.connection.execute("DELETE FROM words")
+        self.connection.execute("DROP INDEX IF EXISTS words_variant")
+        self.connection.executemany(
+            "INSERT INTO words VALUES (?, ?)",
+            ((variant, word) for word in words for variant in word_variants(word)),
+        )
+        self.connection.execute("CREATE INDEX words_variant ON words (variant)")
+        self._words_indexed = True
+
+    def _insert(self, chunk: list) -> int:
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO taxa VALUES (?, ?, ?, ?, ?, ?)", chunk
+        )
+        return len(chunk)
+
+    @property
+    def release(self) -> Optional[str]:
+        """Name of the imported release file, None if nothing was imported."""
+        row = self.connection.execute(
+            "SELECT value FROM metadata WHERE key = 'release'"
+        ).fetchone()
+        return row[0] if row else None
+
+    def is_empty(self) -> bool:
+        return self.connection.execute("SELECT 1 FROM taxa LIMIT 1").fetchone() is None
+
+    def by_name(self, name: str, rank: str) -> Optional[TaxrefRecord]:
+        """Return the accepted taxon of a scientific name at a rank.
+
+        :param name: scientific name
+        :type name: str
+        :param rank: english rank, e.g. "species"
+        :type rank: str
+
+        :return: accepted taxon, None if unknown or ambiguous
+        :rtype: Optional[TaxrefRecord]
+        """
+        rows = self.connection.execute(
+            "SELECT * FROM taxa WHERE name = ? AND rank = ? AND accepted = 1 LIMIT 2",
+            (canonical_name(name), rank.lower()),
+        ).fetchall()
+        # as with ChecklistBank, only an unambiguous answer is used
+        if len(rows) != 1:
+            return None
+        return TaxrefRecord(*rows[0])
+
+    def nearest(
+        self, name: str, rank: str, max_distance: int = 2
+    ) -> Optional[Tuple[TaxrefRecord, int]]:
+        """Return the accepted taxon of the nearest scientific name at a rank, \
+        to match a misspelled name.
+
+        The distance is the number of letters inserted, deleted, substituted or \
+        swapped, summed over the words of the name, each word being at most \
+        MAX_WORD_DISTANCE edits away. Known names are not matched.
+
+        :param name: scientific name, unknown to TAXREF
+        :type name: str
+        :param rank: english rank, e.g. "species"
+        :type rank: str
+        :param max_distance: maximum distance of the nearest name
+        :type max_distance: int, optional
+
+        :return: accepted taxon and its distance, None if no name is near \
+        enough, or if several are equally near
+        :rtype: Optional[Tuple[TaxrefRecord, int]]
+        """
+        name = canonical_name(name)
+        if max_distance < 1 or not name:
+            return None
+        if self.connection.execute(
+            "SELECT 1 FROM taxa WHERE name = ? LIMIT 1", (name,)
+        ).fetchone():
+            return None
+        if not self._words_indexed:
+            # release imported by a version without word index
+            if self.connection.execute("SELECT 1 FROM words LIMIT 1").fetchone():
+                self._words_indexed = True
+            else:
+                with self.connection:
+                    self._index_words()
+
+        word_max_distance = min(max_distance, MAX_WORD_DISTANCE)
+        candidates = []
+        for word in name.lower().split():
+            variants = list(word_variants(word))
+            rows = self.connection.execute(
+                "SELECT DISTINCT word FROM words WHERE variant IN ({})".format(
+                    ", ".join("?" * len(variants))
+                ),
+                variants,
+            ).fetchall()
+            word_candidates = []
+            for (candidate,) in rows:
+                distance = edit_distance(word, candidate, word_max_distance)
+                if distance <= word_max_distance:
+                    word_candidates.append((candidate, distance))
+            if not word_candidates:
+                return None
+            candidates.append(word_candidates)
+
+        distances = {
+            canonical_name(" ".join(words)): distance
+            for words, distance in combine_words(candidates, max_distance)
+        }
+        rows = self.connection.execute(
+            "SELECT * FROM taxa "
+            "WHERE name IN ({}) AND rank = ? AND accepted = 1".format(
+                ", ".join("?" * len(distances))
+            ),
+            [*distances, rank.lower()],
+        ).fetchall()
+        records = {}
+        for row in rows:
+            record = TaxrefRecord(*row)
+            records.setdefault(record.name, []).append(record)
+        matches = sorted(
+            (
+                (distances[candidate_name], candidate_records)
+                for candidate_name, candidate_records in records.items()
+            ),
+            key=lambda match: match[0],
+        )
+        # as with exact names, only an unambiguous answer is used
+        if (
+            not matches
+            or len(matches[0][1]) > 1
+            or len(matches) > 1
+            and matches[0][0] == matches[1][0]
+        ):
+            return None
+        distance, (record,) = matches[0]
+        return record, distance
+
+    def by_cd_nom(self, cd_nom) -> Optional[TaxrefRecord]:
+        """Return the taxon of a TAXREF id.
+
+        :param cd_nom: TAXREF id
+        :return: taxon, None if unknown
+        :rtype: Optional[TaxrefRecord]
+        """
+        row = self.connection.execute(
+            "SELECT * FROM taxa WHERE cd_nom = ?", (str(cd_nom),)
+        ).fetchone()
+        return TaxrefRecord(*row) if row else None
+
+    def close(self):
+        self.connection.close()
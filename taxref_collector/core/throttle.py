@@ -0,0 +1,339 @@
+#! python3  # noqa: E265
+
+"""
+    Rate limiting and retry policies of the web services, independent of the
+    QGIS API.
+"""
+
+# standard
+import random
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
+
+# ############################################################################
+# ########## Globals ###############
+# ##################################
+
+# HTTP status worth a new attempt: throttling and server side errors
+RETRY_HTTP_STATUS: tuple = (408, 429, 500, 502, 503, 504)
+
+# ############################################################################
+# ########## Functions #############
+# ##################################
+
+
+def backoff_delay(
+    attempt: int,
+    base: float = 1.0,
+    cap: float = 60.0,
+    rand: Callable[[], float] = random.random,
+) -> float:
+    """Exponential backoff with full jitter: a random delay between 0 and \
+    base * 2 ** attempt, bounded by cap.
+
+    :param attempt: number of attempts already made, from 0
+    :type attempt: int
+    :param base: delay bound of the first retry, in seconds
+    :type base: float, optional
+    :param cap: maximum delay, in seconds
+    :type cap: float, optional
+    :param rand: random number generator in [0, 1)
+    :type rand: Callable[[], float], optional
+
+    :return: delay in seconds
+    :rtype: float
+    """
+    return rand() * min(cap, base * 2 ** max(0, attempt))
+
+
+def retry_delay(
+    attempt: int, max_retries: int, retry_after: Optional[float] = None
+) -> Optional[float]:
+    """Delay before a failed request is sent again: the one asked by the service,
+    else an exponential backoff.
+
+    :param attempt: number of attempts already made, from 0
+    :type attempt: int
+    :param max_retries: new attempts allowed after the first one
+    :type max_retries: int
+    :param retry_after: delay asked by the service, see parse_retry_after()
+    :type retry_after: float, optional
+
+    :return: delay in seconds, None if the request is given up
+    :rtype: Optional[float]
+    """
+    if attempt >= max_retries:
+        return None
+    return retry_after if retry_after is not None else backoff_delay(attempt)
+
+
+def parse_retry_after(value, now: float = None) -> Optional[float]:
+    """Read a Retry-After header, given in seconds or as an HTTP date.
+
+    :param value: header value
+    :type value: Union[str, bytes]
+    :param now: current UNIX time, defaults to time.time()
+    :type now: float, optional
+
+    :return: delay in seconds, None if the header is missing or invalid
+    :rtype: Optional[float]
+    """
+    if isinstance(value, bytes):
+        value = value.decode("latin-1")
+    value = (value or "").strip()
+    if not value:
+        return None
+    if value.isdigit():
+        return float(value)
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if date is None:
+        return None
+    return max(0.0, date.timestamp() - (time.time() if now is None else now))
+
+
+# ############################################################################
+# ########## Classes ###############
+# ##################################
+
+
+class TokenBucket:
+    """Allow a sustained number of requests per second, with short bursts.
+
+    :param rate: tokens added per second, 0 or less for no limit
+    :type rate: float
+    :param capacity: maximum number of tokens, defaults to max(1, rate)
+    :type capacity: float, optional
+    :param clock: monotonic clock, in seconds
+    :type clock: Callable[[], float], optional
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.clock = clock
+        self.tokens = self.capacity
+        self._updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def take(self) -> bool:
+        """Consume a token if one is available.
+
+        :return: True if the request can be sent now
+        :rtype: bool
+        """
+        if self.rate <= 0:
+            return True
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self) -> float:
+        """Seconds until a token is available."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class CircuitBreaker:
+    """Pause a host after repeated failures.
+
+    After threshold consecutive failures the circuit opens: no request is sent
+    for cooldown seconds. A single trial request is then allowed, its success
+    closes the circuit, its failure opens it again.
+
+    :param threshold: consecutive failures opening the circuit
+    :type threshold: int, optional
+    :param cooldown: pause, in seconds
+    :type cooldown: float, optional
+    :param clock: monotonic clock, in seconds
+    :type clock: Callable[[], float], optional
+    """
+
+    def __init__(
+        self,
+        threshold: int = 5,
+        cooldown: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self.clock = clock
+        self.failures = 0
+        # consecutive openings without any success
+        self.trips = 0
+        self._opened_at = None
+        self._trial = False
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def retry_in(self) -> float:
+        """Seconds until a request can be sent, 0 if the circuit is closed."""
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self._opened_at + self.cooldown - self.clock())
+
+    def allow(self) -> bool:
+        """Tell if a request can be sent now, the first request allowed once the \
+        pause is over is the trial request."""
+        if self._opened_at is None:
+            return True
+        if self._trial or self.retry_in() > 0:
+            return False
+        self._trial = True
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.trips = 0
+        self._opened_at = None
+        self._trial = False
+
+    def record_failure(self) -> bool:
+        """Count a failure.
+
+        :return: True if the circuit has just opened
+        :rtype: bool
+        """
+        self.failures += 1
+        if self._trial or (self._opened_at is None and self.failures >= self.threshold):
+            self._opened_at = self.clock()
+            self._trial = False
+            self.trips += 1
+            return True
+        return False
+
+
+class AimdController:
+    """Number of requests to keep in flight, adjusted from the replies.
+
+    The window grows by increase for each window of replies answered in time
+    (additive increase) and is multiplied by decrease after a failure, or when
+    the latency goes over tolerance times its baseline (multiplicative
+    decrease). The window is decreased at most once per smoothed latency, so
+    that the replies of one burst only count once. It stops growing while the
+    error rate of the last replies is over max_error_rate.
+
+    :param initial: initial window
+    :type initial: float
+    :param minimum: smallest window, defaults to 1
+    :type minimum: float, optional
+    :param maximum: largest window
+    :type maximum: float, optional
+    :param increase: window growth for a full window of successful replies
+    :type increase: float, optional
+    :param decrease: factor applied to the window on congestion
+    :type decrease: float, optional
+    :param tolerance: latency over baseline ratio seen as congestion
+    :type tolerance: float, optional
+    :param error_window: number of last replies the error rate is measured on
+    :type error_window: int, optional
+    :param max_error_rate: error rate over which the window stops growing
+    :type max_error_rate: float, optional
+    :param clock: monotonic clock, in seconds
+    :type clock: Callable[[], float], optional
+    """
+
+    def __init__(
+        self,
+        initial: float,
+        minimum: float = 1,
+        maximum: float = 64,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        tolerance: float = 2.0,
+        error_window: int = 50,
+        max_error_rate: float = 0.1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.window = min(self.maximum, max(self.minimum, initial))
+        self.increase = increase
+        self.decrease = decrease
+        self.tolerance = tolerance
+        self.max_error_rate = max_error_rate
+        self.clock = clock
+
+        # smoothed and lowest latencies, in seconds
+        self.latency = None
+        self.baseline = None
+        self.replies = 0
+        self.failures = 0
+        # outcome of the last replies, True for a failure
+        self._outcomes = deque(maxlen=max(1, error_window))
+        self._decreased_at = None
+
+    @property
+    def limit(self) -> int:
+        return max(1, int(self.window))
+
+    @property
+    def error_rate(self) -> float:
+        """Share of failures among the last replies."""
+        if not self._outcomes:
+            return 0.0
+        return sum(self._outcomes) / len(self._outcomes)
+
+    def on_reply(self, latency: float, failed: bool = False) -> bool:
+        """Update the window with a reply.
+
+        :param latency: seconds between the request and its reply
+        :type latency: float
+        :param failed: the request was throttled or failed on the server side
+        :type failed: bool, optional
+
+        :return: True if the limit changed
+        :rtype: bool
+        """
+        limit = self.limit
+        self.replies += 1
+        self._outcomes.append(failed)
+        if failed:
+            self.failures += 1
+            self._decrease()
+            return self.limit != limit
+
+        self.latency = (
+            latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        )
+        if self.baseline is None or latency < self.baseline:
+            self.baseline = latency
+        else:
+            # follow a lasting change of the service speed
+            self.baseline += 0.01 * (latency - self.baseline)
+
+        if self.latency > self.tolerance * self.baseline:
+            self._decrease()
+        elif self.error_rate <= self.max_error_rate:
+            self.window = min(self.maximum, self.window + self.increase / self.window)
+        return self.limit != limit
+
+    def _decrease(self):
+        now = self.clock()
+        if self._decreased_at is not None and now - self._decreased_at < (
+            self.latency or 0
+        ):
+            return
+        self._decreased_at = now
+        self.window = max(self.minimum, self.window * self.decrease)
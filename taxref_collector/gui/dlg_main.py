@@ -5,10 +5,10 @@
 """
 
 # PyQGIS
-from qgis.core import QgsMapLayerProxyModel
-from qgis.gui import QgsFieldComboBox, QgsMapLayerComboBox
+from qgis.core import QgsMapLayerProxyModel, QgsVectorLayer
+from qgis.gui import QgsFieldComboBox, QgsFileWidget, QgsMapLayerComboBox
 from qgis.PyQt.Qt import QUrl
-from qgis.PyQt.QtCore import QSize, QThread, pyqtSignal
+from qgis.PyQt.QtCore import QSize, Qt
 from qgis.PyQt.QtGui import QDesktopServices, QIcon, QPixmap
 from qgis.PyQt.QtWidgets import (
     QButtonGroup,
@@ -16,10 +16,13 @@ from qgis.PyQt.QtWidgets import (
     QDialog,
     QDialogButtonBox,
     QGridLayout,
+    QHeaderView,
     QLabel,
     QProgressBar,
     QPushButton,
     QStackedWidget,
+    QTableWidget,
+    QTableWidgetItem,
     QToolButton,
     QVBoxLayout,
     QWidget,
@@ -37,6 +40,8 @@ from taxref_collector.__about__ import (
     __title__,
     __uri_homepage__,
 )
+from taxref_collector.core.progress import ProgressStats, format_duration
+from taxref_collector.toolbelt import PlgLogger
 
 # ############################################################################
 # ########## Classes ###############
@@ -213,6 +218,85 @@ class TaxrefCollectorDialog(QDialog):
         self.stack.addWidget(gbif_page)
         self.stack.addWidget(clb_page)
         self.layout.addWidget(self.stack)
+
+        # Other layers resolved in the same run, each with its own fields
+        other_layers_label = QLabel(self)
+        other_layers_label.setText(self.tr("Also resolve these layers in the same run"))
+        self.layout.addWidget(other_layers_label)
+        self.layers_table = QTableWidget(0, 3, self)
+        self.layers_table.setHorizontalHeaderLabels(
+            [self.tr("Layer"), self.tr("GBIF id or name field"), self.tr("Rank field")]
+        )
+        self.layers_table.setToolTip(
+            self.tr(
+                "Names shared by several layers are resolved once, and written to "
+                "each of them."
+            )
+        )
+        self.layers_table.verticalHeader().setVisible(False)
+        self.layers_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.layers_table.setColumnHidden(2, True)
+        self.fill_layers_table()
+        self.select_layer_combo_box.layerChanged.connect(self.fill_layers_table)
+        self.layout.addWidget(self.layers_table)
+        self.layout.insertSpacing(100, 25)
+
+        # Output: fields of the layer or lookup table joined to the layer
+        self.lookup_checkbox = QCheckBox(self)
+        self.lookup_checkbox.setText(
+            self.tr("Write results to a lookup table joined to the layer")
+        )
+        self.lookup_checkbox.setToolTip(
+            self.tr(
+                "The layer is left untouched: one row per distinct GBIF id or "
+                "scientific name is written to the table."
+            )
+        )
+        self.lookup_checkbox.setChecked(False)
+        self.layout.addWidget(self.lookup_checkbox)
+        self.lookup_file_widget = QgsFileWidget(self)
+        self.lookup_file_widget.setStorageMode(QgsFileWidget.SaveFile)
+        self.lookup_file_widget.setFilter(self.tr("GeoPackage (*.gpkg)"))
+        self.lookup_file_widget.lineEdit().setPlaceholderText(
+            self.tr("[Create temporary layer]")
+        )
+        self.lookup_file_widget.setEnabled(False)
+        self.lookup_checkbox.toggled.connect(self.lookup_file_widget.setEnabled)
+        # other layers are written to their fields
+        self.lookup_checkbox.toggled.connect(
+            lambda checked: self.layers_table.setEnabled(not checked)
+        )
+        self.layout.addWidget(self.lookup_file_widget)
+
+        # Resume an interrupted run instead of starting from zero
+        self.resume_checkbox = QCheckBox(self)
+        self.resume_checkbox.setText(self.tr("Resume the previous run on this layer"))
+        self.resume_checkbox.setToolTip(
+            self.tr(
+                "Names resolved before the run was interrupted are not requested "
+                "again, and features which already have a cd_nom are skipped."
+            )
+        )
+        self.resume_checkbox.setChecked(False)
+        self.layout.addWidget(self.resume_checkbox)
+
+        # Delta: only the features added or edited since the last run
+        self.delta_checkbox = QCheckBox(self)
+        self.delta_checkbox.setText(
+            self.tr("Only resolve features added or edited since the last run")
+        )
+        self.delta_checkbox.setToolTip(
+            self.tr(
+                "The GBIF id or name and rank each result was resolved from are "
+                "kept in a taxref_key field, features whose key fields did not "
+                "change are skipped."
+            )
+        )
+        self.delta_checkbox.setChecked(False)
+        self.lookup_checkbox.toggled.connect(
+            lambda checked: self.delta_checkbox.setEnabled(not checked)
+        )
+        self.layout.addWidget(self.delta_checkbox)
         self.layout.insertSpacing(100, 25)
 
         # Accept and reject button box
@@ -231,8 +315,6 @@ class TaxrefCollectorDialog(QDialog):
 
         self.progress_bar = QProgressBar(self)
         self.progress_bar.setValue(0)
-        self.thread = Thread()
-        self.thread._signal.connect(self.signal_accept)
         self.layout.addWidget(self.progress_bar)
 
         # Add layout
@@ -248,6 +330,11 @@ class TaxrefCollectorDialog(QDialog):
         database_check_group.buttonClicked.connect(
             lambda: self.stack.setCurrentIndex(database_check_group.checkedId())
         )
+        database_check_group.buttonClicked.connect(
+            lambda: self.layers_table.setColumnHidden(
+                2, not self.clb_checkbox.isChecked()
+            )
+        )
 
         self.check_valid()
 
@@ -260,45 +347,90 @@ class TaxrefCollectorDialog(QDialog):
         else:
             self.button_box.setEnabled(False)
 
+    def fill_layers_table(self):
+        # List the vector layers of the project other than the selected one
+        current_layer = self.select_layer_combo_box.currentLayer()
+        self.layers_table.setRowCount(0)
+        for layer in self.project.mapLayers().values():
+            if (
+                not isinstance(layer, QgsVectorLayer)
+                or not layer.isSpatial()
+                or layer is current_layer
+            ):
+                continue
+            row = self.layers_table.rowCount()
+            self.layers_table.insertRow(row)
+            item = QTableWidgetItem(layer.name())
+            item.setFlags(Qt.ItemIsEnabled | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Unchecked)
+            item.setData(Qt.UserRole, layer.id())
+            self.layers_table.setItem(row, 0, item)
+            # the key fields of the other layers are all required
+            for column in (1, 2):
+                field_combo_box = QgsFieldComboBox(self.layers_table)
+                field_combo_box.setAllowEmptyFieldName(False)
+                field_combo_box.setLayer(layer)
+                self.layers_table.setCellWidget(row, column, field_combo_box)
+
+    def job_layers(self) -> list:
+        """Other layers checked in the table, with their key fields. A layer
+        missing one of them is left out, with a warning.
+
+        :return: (layer, key_fields) pairs, the key fields being the GBIF id \
+        field, or the name and rank fields
+        :rtype: List[tuple]
+        """
+        job_layers = []
+        for row in range(self.layers_table.rowCount()):
+            item = self.layers_table.item(row, 0)
+            layer = self.project.mapLayer(item.data(Qt.UserRole))
+            if item.checkState() != Qt.Checked or layer is None:
+                continue
+            key_field = self.layers_table.cellWidget(row, 1).currentField()
+            if self.gbif_checkbox.isChecked():
+                key_fields = (key_field,)
+            else:
+                rank_field = self.layers_table.cellWidget(row, 2).currentField()
+                key_fields = (key_field, rank_field)
+            if not all(key_fields):
+                PlgLogger.log(
+                    message=self.tr(
+                        "Layer {} is left out of the run, a key field is missing."
+                    ).format(layer.name()),
+                    log_level=1,
+                    push=True,
+                )
+                continue
+            job_layers.append((layer, key_fields))
+        return job_layers
+
     def open_url(self):
         # Function to open the url of the buttons
         url = QUrl(self.sender().objectName())
         QDesktopServices.openUrl(url)
 
-    def signal_accept(self, msg):
-        # Update the progress bar when result is pressed
-        self.progress_bar.setValue(int(msg))
-        if self.progress_bar.value() == 101:
-            self.progress_bar.setValue(0)
+    def show_progress(self, stats: ProgressStats):
+        # Update the progress bar with the keys resolved by the task
+        self.progress_bar.setValue(int(stats.done / max(1, stats.total) * 100))
+        self.select_progress_bar_label.setText(
+            self.tr(
+                "{}/{} keys, {:.0f} keys/s, {:.0%} without request, "
+                "{} requests in flight, time left {}"
+            ).format(
+                stats.done,
+                stats.total,
+                stats.rate,
+                stats.hit_ratio,
+                stats.in_flight,
+                format_duration(stats.eta),
+            )
+        )
+
+    def reset_progress(self):
+        self.progress_bar.setValue(0)
+        self.select_progress_bar_label.setText("")
 
     def activate_window(self):
         # Put the dialog on top once the rectangle is drawn
         self.showNormal()
         self.activateWindow()
-
-
-class Thread(QThread):
-    """Thread used fot the ProgressBar"""
-
-    _signal = pyqtSignal(int)
-
-    def __init__(self):
-        super(Thread, self).__init__()
-        self.max_value = 1
-        self.value = 0
-
-    def __del__(self):
-        self.wait()
-
-    def set_max(self, max_value):
-        self.max_value = max_value
-
-    def add_one(self, to_add):
-        self.value = self.value + to_add
-        self._signal.emit(int((self.value / self.max_value) * 100))
-
-    def finish(self):
-        self._signal.emit(101)
-
-    def reset_value(self):
-        self.value = 0
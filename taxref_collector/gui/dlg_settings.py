@@ -15,7 +15,9 @@ from qgis.core import Qgis, QgsApplication
 from qgis.gui import QgsOptionsPageWidget, QgsOptionsWidgetFactory
 from qgis.PyQt import uic
 from qgis.PyQt.Qt import QUrl
+from qgis.PyQt.QtCore import Qt
 from qgis.PyQt.QtGui import QDesktopServices, QIcon
+from qgis.PyQt.QtWidgets import QFileDialog
 
 # project
 from taxref_collector.__about__ import (
@@ -25,7 +27,12 @@ from taxref_collector.__about__ import (
     __uri_tracker__,
     __version__,
 )
-from taxref_collector.toolbelt import PlgLogger, PlgOptionsManager
+from taxref_collector.core import TaxrefStore, parse_rank_parents
+from taxref_collector.toolbelt import (
+    PlgLogger,
+    PlgOptionsManager,
+    get_taxref_store_path,
+)
 from taxref_collector.toolbelt.preferences import PlgSettingsStructure
 
 # ############################################################################
@@ -85,6 +92,11 @@ class ConfigOptionsPage(FORM_CLASS, QgsOptionsPageWidget):
         self.btn_reset.setIcon(QIcon(QgsApplication.iconPath("mActionUndo.svg")))
         self.btn_reset.pressed.connect(self.reset_settings)
 
+        self.btn_import_taxref.setIcon(
+            QIcon(QgsApplication.iconPath("mActionFileOpen.svg"))
+        )
+        self.btn_import_taxref.pressed.connect(self.import_taxref_release)
+
         # load previously saved settings
         self.load_settings()
 
@@ -98,6 +110,29 @@ class ConfigOptionsPage(FORM_CLASS, QgsOptionsPageWidget):
         settings.debug_mode = self.opt_debug.isChecked()
         settings.version = __version__
 
+        # network
+        settings.max_concurrent_requests = self.opt_max_concurrent_requests.value()
+        settings.max_requests_per_host = self.opt_max_requests_per_host.value()
+        settings.requests_per_second = self.opt_requests_per_second.value()
+        settings.max_retries = self.opt_max_retries.value()
+        settings.adaptive_concurrency = self.opt_adaptive_concurrency.isChecked()
+
+        # cache
+        settings.cache_enabled = self.opt_cache_enabled.isChecked()
+        settings.cache_ttl_days = self.opt_cache_ttl_days.value()
+        settings.cache_negative_ttl_days = self.opt_cache_negative_ttl_days.value()
+
+        # scientific names
+        settings.clb_lean_query = self.opt_clb_lean_query.isChecked()
+        settings.taxref_max_distance = self.opt_taxref_max_distance.value()
+        settings.rank_fallback = self.opt_rank_fallback.isChecked()
+        try:
+            parse_rank_parents(self.opt_rank_parents.text())
+        except ValueError as err:
+            self.log(message=str(err), log_level=2, push=True)
+        else:
+            settings.rank_parents = self.opt_rank_parents.text()
+
         # dump new settings into QgsSettings
         self.plg_settings.save_from_object(settings)
 
@@ -115,6 +150,68 @@ class ConfigOptionsPage(FORM_CLASS, QgsOptionsPageWidget):
         self.opt_debug.setChecked(settings.debug_mode)
         self.lbl_version_saved_value.setText(settings.version)
 
+        # network
+        self.opt_max_concurrent_requests.setValue(settings.max_concurrent_requests)
+        self.opt_max_requests_per_host.setValue(settings.max_requests_per_host)
+        self.opt_requests_per_second.setValue(settings.requests_per_second)
+        self.opt_max_retries.setValue(settings.max_retries)
+        self.opt_adaptive_concurrency.setChecked(settings.adaptive_concurrency)
+
+        # cache
+        self.opt_cache_enabled.setChecked(settings.cache_enabled)
+        self.opt_cache_ttl_days.setValue(settings.cache_ttl_days)
+        self.opt_cache_negative_ttl_days.setValue(settings.cache_negative_ttl_days)
+
+        # scientific names
+        self.opt_clb_lean_query.setChecked(settings.clb_lean_query)
+        self.opt_taxref_max_distance.setValue(settings.taxref_max_distance)
+        self.opt_rank_fallback.setChecked(settings.rank_fallback)
+        self.opt_rank_parents.setText(settings.rank_parents)
+
+        # local TAXREF release
+        release = None
+        if get_taxref_store_path().exists():
+            store = TaxrefStore(get_taxref_store_path())
+            release = store.release
+            store.close()
+        self.lbl_taxref_release_value.setText(release or self.tr("None"))
+
+
+    def import_taxref_release(self):
+        """Import a TAXREF release into the local store used to resolve names \
+        without network."""
+        file_path, _ = QFileDialog.getOpenFileName(
+            self,
+            self.tr("Import a TAXREF release"),
+            "",
+            self.tr("TAXREF release (*.zip *.txt *.tsv)"),
+        )
+        if not file_path:
+            return
+
+        QgsApplication.setOverrideCursor(Qt.WaitCursor)
+        store = TaxrefStore(get_taxref_store_path())
+        try:
+            count = store.import_release(
+                file_path, feedback=lambda count: QgsApplication.processEvents()
+            )
+        except (OSError, ValueError) as err:
+            self.log(
+                message=self.tr("TAXREF import failed: {}").format(err),
+                log_level=2,
+                push=True,
+            )
+        else:
+            self.log(
+                message=self.tr("{} taxa imported from {}").format(count, file_path),
+                log_level=3,
+                push=True,
+            )
+        finally:
+            store.close()
+            QgsApplication.restoreOverrideCursor()
+
+        self.load_settings()
 
     def reset_settings(self):
         """Reset settings to default values (set in preferences.py module)."""
@@ -9,7 +9,7 @@ from functools import partial
 from pathlib import Path
 
 # PyQGIS
-from qgis.core import QgsApplication, QgsField, QgsProject, QgsSettings
+from qgis.core import QgsApplication, QgsExpression, QgsProject, QgsSettings, QgsTask
 from qgis.gui import QgisInterface
 from qgis.PyQt.QtCore import (
     QCoreApplication,
@@ -17,11 +17,10 @@ from qgis.PyQt.QtCore import (
     QObject,
     QTranslator,
     QUrl,
-    QVariant,
     pyqtSignal,
 )
 from qgis.PyQt.QtGui import QDesktopServices, QIcon
-from qgis.PyQt.QtNetwork import QNetworkAccessManager, QNetworkReply, QNetworkRequest
+from qgis.PyQt.QtNetwork import QNetworkReply
 from qgis.PyQt.QtWidgets import QAction, QMessageBox
 
 # project
@@ -33,14 +32,34 @@ from taxref_collector.__about__ import (
     __uri_homepage__,
     __uri_tracker__,
 )
+from taxref_collector.core import (
+    CheckpointJournal,
+    LookupCache,
+    LruCache,
+    TaxrefStore,
+    run_id,
+)
+from taxref_collector.core.cache import DAY
 from taxref_collector.gui.dlg_main import TaxrefCollectorDialog
 from taxref_collector.gui.dlg_settings import PlgOptionsFactory
 from taxref_collector.processing import (
     GetTaxrefFromCLB,
     GetTaxrefFromGBIF,
+    JobLayer,
+    ResolveTask,
     TaxrefCollectorProvider,
 )
-from taxref_collector.toolbelt import PlgLogger
+from taxref_collector.processing.lookup import create_lookup_table, join_lookup_table
+from taxref_collector.processing.writer import fingerprint_field, result_fields
+from taxref_collector.toolbelt import (
+    PlgLogger,
+    PlgOptionsManager,
+    build_request,
+    get_journal_path,
+    get_lookup_cache_path,
+    get_taxref_store_path,
+    new_network_manager,
+)
 
 # ############################################################################
 # ########## Classes ###############
@@ -57,12 +76,20 @@ class TaxrefCollectorPlugin:
         """
         self.iface = iface
         self.project = QgsProject.instance()
-        self.manager = QNetworkAccessManager()
+        self.manager = new_network_manager()
         self.log = PlgLogger().log
         self.provider = None
         self.pluginIsActive = False
         self.url = __service_uri__
         self.action_launch = None
+        self.cache = None
+        self.store = None
+        self.journal = None
+        self.task = None
+        # session-wide cache shared by every run, in front of the persistent one
+        self.memory_cache = LruCache(
+            maxsize=PlgOptionsManager.get_plg_settings().memory_cache_size
+        )
 
         # translation
         # initialize the locale
@@ -176,6 +203,18 @@ class TaxrefCollectorPlugin:
                 self.action_help_plugin_menu_documentation
             )
 
+        # close the lookup cache
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+        self.memory_cache.backend = None
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
         # remove actions
         del self.action_launch
         del self.action_settings
@@ -186,12 +225,52 @@ class TaxrefCollectorPlugin:
         """Main process.
 
         Try to connect to internet, if successfull, the dialog appear.
-        Else an error message appear.
+        Else an error message appear, unless a local TAXREF release was imported.
         """
-        self.internet_checker = InternetChecker(None, self.manager)
+        self.internet_checker = InternetChecker(
+            None, self.manager, offline_fallback=self.open_store() is not None
+        )
         self.internet_checker.finished.connect(self.handle_finished)
         self.internet_checker.ping("https://github.com/")
 
+    def open_cache(self):
+        """Open the persistent lookup cache stored in the QGIS profile folder, \
+        if enabled in the plugin settings.
+
+        :return: lookup cache or None
+        :rtype: Optional[LookupCache]
+        """
+        settings = PlgOptionsManager.get_plg_settings()
+        if not settings.cache_enabled:
+            if self.cache is not None:
+                self.cache.close()
+                self.cache = None
+            return None
+        if self.cache is None:
+            cache_path = get_lookup_cache_path()
+            self.log(message=f"Lookup cache: {cache_path}", log_level=4)
+            self.cache = LookupCache(cache_path)
+        self.cache.ttl = settings.cache_ttl_days * DAY
+        self.cache.negative_ttl = settings.cache_negative_ttl_days * DAY
+        self.cache.max_entries = settings.cache_max_entries
+        return self.cache
+
+    def open_store(self):
+        """Open the local TAXREF release, if one was imported from the plugin \
+        settings.
+
+        :return: local TAXREF or None
+        :rtype: Optional[TaxrefStore]
+        """
+        if self.store is None:
+            store_path = get_taxref_store_path()
+            if not store_path.exists():
+                return None
+            self.store = TaxrefStore(store_path)
+        if self.store.is_empty():
+            return None
+        return self.store
+
     def handle_finished(self):
         # Check if plugin is already launched
         if not self.pluginIsActive:
@@ -216,38 +295,125 @@ class TaxrefCollectorPlugin:
         """
         self.dlg.activate_window()
         layer = self.dlg.select_layer_combo_box.currentLayer()
-        layer.startEditing()
-        layer.addAttribute(QgsField("cd_nom", QVariant.Int, "integer", 10))
-        layer.addAttribute(QgsField("taxref_name", QVariant.String, "string", 254))
-        layer.addAttribute(QgsField("taxref_url", QVariant.String, "string", 254))
-        layer.commitChanges()
-        layer.triggerRepaint()
+        if self.dlg.gbif_checkbox.isChecked():
+            key_fields = ["gbif", self.dlg.select_field_gbif_combo_box.currentField()]
+        else:
+            key_fields = [
+                "clb",
+                self.dlg.select_field_name_combo_box.currentField(),
+                self.dlg.select_field_rank_combo_box.currentField(),
+            ]
+        join_field = key_fields[1]
+        lookup_table = None
+        job_layers = []
+        if self.dlg.lookup_checkbox.isChecked():
+            # the source is left untouched, results go to a joined table
+            try:
+                lookup_table = create_lookup_table(
+                    layer, join_field, self.dlg.lookup_file_widget.filePath() or None
+                )
+            except OSError as err:
+                self.log(
+                    message=self.tr("Lookup table cannot be created: {}").format(err),
+                    log_level=2,
+                    push=True,
+                )
+                self.finished_import()
+                return
+        else:
+            # other layers of the project sharing the run
+            job_layers = [
+                JobLayer(other_layer, other_key_fields)
+                for other_layer, other_key_fields in self.dlg.job_layers()
+            ]
+            fields = result_fields()
+            if self.dlg.delta_checkbox.isChecked():
+                fields.append(fingerprint_field())
+            for edited_layer in [layer] + [job.layer for job in job_layers]:
+                edited_layer.startEditing()
+                for field in fields:
+                    edited_layer.addAttribute(field)
+                edited_layer.commitChanges()
+                edited_layer.triggerRepaint()
+
+        # keys completed by the runs on the same layers and fields
+        run_parts = [layer.source(), *key_fields]
+        for job_layer in job_layers:
+            run_parts.extend([job_layer.layer.source(), *job_layer.key_fields])
+        self.journal = CheckpointJournal(get_journal_path(), run_id(*run_parts))
+        filter_expression = None
+        if not self.dlg.resume_checkbox.isChecked():
+            self.journal.clear()
+        elif lookup_table is None:
+            # evaluated by the provider, e.g. as a SQL WHERE clause
+            filter_expression = "{} IS NULL".format(
+                QgsExpression.quotedColumnRef("cd_nom")
+            )
 
+        settings = PlgOptionsManager.get_plg_settings()
+        self.memory_cache.maxsize = settings.memory_cache_size
+        self.memory_cache.ttl = settings.cache_ttl_days * DAY
+        self.memory_cache.negative_ttl = settings.cache_negative_ttl_days * DAY
+        self.memory_cache.backend = self.open_cache()
+        # The collector is built and run in the thread of the task
         if self.dlg.gbif_checkbox.isChecked():
-            collect_taxref = GetTaxrefFromGBIF(
-                network_manager=self.manager,
-                project=self.project,
-                layer=layer,
-                dlg=self.dlg,
+            collector_factory = partial(
+                GetTaxrefFromGBIF,
                 gbif_id_field=self.dlg.select_field_gbif_combo_box.currentField(),
+                cache=self.memory_cache,
+                journal=self.journal,
+                filter_expression=filter_expression,
             )
         elif self.dlg.clb_checkbox.isChecked():
-            collect_taxref = GetTaxrefFromCLB(
-                network_manager=self.manager,
-                project=self.project,
-                layer=layer,
-                dlg=self.dlg,
+            collector_factory = partial(
+                GetTaxrefFromCLB,
                 field_name=self.dlg.select_field_name_combo_box.currentField(),
                 field_rank=self.dlg.select_field_rank_combo_box.currentField(),
+                cache=self.memory_cache,
+                store=self.open_store(),
+                journal=self.journal,
+                filter_expression=filter_expression,
             )
 
-        collect_taxref.finished_dl.connect(self.finished_import)
+        self.task = ResolveTask(
+            layer,
+            collector_factory,
+            lookup_table=lookup_table,
+            join_field=join_field,
+            delta=self.dlg.delta_checkbox.isChecked(),
+            layers=job_layers,
+        )
+        self.task.progress_updated.connect(self.dlg.show_progress)
+        self.task.taskCompleted.connect(self.finished_import)
+        self.task.taskTerminated.connect(self.finished_import)
+        QgsApplication.taskManager().addTask(self.task)
 
     def finished_import(self):
+        self.log(message=f"Resolver cache: {self.memory_cache.stats()}", log_level=4)
+        if self.task is not None:
+            if self.task.lookup_table is not None:
+                self.project.addMapLayer(self.task.lookup_table)
+                join_lookup_table(
+                    self.task.layer, self.task.lookup_table, self.task.join_field
+                )
+                self.task.layer.triggerRepaint()
+            else:
+                self.project.addMapLayer(self.task.layer)
+            for job_layer in self.task.layers:
+                self.project.addMapLayer(job_layer.layer)
+        if self.journal is not None:
+            if (
+                self.task is not None
+                and self.task.status() == QgsTask.Complete
+                and not self.task.failed
+            ):
+                # every key was resolved, there is nothing to resume
+                self.journal.clear()
+            self.journal.close()
+            self.journal = None
+        self.task = None
         # Once it's finished, the ProgressBar is set back to 0
-        self.dlg.thread.finish()
-        self.dlg.select_progress_bar_label.setText("")
-        self.dlg.thread.reset_value()
+        self.dlg.reset_progress()
         self.dlg.close()
         self.pluginIsActive = False
 
@@ -261,9 +427,10 @@ class InternetChecker(QObject):
 
     finished = pyqtSignal()
 
-    def __init__(self, parent=None, manager=None):
+    def __init__(self, parent=None, manager=None, offline_fallback=False):
         super().__init__(parent)
         self._manager = manager
+        self.offline_fallback = offline_fallback
 
     @property
     def manager(self):
@@ -274,12 +441,22 @@ class InternetChecker(QObject):
         return self._pending_ping
 
     def ping(self, url):
-        qrequest = QNetworkRequest(QUrl(url))
-        reply = self.manager.get(qrequest)
+        reply = self.manager.get(build_request(url))
         reply.finished.connect(lambda: self.handle_finished(reply))
 
     def handle_finished(self, reply):
-        if reply.error() != QNetworkReply.NoError:
+        if reply.error() != QNetworkReply.NoError and self.offline_fallback:
+            # Names can still be resolved with the local TAXREF release.
+            PlgLogger.log(
+                message=self.tr(
+                    "No Internet connection, names are resolved with the local "
+                    "TAXREF release only."
+                ),
+                log_level=1,
+                push=True,
+            )
+            self.finished.emit()
+        elif reply.error() != QNetworkReply.NoError:
             # If the user does not have an internet connexion,
             # the plugin does not launch.
             msg = QMessageBox()
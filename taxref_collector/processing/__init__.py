@@ -1,4 +1,6 @@
 #! python3  # noqa: E265
+from .collector import JobLayer  # noqa: F401
 from .get_taxref_from_clb import GetTaxrefFromCLB  # noqa: F401
 from .get_taxref_from_gbif import GetTaxrefFromGBIF  # noqa: F401
 from .provider import TaxrefCollectorProvider  # noqa: F401
+from .task import ResolveTask  # noqa: F401
@@ -0,0 +1,308 @@
+#! python3  # noqa: E265
+
+"""
+    Processing algorithms resolving the TAXREF names of a layer.
+"""
+
+# PyQGIS
+from qgis.core import (
+    QgsFeature,
+    QgsFeatureSink,
+    QgsFields,
+    QgsProcessing,
+    QgsProcessingAlgorithm,
+    QgsProcessingException,
+    QgsProcessingParameterFeatureSink,
+    QgsProcessingParameterFeatureSource,
+    QgsProcessingParameterField,
+)
+from qgis.PyQt.QtCore import QCoreApplication, QEventLoop, QTimer
+
+# project
+from taxref_collector.core import LookupCache, TaxrefStore
+from taxref_collector.core.cache import DAY
+from taxref_collector.core.taxref_store import taxref_values
+from taxref_collector.processing.get_taxref_from_clb import GetTaxrefFromCLB
+from taxref_collector.processing.get_taxref_from_gbif import GetTaxrefFromGBIF
+from taxref_collector.processing.task import CANCEL_CHECK_MS
+from taxref_collector.processing.writer import result_fields
+from taxref_collector.toolbelt import (
+    PlgOptionsManager,
+    get_lookup_cache_path,
+    get_taxref_store_path,
+    new_network_manager,
+)
+
+# ############################################################################
+# ########## Globals ###############
+# ##################################
+
+# share of the progress bar taken by the resolution, the rest is the output
+RESOLUTION_PROGRESS = 90
+
+# ############################################################################
+# ########## Classes ###############
+# ##################################
+
+
+class ResultHolder:
+    """Writer of a collector run by an algorithm: the results are read from the
+    job table of the collector when the output features are written."""
+
+    def add(self, features_id, taxref_id, taxref_name):
+        pass
+
+    def flush(self) -> bool:
+        return True
+
+
+class ResolveTaxrefAlgorithm(QgsProcessingAlgorithm):
+    """Copy the features of a source to a sink, with the cd_nom, taxref_name and
+    taxref_url fields resolved from their keys.
+
+    The distinct keys are resolved first, once each, by the collector of the
+    subclass, with its own network access manager and event loop. The features
+    are then read a second time and written with the result of their key.
+    """
+
+    INPUT = "INPUT"
+    OUTPUT = "OUTPUT"
+
+    def tr(self, message: str) -> str:
+        return QCoreApplication.translate(self.__class__.__name__, message)
+
+    def group(self) -> str:
+        return self.tr("TAXREF")
+
+    def groupId(self) -> str:
+        return "taxref"
+
+    def initAlgorithm(self, config=None):
+        self.addParameter(
+            QgsProcessingParameterFeatureSource(
+                self.INPUT,
+                self.tr("Input layer"),
+                [QgsProcessing.TypeVector],
+            )
+        )
+        self.init_key_parameters()
+        self.addParameter(
+            QgsProcessingParameterFeatureSink(
+                self.OUTPUT, self.tr("Resolved TAXREF names")
+            )
+        )
+
+    def init_key_parameters(self):
+        """Add the parameters of the fields the keys are built from."""
+        raise NotImplementedError
+
+    def create_collector(self, parameters, context, **kwargs):
+        """Build the collector of the algorithm.
+
+        :param kwargs: network_manager, layer, writer and cache of the collector
+        """
+        raise NotImplementedError
+
+    def open_cache(self):
+        """Open the persistent lookup cache, unless disabled in the settings.
+
+        :return: lookup cache or None
+        :rtype: Optional[LookupCache]
+        """
+        settings = PlgOptionsManager.get_plg_settings()
+        if not settings.cache_enabled:
+            return None
+        return LookupCache(
+            get_lookup_cache_path(),
+            ttl=settings.cache_ttl_days * DAY,
+            negative_ttl=settings.cache_negative_ttl_days * DAY,
+            max_entries=settings.cache_max_entries,
+        )
+
+    def processAlgorithm(self, parameters, context, feedback):
+        source = self.parameterAsSource(parameters, self.INPUT, context)
+        if source is None:
+            raise QgsProcessingException(
+                self.invalidSourceError(parameters, self.INPUT)
+            )
+
+        fields = QgsFields(source.fields())
+        for field in result_fields():
+            if fields.indexFromName(field.name()) == -1:
+                fields.append(field)
+        result_indexes = [
+            fields.indexFromName(field.name()) for field in result_fields()
+        ]
+        sink, dest_id = self.parameterAsSink(
+            parameters,
+            self.OUTPUT,
+            context,
+            fields,
+            source.wkbType(),
+            source.sourceCrs(),
+        )
+        if sink is None:
+            raise QgsProcessingException(self.invalidSinkError(parameters, self.OUTPUT))
+
+        # resolve the distinct keys of the source
+        cache = self.open_cache()
+        try:
+            loop = QEventLoop()
+            network_manager = new_network_manager()
+            collector = self.create_collector(
+                parameters,
+                context,
+                network_manager=network_manager,
+                layer=source,
+                writer=ResultHolder(),
+                cache=cache,
+            )
+            collector.progress_changed.connect(
+                lambda done, key_count: feedback.setProgress(
+                    RESOLUTION_PROGRESS * done / max(1, key_count)
+                )
+            )
+            collector.finished_dl.connect(loop.quit)
+            cancel_timer = QTimer()
+            cancel_timer.timeout.connect(
+                lambda: feedback.isCanceled() and collector.cancel()
+            )
+            cancel_timer.start(CANCEL_CHECK_MS)
+            loop.exec_()
+            cancel_timer.stop()
+        finally:
+            if cache is not None:
+                cache.close()
+        feedback.pushInfo(
+            self.tr("{} keys: {} resolved, {} failed").format(
+                collector.key_count, collector.jobs.resolved, collector.jobs.failed
+            )
+        )
+        if feedback.isCanceled():
+            return {}
+
+        # copy the features with the result of their key
+        feature_count = source.featureCount()
+        step = (100 - RESOLUTION_PROGRESS) / feature_count if feature_count > 0 else 0
+        for current, feature in enumerate(source.getFeatures()):
+            if feedback.isCanceled():
+                break
+            attributes = feature.attributes()
+            attributes.extend([None] * (fields.count() - len(attributes)))
+            key = collector.feature_key(feature)
+            result = collector.result(key) if key is not None else None
+            if result is not None:
+                for index, value in zip(result_indexes, taxref_values(*result)):
+                    attributes[index] = value
+            output = QgsFeature(fields)
+            output.setGeometry(feature.geometry())
+            output.setAttributes(attributes)
+            sink.addFeature(output, QgsFeatureSink.FastInsert)
+            feedback.setProgress(RESOLUTION_PROGRESS + current * step)
+
+        return {self.OUTPUT: dest_id}
+
+
+class ResolveFromGbifIdAlgorithm(ResolveTaxrefAlgorithm):
+    """Resolve the TAXREF names of the features from their GBIF ids."""
+
+    GBIF_ID_FIELD = "GBIF_ID_FIELD"
+
+    def name(self) -> str:
+        return "resolve_from_gbif_id"
+
+    def displayName(self) -> str:
+        return self.tr("Resolve TAXREF from GBIF id")
+
+    def shortHelpString(self) -> str:
+        return self.tr(
+            "Adds the TAXREF cd_nom, name and INPN page of each feature, "
+            "found from the GBIF taxon id of a field. Each distinct id is "
+            "requested once."
+        )
+
+    def createInstance(self):
+        return ResolveFromGbifIdAlgorithm()
+
+    def init_key_parameters(self):
+        self.addParameter(
+            QgsProcessingParameterField(
+                self.GBIF_ID_FIELD,
+                self.tr("GBIF id field"),
+                parentLayerParameterName=self.INPUT,
+            )
+        )
+
+    def create_collector(self, parameters, context, **kwargs):
+        return GetTaxrefFromGBIF(
+            gbif_id_field=self.parameterAsString(
+                parameters, self.GBIF_ID_FIELD, context
+            ),
+            **kwargs,
+        )
+
+
+class ResolveFromNameAlgorithm(ResolveTaxrefAlgorithm):
+    """Resolve the TAXREF names of the features from their scientific names and
+    ranks."""
+
+    NAME_FIELD = "NAME_FIELD"
+    RANK_FIELD = "RANK_FIELD"
+
+    def name(self) -> str:
+        return "resolve_from_scientific_name"
+
+    def displayName(self) -> str:
+        return self.tr("Resolve TAXREF from scientific name")
+
+    def shortHelpString(self) -> str:
+        return self.tr(
+            "Adds the TAXREF cd_nom, name and INPN page of each feature, "
+            "found from its scientific name and rank, in the imported TAXREF "
+            "release first, then through ChecklistBank. Each distinct name is "
+            "looked up once."
+        )
+
+    def createInstance(self):
+        return ResolveFromNameAlgorithm()
+
+    def init_key_parameters(self):
+        self.addParameter(
+            QgsProcessingParameterField(
+                self.NAME_FIELD,
+                self.tr("Scientific name field"),
+                parentLayerParameterName=self.INPUT,
+                type=QgsProcessingParameterField.String,
+            )
+        )
+        self.addParameter(
+            QgsProcessingParameterField(
+                self.RANK_FIELD,
+                self.tr("Rank field"),
+                parentLayerParameterName=self.INPUT,
+                type=QgsProcessingParameterField.String,
+            )
+        )
+
+    def processAlgorithm(self, parameters, context, feedback):
+        # local TAXREF release imported from the plugin settings, if any
+        self.store = None
+        store_path = get_taxref_store_path()
+        if store_path.exists():
+            self.store = TaxrefStore(store_path)
+            if self.store.is_empty():
+                self.store.close()
+                self.store = None
+        try:
+            return super().processAlgorithm(parameters, context, feedback)
+        finally:
+            if self.store is not None:
+                self.store.close()
+
+    def create_collector(self, parameters, context, **kwargs):
+        return GetTaxrefFromCLB(
+            field_name=self.parameterAsString(parameters, self.NAME_FIELD, context),
+            field_rank=self.parameterAsString(parameters, self.RANK_FIELD, context),
+            store=self.store,
+            **kwargs,
+        )
@@ -0,0 +1,411 @@
+#! python3  # noqa: E265
+
+"""
+    Common logic of the TAXREF collectors.
+"""
+
+# standard
+from collections import namedtuple
+
+# PyQGIS
+from qgis.PyQt.QtCore import QObject, pyqtSignal
+from qgis.PyQt.QtNetwork import QNetworkReply
+
+# project
+from taxref_collector.core.delta import FINGERPRINT_FIELD, changed_filter
+from taxref_collector.core.jobs import JobTable
+from taxref_collector.core.resolution import KeyResolution, KeySource
+from taxref_collector.processing.scan import FeatureKeyScanner
+from taxref_collector.processing.scheduler import DownloadScheduler
+from taxref_collector.processing.writer import ResultWriter
+from taxref_collector.toolbelt import PlgLogger, PlgOptionsManager, preconnect
+
+# ############################################################################
+# ########## Globals ###############
+# ##################################
+
+# another layer of a run, whose keys are read from key_fields, e.g. its GBIF id
+# field, or its name and rank fields. Its features are read from source if
+# given, and its results written by writer if given, else to its fields.
+JobLayer = namedtuple(
+    "JobLayer", ["layer", "key_fields", "source", "writer"], defaults=(None, None)
+)
+
+# ############################################################################
+# ########## Classes ###############
+# ##################################
+
+
+class TaxrefCollector(QObject):
+    """Resolve the lookup keys of a layer into TAXREF names.
+
+    The layer is scanned window by window. Its keys are followed by a
+    KeyResolution, the same as the command line's: each distinct key is resolved
+    once, from the key source when possible, else through the download
+    scheduler, and its result is fanned out to every feature sharing it,
+    including features found after the answer arrived. A key is resolved or
+    failed exactly once, and finished_dl is emitted once.
+
+    Subclasses define the key source, the key of a feature, the attributes it is
+    built from and how to set the fields it is read from, how to download a key
+    and how to read its reply, then call start().
+
+    The writer receives the ids of the features of each key, or their values of
+    target_field if given, e.g. for a lookup table joined on that field.
+
+    The keys resolved through the network are recorded in the checkpoint journal
+    if given, and read back from it before the caches, so that an interrupted
+    run resumes where it stopped. filter_expression restricts the scan, e.g. to
+    the features left without cd_nom.
+
+    In delta mode, the fingerprint of the key fields of each feature is written
+    with its result, "no match" included, and only the features never resolved
+    or whose key fields changed since are scanned.
+
+    Other layers, each with its own key fields, can share the run: they are
+    scanned after the layer, one after the other, into the same job table. A
+    taxon found in several layers is resolved once and written to all of them.
+
+    A key without match hands its features over to its parent key, if any, see
+    KeySource.parent_key().
+
+    The collector does not touch any widget: it reports its progress through
+    progress_changed, so that it can run in the thread of a ResolveTask.
+    """
+
+    finished_dl = pyqtSignal()
+    # keys done, keys found so far
+    progress_changed = pyqtSignal(int, int)
+
+    # web service, connected to as soon as the run starts
+    service_url: str = None
+
+    def __init__(
+        self,
+        network_manager=None,
+        project=None,
+        layer=None,
+        cache=None,
+        writer=None,
+        source=None,
+        target_field=None,
+        journal=None,
+        filter_expression=None,
+        delta: bool = False,
+        layers: list = None,
+    ):
+        super().__init__()
+        self.log = PlgLogger().log
+        self.network_manager = network_manager
+        self.project = project
+        self.layer = layer
+        # features are read from the layer unless a thread-safe source is given
+        self.source = source
+        self.target_field = target_field
+        self.filter_expression = filter_expression
+        self.delta = delta
+        self.journal = journal
+        self.cache = cache
+        self.writer = writer or ResultWriter(
+            self.layer, fingerprint_field=FINGERPRINT_FIELD if delta else None
+        )
+        # other layers of the run, see JobLayer
+        self.layers = list(layers or [])
+        # writer of each layer, targets are (layer index, target) pairs when the
+        # run has other layers
+        self.writers = [self.writer] + [
+            job_layer.writer
+            or ResultWriter(
+                job_layer.layer,
+                fingerprint_field=FINGERPRINT_FIELD if delta else None,
+            )
+            for job_layer in self.layers
+        ]
+        self.run_layers = [self.layer] + [job_layer.layer for job_layer in self.layers]
+        self._layer_index = 0
+        self._scan_finished = False
+        self.skipped = 0
+        self._finished = False
+        self._service_down = False
+        # keys of the run, created by start() from the key source
+        self.resolution = None
+
+        self.settings = PlgOptionsManager.get_plg_settings()
+        self.scheduler = DownloadScheduler(
+            network_manager=self.network_manager,
+            max_in_flight=self.settings.max_concurrent_requests,
+            max_per_host=self.settings.max_requests_per_host,
+            requests_per_second=self.settings.requests_per_second,
+            max_retries=self.settings.max_retries,
+            adaptive=self.settings.adaptive_concurrency,
+            parent=self,
+        )
+        self.scheduler.reply_finished.connect(self.handle_reply)
+        self.scheduler.request_dropped.connect(self.handle_dropped)
+        self.scheduler.finished.connect(self.finish)
+
+    @property
+    def jobs(self) -> JobTable:
+        return self.resolution.jobs
+
+    @property
+    def done(self) -> int:
+        return self.resolution.done
+
+    @property
+    def pending_downloads(self) -> int:
+        return self.jobs.pending
+
+    @property
+    def key_count(self) -> int:
+        return len(self.jobs)
+
+    @property
+    def hit_ratio(self) -> float:
+        """Share of the keys resolved without request: from the journal, the \
+        caches or the local TAXREF release."""
+        return self.resolution.hit_ratio
+
+    def start(self):
+        """Start scanning the layer and resolving its keys."""
+        self.resolution = KeyResolution(
+            self.create_key_source(), fetch=self.download, write=self.write
+        )
+        self.progress_changed.emit(0, 0)
+        if self.service_url and self.network_manager is not None:
+            preconnect(self.network_manager, [self.service_url])
+        self.scheduler.start()
+        self.scan()
+
+    def scan(self):
+        """Start scanning the current layer of the run."""
+        fingerprint_fields = None
+        filter_expression = self.filter_expression
+        if self.delta:
+            # sorted, the fields of a fingerprint keep their order across runs
+            fingerprint_fields = sorted(self.scan_attributes())
+            changed = changed_filter(fingerprint_fields)
+            if filter_expression:
+                filter_expression = "({}) AND ({})".format(filter_expression, changed)
+            else:
+                filter_expression = changed
+        self.scanner = FeatureKeyScanner(
+            layer=self.layer,
+            source=self.source,
+            attributes=self.scan_attributes(),
+            key_function=self.feature_key,
+            window_size=self.settings.scan_window_size,
+            target_field=self.target_field,
+            filter_expression=filter_expression,
+            fingerprint_fields=fingerprint_fields,
+            parent=self,
+        )
+        self.scanner.keys_scanned.connect(self.handle_scanned)
+        self.scanner.finished.connect(self.handle_scan_finished)
+        self.scanner.start()
+
+    def cancel(self):
+        """Stop the run: nothing more is scanned nor requested, the keys already \
+        resolved are written and finished_dl is emitted."""
+        self.scanner.stop()
+        self.scheduler.abort()
+        self.finish()
+
+    def layer_fields(self):
+        """Fields of the current layer, read from its source if given: the layer
+        itself is not touched outside of the main thread.
+
+        :return: fields of the layer
+        :rtype: QgsFields
+        """
+        return (self.source if self.source is not None else self.layer).fields()
+
+    def create_key_source(self) -> KeySource:
+        """Return the lookups of the keys without network, reading and filling \
+        the journal and the cache of the run."""
+        raise NotImplementedError
+
+    def scan_attributes(self) -> list:
+        """Names of the fields needed to build the key of a feature."""
+        raise NotImplementedError
+
+    def set_key_fields(self, *key_fields):
+        """Set the fields the keys of the current layer are read from."""
+        raise NotImplementedError
+
+    def feature_key(self, feature):
+        """Return the lookup key of a feature, or None to skip it."""
+        raise NotImplementedError
+
+    def download(self, key):
+        """Queue the request resolving a key."""
+        raise NotImplementedError
+
+    def handle_finished(self, key, reply):
+        """Read the reply of a key and call set_result() or set_failed()."""
+        raise NotImplementedError
+
+    def reply_keys(self, key) -> list:
+        """Lookup keys answered by the reply queued with a scheduler key."""
+        return [key]
+
+    def release(self, key):
+        """Forget a scheduler key once its request is over."""
+
+    def log_reply_error(self, key, reply):
+        """Log the error of a failed request.
+
+        :param key: scheduler key of the request
+        :param reply: failed reply
+        :type reply: QNetworkReply
+        """
+        if reply.error() == QNetworkReply.ServiceUnavailableError:
+            self.log(
+                message=self.tr("Service down: {}").format(reply.errorString()),
+                log_level=2,
+                push=not self._service_down,
+            )
+            self._service_down = True
+        else:
+            self.log(
+                message=self.tr("Request failed for {} (code {}): {}").format(
+                    key, reply.error(), reply.errorString()
+                ),
+                log_level=1,
+            )
+
+    def result(self, key):
+        """Return the result written to the features of a key: that of its \
+        parent key when it has no match.
+
+        :param key: lookup key
+
+        :return: (cd_nom, taxref_name), None if unresolved or without match
+        :rtype: Optional[tuple]
+        """
+        return self.resolution.result(key)
+
+    def handle_scanned(self, pairs):
+        if self.layers:
+            pairs = [
+                (key, (self._layer_index, feature_id)) for key, feature_id in pairs
+            ]
+        self.attach(pairs)
+        self.update_progress()
+
+    def attach(self, pairs):
+        """Attach targets to their keys and resolve the new keys.
+
+        :param pairs: (key, target) pairs
+        :type pairs: list
+        """
+        self.resolution.attach(pairs)
+
+    def handle_reply(self, key, reply):
+        try:
+            self.handle_finished(key, reply)
+        except Exception as err:
+            # an unreadable reply must not leave its keys pending
+            self.log(
+                message=self.tr("Unreadable reply for {}: {}").format(key, err),
+                log_level=2,
+            )
+            for job_key in self.reply_keys(key):
+                self.set_failed(job_key)
+        self.release(key)
+        self.update_progress()
+
+    def handle_dropped(self, key, message: str):
+        for job_key in self.reply_keys(key):
+            self.set_failed(job_key)
+        self.release(key)
+        self.update_progress()
+
+    def handle_scan_finished(self):
+        self.skipped += self.scanner.skipped
+        if self._layer_index < len(self.layers):
+            # the keys already met are not requested again
+            job_layer = self.layers[self._layer_index]
+            self._layer_index += 1
+            self.layer = job_layer.layer
+            self.source = job_layer.source
+            # other layers are identified by their feature ids
+            self.target_field = None
+            self.set_key_fields(*job_layer.key_fields)
+            self.scan()
+            return
+        self._scan_finished = True
+        self.scheduler.close()
+
+    def set_result(self, key, result, from_network: bool = True):
+        """Write the result of a pending key to its features and remember it, \
+        see KeyResolution.set_result().
+
+        :param key: lookup key
+        :param result: (cd_nom, taxref_name), or None if TAXREF has no match
+        :type result: Optional[tuple]
+        :param from_network: record the result in the journal and the cache
+        :type from_network: bool, optional
+        """
+        self.resolution.set_result(key, result, from_network=from_network)
+
+    def write(self, features_id, result):
+        """Hand the result of a key to the writers of its features.
+
+        :param features_id: targets of the features sharing the key
+        :type features_id: list
+        :param result: (cd_nom, taxref_name), or None if TAXREF has no match
+        :type result: Optional[tuple]
+        """
+        if result is None and not self.delta:
+            return
+        # in delta mode, a "no match" is written with its fingerprint
+        values = result or (None, None)
+        if not self.layers:
+            self.writer.add(features_id, *values)
+            return
+        targets = {}
+        for layer_index, target in features_id:
+            targets.setdefault(layer_index, []).append(target)
+        for layer_index, layer_targets in targets.items():
+            self.writers[layer_index].add(layer_targets, *values)
+
+    def set_failed(self, key):
+        """Give up a pending key whose request failed, it is neither written nor \
+        cached.
+
+        :param key: lookup key
+        """
+        self.resolution.set_failed(key)
+
+    def update_progress(self):
+        self.progress_changed.emit(self.done, self.key_count)
+
+    def finish(self):
+        if self._finished:
+            return
+        self._finished = True
+        left = self.resolution.finish()
+        if left:
+            self.log(
+                message=self.tr("{} keys were left unresolved").format(left),
+                log_level=1,
+            )
+        self.log(
+            message=self.tr(
+                "{} keys: {} resolved, {} failed, {} features skipped"
+            ).format(
+                len(self.jobs),
+                self.jobs.resolved,
+                self.jobs.failed,
+                self.skipped,
+            ),
+            log_level=4,
+        )
+        for writer in self.writers:
+            writer.flush()
+        self.resolution.source.commit()
+        if self.project is not None:
+            for layer in self.run_layers:
+                self.project.addMapLayer(layer)
+        self.finished_dl.emit()
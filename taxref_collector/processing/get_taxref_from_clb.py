@@ -1,134 +1,181 @@
-# Import basic libs
-import json
-
 # Import PyQt libs
-from qgis.PyQt.QtCore import QObject, QUrl, pyqtSignal
-from qgis.PyQt.QtNetwork import QNetworkReply, QNetworkRequest
+from qgis.PyQt.QtNetwork import QNetworkReply
+
+# Import plugin libs
+from taxref_collector.core import record_name_key
+from taxref_collector.core.batch_match import build_batch_payload, parse_batch_response
+from taxref_collector.core.clb_search import build_search_url, parse_search_response
+from taxref_collector.core.ranks import RANKS, parse_rank_parents
+from taxref_collector.core.resolution import ClbKeySource
+from taxref_collector.processing.collector import TaxrefCollector
 
 
-class GetTaxrefFromCLB(QObject):
-    finished_dl = pyqtSignal()
-    """Get multiples informations from a getcapabilities request.
-    List all layers available, get the maximal extent of all the Wfs' data."""
+class GetTaxrefFromCLB(TaxrefCollector):
+    """Get the TAXREF names of a layer from its scientific names and ranks,
+    through ChecklistBank."""
+
+    service_url = "https://api.checklistbank.org"
 
     def __init__(
         self,
         network_manager=None,
         project=None,
         layer=None,
-        dlg=None,
         field_name=None,
         field_rank=None,
+        cache=None,
+        store=None,
+        writer=None,
+        source=None,
+        target_field=None,
+        journal=None,
+        filter_expression=None,
+        delta=False,
+        layers=None,
     ):
-        super().__init__()
-        self.network_manager = network_manager
-        self.project = project
-        self.layer = layer
-        self.thread = dlg.thread
-        self.progress_bar = dlg.select_progress_bar_label
+        super().__init__(
+            network_manager=network_manager,
+            project=project,
+            layer=layer,
+            cache=cache,
+            writer=writer,
+            source=source,
+            target_field=target_field,
+            journal=journal,
+            filter_expression=filter_expression,
+            delta=delta,
+            layers=layers,
+        )
+        self.set_key_fields(field_name, field_rank)
+        self.store = store
+        self.batch_match_url = self.settings.batch_match_url
+        self.batch_mode = self.settings.clb_batch_mode and bool(self.batch_match_url)
+        if self.settings.clb_batch_mode and not self.batch_mode:
+            self.log(
+                message=self.tr(
+                    "No bulk matching endpoint set, names are searched one by one"
+                ),
+                log_level=1,
+            )
+        # rank each rank falls back to, see ClbKeySource
+        self.rank_parents = {}
+        if self.settings.rank_fallback:
+            try:
+                self.rank_parents = parse_rank_parents(self.settings.rank_parents)
+            except ValueError as err:
+                self.log(
+                    message=self.tr("Rank fallback disabled: {}").format(err),
+                    log_level=1,
+                )
+
+        # batch index -> keys sent in the batch
+        self._batches = {}
+        self._batch = []
+        self._batch_count = 0
+        self.start()
+
+    @property
+    def iterate_names(self):
+        return self.resolution.fetched
+
+    def create_key_source(self):
+        return ClbKeySource(
+            cache=self.cache,
+            journal=self.journal,
+            store=self.store,
+            max_distance=self.settings.taxref_max_distance,
+            rank_parents=self.rank_parents,
+        )
+
+    def scan_attributes(self):
+        return list(self.rank_columns | {self.field_name, self.field_rank})
+
+    def set_key_fields(self, field_name, field_rank=None):
         self.field_name = field_name
         self.field_rank = field_rank
-        self._pending_downloads = 0
-
-        self.ids = []
-        self.names = []
-        self.rank = []
-
-        for obs in self.layer.getFeatures():
-            self.ids.append(obs.id())
-            self.names.append(obs[obs[self.field_rank].lower()])
-            self.rank.append(obs[self.field_rank])
-        self._pending_downloads = len(self.names)
-        self._iterate_names = 0
-
-        self.thread.set_max(len(self.ids))
-        self.thread.add_one(0)
-        self.progress_bar.setText(
-            self.tr("Downloaded data : " + str(0) + "/" + str(len(self.ids)))
+        # columns holding the name at a rank, see record_name_key()
+        self.rank_columns = {
+            name for name in self.layer_fields().names() if name in RANKS
+        }
+
+    def feature_key(self, feature):
+        return record_name_key(
+            feature, self.field_name, self.field_rank, self.rank_columns
         )
 
-        self.download(self.ids[self._iterate_names], self.rank[self._iterate_names])
+    def download(self, key):
+        if self.batch_mode:
+            self._batch.append(key)
+            if len(self._batch) >= self.settings.batch_size:
+                self.download_batch()
+            return
+        name, rank = key
+        url = build_search_url(name, rank, lean=self.settings.clb_lean_query)
+        self.scheduler.enqueue(key, url)
 
-    @property
-    def pending_downloads(self):
-        return self._pending_downloads
+    def download_batch(self):
+        if not self._batch:
+            return
+        batch_index = self._batch_count
+        self._batch_count += 1
+        self._batches[batch_index] = self._batch
+        self.scheduler.enqueue(
+            batch_index, self.batch_match_url, build_batch_payload(self._batch)
+        )
+        self._batch = []
 
-    @property
-    def iterate_names(self):
-        return self._iterate_names
-
-    def download(self, feature_id, rank):
-        if rank.lower() == "stateofmatter":
-            self._iterate_names += 1
-            self.download(self.ids[self._iterate_names], self.rank[self._iterate_names])
-        else:
-            feature = self.layer.getFeature(feature_id)
-            if rank.lower() == "complex" or rank.lower() == "hybrid":
-                rank = "species"
-            elif rank.lower() == "epifamily" or rank.lower() == "section":
-                rank = "genus"
-            elif rank.lower() == "subtribe":
-                rank = "family"
-            name = feature[rank]
-            url = "https://api.checklistbank.org/nameusage/search?content=SCIENTIFIC_NAME&datasetKey=2008&facet=datasetKey&facet=rank&facet=issue&facet=status&facet=nomStatus&facet=nameType&facet=field&facet=authorship&facet=authorshipYear&facet=extinct&facet=environment&facet=origin&limit=50&offset=0&q={name}&rank={rank}&status=accepted&type=PREFIX".format(  # noqa: E501
-                name=name, rank=rank.lower()
-            )
-            request = QNetworkRequest(QUrl(url))
-            request.setHeader(QNetworkRequest.ContentTypeHeader, "application/json")
-            reply = self.network_manager.get(request)
-            reply.finished.connect(lambda: self.handle_finished(reply, feature_id))
-            self._iterate_names += 1
-
-    def handle_finished(self, reply, feature_id):
-        self._pending_downloads -= 1
+    def handle_scan_finished(self):
+        self.download_batch()
+        super().handle_scan_finished()
+
+    def finish(self):
+        if not self._finished:
+            # misspelled names matched to the nearest name of the local release
+            approximate = self.resolution.source.approximate
+            for (name, rank), (taxref_name, distance) in approximate.items():
+                self.log(
+                    message=self.tr(
+                        "Approximate match: {} ({}) -> {}, distance {}"
+                    ).format(name, rank, taxref_name, distance),
+                    log_level=1,
+                )
+        super().finish()
+
+    def handle_finished(self, key, reply):
+        if self.batch_mode:
+            self.handle_batch_finished(key, reply)
+            return
         if reply.error() != QNetworkReply.NoError:
-            print(f"code: {reply.error()} message: {reply.errorString()}")
-            if reply.error() == 403:
-                print("Service down")
-        else:
-            data_request = reply.readAll().data().decode()
-            if data_request != "":
-                res = json.loads(data_request)
-                if res["total"] == 1:
-                    if "result" in res:
-                        taxref_id = res["result"][0]["id"]
-                        taxref_name = res["result"][0]["usage"]["label"]
-                        self.layer.startEditing()
-                        self.layer.changeAttributeValue(
-                            feature_id,
-                            self.layer.fields().indexFromName("cd_nom"),
-                            taxref_id,
-                        )
-                        self.layer.changeAttributeValue(
-                            feature_id,
-                            self.layer.fields().indexFromName("taxref_name"),
-                            taxref_name,
-                        )
-                        self.layer.changeAttributeValue(
-                            feature_id,
-                            self.layer.fields().indexFromName("taxref_url"),
-                            "https://inpn.mnhn.fr/espece/cd_nom/{cd_nom}".format(
-                                cd_nom=taxref_id
-                            ),
-                        )
-                        self.layer.commitChanges()
-                        self.layer.triggerRepaint()
-                else:
-                    print(res)
-                if self.pending_downloads == 0:
-                    self.project.addMapLayer(self.layer)
-                    self.finished_dl.emit()
-                else:
-                    self.thread.set_max(len(self.ids))
-                    self.thread.add_one(1)
-                    self.progress_bar.setText(
-                        self.tr(
-                            "Downloaded data : "
-                            + str(self.thread.value)
-                            + "/"
-                            + str(len(self.ids))
-                        )
-                    )
-                    self.download(
-                        self.ids[self._iterate_names], self.rank[self._iterate_names]
-                    )
+            self.log_reply_error(key, reply)
+            self.set_failed(key)
+            return
+
+        self.set_result(key, parse_search_response(reply.readAll().data()))
+
+    def reply_keys(self, key):
+        if self.batch_mode:
+            return self._batches.get(key, [])
+        return super().reply_keys(key)
+
+    def release(self, key):
+        if self.batch_mode:
+            self._batches.pop(key, None)
+
+    def handle_batch_finished(self, batch_index, reply):
+        batch = self._batches[batch_index]
+        if reply.error() != QNetworkReply.NoError:
+            self.log_reply_error(batch_index, reply)
+            for key in batch:
+                self.set_failed(key)
+            return
+
+        results = parse_batch_response(reply.readAll().data(), batch)
+        for key in batch:
+            if key in results:
+                self.set_result(key, results[key])
+            else:
+                # left unanswered, not remembered as a "no match"
+                self.set_failed(key)
+        if self._scan_finished:
+            # parents of the names without match, no other batch would send them
+            self.download_batch()
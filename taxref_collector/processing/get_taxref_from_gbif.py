@@ -1,130 +1,99 @@
-# Import basic libs
-import json
-
 # Import PyQt libs
-from qgis.PyQt.QtCore import QObject, QUrl, pyqtSignal
-from qgis.PyQt.QtNetwork import QNetworkReply, QNetworkRequest
+from qgis.PyQt.QtNetwork import QNetworkReply
+
+# Import plugin libs
+from taxref_collector.core.gbif_related import (
+    GBIF_API_URL,
+    build_related_url,
+    gbif_key,
+    parse_related_response,
+)
+from taxref_collector.core.resolution import GbifKeySource
+from taxref_collector.processing.collector import TaxrefCollector
 
 
-class GetTaxrefFromGBIF(QObject):
-    finished_dl = pyqtSignal()
-    """Get multiples informations from a getcapabilities request.
-    List all layers available, get the maximal extent of all the Wfs' data."""
+class GetTaxrefFromGBIF(TaxrefCollector):
+    """Get the TAXREF names of a layer from its GBIF ids."""
+
+    service_url = GBIF_API_URL
 
     def __init__(
         self,
         network_manager=None,
         project=None,
         layer=None,
-        dlg=None,
         gbif_id_field=None,
+        cache=None,
+        writer=None,
+        source=None,
+        target_field=None,
+        journal=None,
+        filter_expression=None,
+        delta=False,
+        layers=None,
     ):
-        super().__init__()
-        self.network_manager = network_manager
-        self.project = project
-        self.layer = layer
-        self.thread = dlg.thread
-        self.progress_bar = dlg.select_progress_bar_label
-        self.gbif_id_field = gbif_id_field
-        self._pending_downloads = 0
-
-        self.ids = {}
+        super().__init__(
+            network_manager=network_manager,
+            project=project,
+            layer=layer,
+            cache=cache,
+            writer=writer,
+            source=source,
+            target_field=target_field,
+            journal=journal,
+            filter_expression=filter_expression,
+            delta=delta,
+            layers=layers,
+        )
+        self.set_key_fields(gbif_id_field)
+        # GBIF id -> first non accepted TAXREF usage met, while paging
+        self._pages = {}
+        self.start()
 
-        for feature in self.layer.getFeatures():
-            if feature[self.gbif_id_field] not in self.ids:
-                self.ids[feature[self.gbif_id_field]] = [feature.id()]
-            else:
-                self.ids[feature[self.gbif_id_field]].append(feature.id())
-        self._pending_downloads = len(self.ids)
-        self._iterate_ids = 0
+    @property
+    def iterate_ids(self):
+        return self.resolution.fetched
 
-        self.thread.set_max(len(self.ids))
-        self.thread.add_one(0)
-        self.progress_bar.setText(
-            self.tr("Downloaded data : " + str(0) + "/" + str(len(self.ids)))
-        )
+    def create_key_source(self):
+        return GbifKeySource(cache=self.cache, journal=self.journal)
 
-        self.download(list(self.ids.keys())[self._iterate_ids])
+    def scan_attributes(self):
+        return [self.gbif_id_field]
 
-    @property
-    def pending_downloads(self):
-        return self._pending_downloads
+    def set_key_fields(self, gbif_id_field):
+        self.gbif_id_field = gbif_id_field
 
-    @property
-    def iterate_ids(self):
-        return self._iterate_ids
+    def feature_key(self, feature):
+        return gbif_key(feature[self.gbif_id_field])
 
-    def download(self, gbif_id):
-        features_id = self.ids[gbif_id]
-        url = "https://www.gbif.org/api/species/{gbif_id}/checklistdatasets?limit=100".format(
-            gbif_id=gbif_id
-        )
-        request = QNetworkRequest(QUrl(url))
-        request.setHeader(QNetworkRequest.ContentTypeHeader, "application/json")
-        reply = self.network_manager.get(request)
-        reply.finished.connect(lambda: self.handle_finished(reply, features_id))
-        self._iterate_ids += 1
+    def download(self, gbif_id, offset: int = 0):
+        self.scheduler.enqueue(gbif_id, build_related_url(gbif_id, offset=offset))
 
-    def handle_finished(self, reply, features_id):
-        self._pending_downloads -= 1
+    def handle_finished(self, gbif_id, reply):
+        # Replies may arrive in any order, the GBIF id they answer
+        # is relayed by the scheduler.
         if reply.error() != QNetworkReply.NoError:
-            print(f"code: {reply.error()} message: {reply.errorString()}")
-            if reply.error() == 403:
-                print("Service down")
+            self.log_reply_error(gbif_id, reply)
+            self.set_failed(gbif_id)
+            return
+
+        match, accepted, next_offset = parse_related_response(reply.readAll().data())
+        fallback = self._pages.pop(gbif_id, None)
+        if accepted:
+            self.set_result(gbif_id, match)
+        elif next_offset is not None:
+            # TAXREF usages are spread over several pages
+            self._pages[gbif_id] = fallback or match
+            self.download(gbif_id, offset=next_offset)
         else:
-            data_request = reply.readAll().data().decode()
-            if data_request != "":
-                res = json.loads(data_request)
-                if "results" in res:
-                    for elem in res["results"]:
-                        if "TAXREF" in [
-                            elem["title"] for elem in res["results"] if "title" in elem
-                        ]:
-                            if elem["title"] == "TAXREF":
-                                taxref_id = elem["_relatedTaxon"]["taxonID"]
-                                taxref_name = elem["_relatedTaxon"]["scientificName"]
-                                self.layer.startEditing()
-                                for feature_id in features_id:
-                                    self.layer.changeAttributeValue(
-                                        feature_id,
-                                        self.layer.fields().indexFromName("cd_nom"),
-                                        taxref_id,
-                                    )
-                                    self.layer.changeAttributeValue(
-                                        feature_id,
-                                        self.layer.fields().indexFromName(
-                                            "taxref_name"
-                                        ),
-                                        taxref_name,
-                                    )
-                                    self.layer.changeAttributeValue(
-                                        feature_id,
-                                        self.layer.fields().indexFromName("taxref_url"),
-                                        "https://inpn.mnhn.fr/espece/cd_nom/{cd_nom}".format(
-                                            cd_nom=taxref_id
-                                        ),
-                                    )
+            self.set_result(gbif_id, fallback or match)
+
+    def set_failed(self, gbif_id):
+        # failed, unreadable or dropped while paging
+        self._pages.pop(gbif_id, None)
+        super().set_failed(gbif_id)
 
-                                self.layer.commitChanges()
-                                self.layer.triggerRepaint()
-                            else:
-                                pass
-                        else:
-                            print("ERREUR no TAXREF")
-                else:
-                    pass
-                if self.pending_downloads == 0:
-                    self.project.addMapLayer(self.layer)
-                    self.finished_dl.emit()
-                else:
-                    self.thread.set_max(len(self.ids))
-                    self.thread.add_one(1)
-                    self.progress_bar.setText(
-                        self.tr(
-                            "Downloaded data : "
-                            + str(self.thread.value)
-                            + "/"
-                            + str(len(self.ids))
-                        )
-                    )
-                    self.download(list(self.ids.keys())[self._iterate_ids])
+    def finish(self):
+        # pages of the GBIF ids left pending, e.g. when the run is cancelled
+        self._pages.clear()
+        super().finish()
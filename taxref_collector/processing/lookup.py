@@ -0,0 +1,132 @@
+#! python3  # noqa: E265
+
+"""
+    Lookup table of the resolved TAXREF values, joined to the source layer.
+"""
+
+# standard
+from pathlib import Path
+from typing import Union
+
+# PyQGIS
+from qgis.core import (
+    QgsCoordinateReferenceSystem,
+    QgsCoordinateTransformContext,
+    QgsField,
+    QgsFields,
+    QgsVectorFileWriter,
+    QgsVectorLayer,
+    QgsVectorLayerJoinInfo,
+    QgsWkbTypes,
+)
+
+# project
+from taxref_collector.processing.writer import result_fields
+
+# ############################################################################
+# ########## Functions #############
+# ##################################
+
+
+def lookup_fields(layer, join_field: str) -> QgsFields:
+    """Fields of the lookup table of a layer.
+
+    :param layer: source layer
+    :type layer: QgsVectorLayer
+    :param join_field: field of the layer the table is joined on
+    :type join_field: str
+
+    :return: join field, with the type it has in the layer, and result fields
+    :rtype: QgsFields
+    """
+    fields = QgsFields()
+    fields.append(QgsField(layer.fields().field(join_field)))
+    for field in result_fields():
+        fields.append(field)
+    return fields
+
+
+def create_lookup_table(
+    layer, join_field: str, path: Union[Path, str] = None
+) -> QgsVectorLayer:
+    """Create the empty lookup table of a layer, without geometry.
+
+    :param layer: source layer
+    :type layer: QgsVectorLayer
+    :param join_field: field of the layer the table is joined on
+    :type join_field: str
+    :param path: GeoPackage the table is written to, a memory layer if None
+    :type path: Union[Path, str], optional
+
+    :raises OSError: the GeoPackage table cannot be created
+
+    :return: lookup table
+    :rtype: QgsVectorLayer
+    """
+    name = "{} TAXREF".format(layer.name())
+    fields = lookup_fields(layer, join_field)
+    if path is None:
+        table = QgsVectorLayer("None", name, "memory")
+        table.dataProvider().addAttributes(fields.toList())
+        table.updateFields()
+        return table
+
+    options = QgsVectorFileWriter.SaveVectorOptions()
+    options.driverName = "GPKG"
+    options.layerName = name
+    if Path(path).exists():
+        options.actionOnExistingFile = QgsVectorFileWriter.CreateOrOverwriteLayer
+    writer = QgsVectorFileWriter.create(
+        str(path),
+        fields,
+        QgsWkbTypes.NoGeometry,
+        QgsCoordinateReferenceSystem(),
+        QgsCoordinateTransformContext(),
+        options,
+    )
+    if writer.hasError() != QgsVectorFileWriter.NoError:
+        raise OSError(writer.errorMessage())
+    # the table is created once the writer is deleted
+    del writer
+    table = QgsVectorLayer("{}|layername={}".format(path, name), name, "ogr")
+    if not table.isValid():
+        raise OSError("{} cannot be opened".format(path))
+    return table
+
+
+def join_lookup_table(layer, table, join_field: str) -> bool:
+    """Join the result fields of a lookup table to a layer.
+
+    The joined fields keep their names: cd_nom, taxref_name and taxref_url. A join
+    of the layer on the same field providing them, left by a previous run with its
+    own table, is replaced.
+
+    :param layer: source layer
+    :type layer: QgsVectorLayer
+    :param table: lookup table, added to the project
+    :type table: QgsVectorLayer
+    :param join_field: field of the layer and of the table the join is made on
+    :type join_field: str
+
+    :return: True if the join was added
+    :rtype: bool
+    """
+    join = QgsVectorLayerJoinInfo()
+    join.setJoinLayer(table)
+    join.setJoinFieldName(join_field)
+    join.setTargetFieldName(join_field)
+    join.setJoinFieldNamesSubset([field.name() for field in result_fields()])
+    join.setPrefix("")
+    join.setUsingMemoryCache(True)
+
+    # the fields of a previous join would hide those of the new one
+    names = set(join.joinFieldNamesSubset())
+    for existing in layer.vectorJoins():
+        if existing.targetFieldName() != join_field:
+            continue
+        provided = existing.joinFieldNamesSubset()
+        if not provided and existing.joinLayer() is not None:
+            provided = existing.joinLayer().fields().names()
+        if names.intersection(provided or ()):
+            layer.removeJoin(existing.joinLayerId())
+    return layer.addJoin(join)
@@ -11,6 +11,10 @@ from qgis.PyQt.QtGui import QIcon
 
 # project
 from taxref_collector.__about__ import __icon_path__, __title__, __version__
+from taxref_collector.processing.algorithms import (
+    ResolveFromGbifIdAlgorithm,
+    ResolveFromNameAlgorithm,
+)
 
 # ############################################################################
 # ########## Classes ###############
@@ -24,7 +28,8 @@ class TaxrefCollectorProvider(QgsProcessingProvider):
 
     def loadAlgorithms(self):
         """Loads all algorithms belonging to this provider."""
-        pass
+        self.addAlgorithm(ResolveFromGbifIdAlgorithm())
+        self.addAlgorithm(ResolveFromNameAlgorithm())
 
     def id(self) -> str:
         """Unique provider id, used for identifying it. This string should be unique, \
@@ -0,0 +1,128 @@
+#! python3  # noqa: E265
+
+"""
+    Streaming extraction of the lookup keys of a layer.
+"""
+
+# standard
+from typing import Callable, List
+
+# PyQGIS
+from qgis.core import QgsFeatureRequest
+from qgis.PyQt.QtCore import QObject, QTimer, pyqtSignal
+
+# project
+from taxref_collector.core.delta import fingerprint
+
+# ############################################################################
+# ########## Classes ###############
+# ##################################
+
+
+class FeatureKeyScanner(QObject):
+    """Read the lookup key of every feature of a layer, window by window.
+
+    Only the attributes needed to build the keys are fetched, without geometry.
+    Each window is read from the event loop, so that the replies of the keys
+    found in the previous windows are handled while the scan goes on.
+
+    :param layer: layer to scan
+    :type layer: QgsVectorLayer
+    :param source: thread-safe source of the layer features, to scan it outside \
+    of the main thread, defaults to the layer itself
+    :type source: QgsVectorLayerFeatureSource, optional
+    :param attributes: names of the fields needed to build a key
+    :type attributes: List[str]
+    :param key_function: returns the key of a feature, or None to skip it
+    :type key_function: Callable
+    :param window_size: number of features read at once
+    :type window_size: int, optional
+    :param target_field: field whose value is emitted with each key instead of \
+    the feature id, e.g. the join field of a lookup table
+    :type target_field: str, optional
+    :param filter_expression: expression the scanned features match, evaluated \
+    by the provider when it can, e.g. '"cd_nom" IS NULL' to resume a run
+    :type filter_expression: str, optional
+    :param fingerprint_fields: fields whose fingerprint is emitted with each \
+    feature id, as an (id, fingerprint) target
+    :type fingerprint_fields: List[str], optional
+    """
+
+    keys_scanned = pyqtSignal(list)
+    finished = pyqtSignal()
+
+    def __init__(
+        self,
+        layer=None,
+        source=None,
+        attributes: List[str] = None,
+        key_function: Callable = None,
+        window_size: int = 5000,
+        target_field: str = None,
+        filter_expression: str = None,
+        fingerprint_fields: List[str] = None,
+        parent=None,
+    ):
+        super().__init__(parent)
+        self.layer = layer
+        self.source = source if source is not None else layer
+        self.key_function = key_function
+        self.window_size = max(1, window_size)
+        self.target_field = target_field
+        self.fingerprint_fields = fingerprint_fields
+        self.scanned = 0
+        # features without key
+        self.skipped = 0
+
+        self.request = QgsFeatureRequest()
+        self.request.setFlags(QgsFeatureRequest.NoGeometry)
+        attributes = list(attributes or [])
+        for field in [target_field, *(fingerprint_fields or [])]:
+            if field is not None and field not in attributes:
+                attributes.append(field)
+        # the fields of a source were copied from the layer in the main thread
+        self.request.setSubsetOfAttributes(attributes, self.source.fields())
+        if filter_expression:
+            self.request.setFilterExpression(filter_expression)
+        self._iterator = None
+
+    def start(self):
+        """Start the scan from the event loop."""
+        self._iterator = self.source.getFeatures(self.request)
+        QTimer.singleShot(0, self._scan_window)
+
+    def stop(self):
+        """Stop the scan, finished is not emitted."""
+        self._iterator = None
+
+    def _scan_window(self):
+        if self._iterator is None:
+            return
+        pairs = []
+        exhausted = True
+        for feature in self._iterator:
+            key = self.key_function(feature)
+            if key is None:
+                self.skipped += 1
+            elif self.target_field is not None:
+                pairs.append((key, feature[self.target_field]))
+            elif self.fingerprint_fields:
+                values = (feature[field] for field in self.fingerprint_fields)
+                pairs.append((key, (feature.id(), fingerprint(values))))
+            else:
+                pairs.append((key, feature.id()))
+            self.scanned += 1
+            if self.scanned % self.window_size == 0:
+                exhausted = False
+                break
+
+        if pairs:
+            if self.target_field is not None:
+                # features sharing a value are only sent once per window
+                pairs = list(dict.fromkeys(pairs))
+            self.keys_scanned.emit(pairs)
+        if exhausted:
+            self._iterator = None
+            self.finished.emit()
+        else:
+            QTimer.singleShot(0, self._scan_window)
@@ -0,0 +1,385 @@
+#! python3  # noqa: E265
+
+"""
+    Bounded-concurrency download scheduler.
+"""
+
+# standard
+import heapq
+import time
+from collections import deque
+from itertools import count
+
+# PyQGIS
+from qgis.PyQt.QtCore import QObject, QTimer, QUrl, pyqtSignal
+from qgis.PyQt.QtNetwork import QNetworkReply, QNetworkRequest
+
+# project
+from taxref_collector.core.throttle import (
+    RETRY_HTTP_STATUS,
+    AimdController,
+    CircuitBreaker,
+    TokenBucket,
+    parse_retry_after,
+    retry_delay,
+)
+from taxref_collector.toolbelt import PlgLogger, build_request
+
+# ############################################################################
+# ########## Globals ###############
+# ##################################
+
+# QNetworkAccessManager opens at most 6 parallel HTTP/1.1 connections per host,
+# anything above this limit would only wait in Qt's internal queue.
+HTTP1_CONNECTIONS_PER_HOST = 6
+
+# network errors worth a new attempt, HTTP errors are told by their status
+RETRY_NETWORK_ERRORS = (
+    QNetworkReply.RemoteHostClosedError,
+    QNetworkReply.TimeoutError,
+    QNetworkReply.OperationCanceledError,
+    QNetworkReply.TemporaryNetworkFailureError,
+    QNetworkReply.NetworkSessionFailedError,
+    QNetworkReply.ProxyTimeoutError,
+    QNetworkReply.UnknownNetworkError,
+)
+
+# ############################################################################
+# ########## Classes ###############
+# ##################################
+
+
+class DownloadScheduler(QObject):
+    """Keep a bounded number of requests in flight.
+
+    Requests are queued by host and dispatched as soon as a slot is available,
+    both globally (max_in_flight) and for their host (max_per_host). Each reply
+    is relayed with the key it was queued with, so callers do not depend on the
+    order in which replies arrive. Requests can be queued until close() is
+    called, finished is then emitted once the queue is drained.
+
+    Each host is also limited to requests_per_second by a token bucket. Requests
+    throttled (429), failed on the server side (5xx) or timed out are sent again
+    up to max_retries times, after the Retry-After delay of the reply or an
+    exponential backoff with jitter. A host failing repeatedly is paused by a
+    circuit breaker, and its queue is dropped if it keeps failing after
+    max_retries pauses: request_dropped is then emitted for each of its requests.
+
+    With adaptive set, the number of requests in flight for a host starts at
+    half max_per_host and moves between 1 and the connections Qt opens for a
+    host, following the latency and the errors of its replies: max_per_host is
+    then a starting point rather than a limit.
+
+    Once a host answered over HTTP/2, its requests share one multiplexed
+    connection and the number of its requests in flight is only limited by
+    max_in_flight.
+    """
+
+    reply_finished = pyqtSignal(object, QNetworkReply)
+    request_dropped = pyqtSignal(object, str)
+    finished = pyqtSignal()
+
+    def __init__(
+        self,
+        network_manager=None,
+        max_in_flight: int = 12,
+        max_per_host: int = HTTP1_CONNECTIONS_PER_HOST,
+        requests_per_second: float = 10.0,
+        max_retries: int = 3,
+        breaker_threshold: int = 5,
+        breaker_cooldown: float = 30.0,
+        adaptive: bool = True,
+        parent=None,
+    ):
+        super().__init__(parent)
+        self.log = PlgLogger().log
+        self.network_manager = network_manager
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_per_host = max(1, min(max_per_host, HTTP1_CONNECTIONS_PER_HOST))
+        self.requests_per_second = requests_per_second
+        self.max_retries = max(0, max_retries)
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.adaptive = adaptive
+
+        # host -> TokenBucket / CircuitBreaker / AimdController
+        self._buckets = {}
+        self._breakers = {}
+        self._controllers = {}
+        # hosts which answered over HTTP/2
+        self._http2_hosts = set()
+        # host -> monotonic time before which it must not be requested
+        self._paused_until = {}
+        # requests waiting for their retry: (due time, order, host, request)
+        self._delayed = []
+        self._order = count()
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._dispatch)
+        self.retries = 0
+
+        self._queues = {}
+        # reply -> (host, key), also keeps the replies alive until they finish
+        self._replies = {}
+        self._in_flight = 0
+        self._in_flight_by_host = {}
+        self._started = False
+        self._closed = False
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self._queues.values()) + len(self._delayed)
+
+    def enqueue(self, key, url: str, data: bytes = None):
+        """Add a request to the queue, a GET or a POST if data is given.
+
+        :param key: identifier relayed with the reply
+        :param url: URL to request
+        :type url: str
+        :param data: JSON body to post
+        :type data: bytes, optional
+        """
+        qurl = QUrl(url)
+        host = qurl.host()
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.requests_per_second)
+            self._breakers[host] = CircuitBreaker(
+                self.breaker_threshold, self.breaker_cooldown
+            )
+            if self.adaptive:
+                # probe the service from below the static limit
+                self._controllers[host] = AimdController(
+                    initial=max(1, self.max_per_host // 2),
+                    maximum=HTTP1_CONNECTIONS_PER_HOST,
+                )
+        self._queues.setdefault(host, deque()).append((key, qurl, data, 0))
+        if self._started:
+            self._dispatch()
+
+    def start(self):
+        """Start dispatching queued requests from the event loop, so that the
+        signals are connected before the first reply, or the end of an empty run,
+        is emitted."""
+        self._started = True
+        QTimer.singleShot(0, self._dispatch)
+
+    def close(self):
+        """Tell that no more request will be queued."""
+        self._closed = True
+        if self._started:
+            self._dispatch()
+
+    def abort(self):
+        """Give up the queued requests and abort the requests in flight, their \
+        replies are not relayed. finished is then emitted."""
+        self._closed = True
+        self._queues.clear()
+        self._delayed.clear()
+        self._timer.stop()
+        replies, self._replies = self._replies, {}
+        for reply in replies:
+            reply.finished.disconnect(self._handle_finished)
+            reply.abort()
+            reply.deleteLater()
+        self._in_flight = 0
+        self._in_flight_by_host.clear()
+        self._dispatch()
+
+    def host_limit(self, host: str) -> int:
+        """Number of requests which can be in flight for a host."""
+        if host in self._controllers:
+            return min(self.max_in_flight, self._controllers[host].limit)
+        if host in self._http2_hosts:
+            return self.max_in_flight
+        return self.max_per_host
+
+    def _dispatch(self):
+        now = time.monotonic()
+        while self._delayed and self._delayed[0][0] <= now:
+            _, _, host, request = heapq.heappop(self._delayed)
+            self._queues.setdefault(host, deque()).appendleft(request)
+
+        # seconds until the next request which cannot be sent now
+        wake_in = None
+        for host in list(self._queues):
+            queue = self._queues[host]
+            breaker = self._breakers[host]
+            bucket = self._buckets[host]
+            host_limit = self.host_limit(host)
+            while (
+                queue
+                and self._in_flight < self.max_in_flight
+                and self._in_flight_by_host.get(host, 0) < host_limit
+            ):
+                wait = max(
+                    self._paused_until.get(host, 0) - now,
+                    breaker.retry_in(),
+                    bucket.wait_time(),
+                )
+                if wait > 0:
+                    wake_in = wait if wake_in is None else min(wake_in, wait)
+                    break
+                if not breaker.allow():
+                    # the trial request of a paused host is in flight
+                    break
+                bucket.take()
+                self._send(host, *queue.popleft())
+            if not queue:
+                del self._queues[host]
+
+        if self._delayed:
+            wait = self._delayed[0][0] - now
+            wake_in = wait if wake_in is None else min(wake_in, wait)
+        if wake_in is not None:
+            self._wake(wake_in)
+
+        if (
+            self._closed
+            and self._in_flight == 0
+            and not self._queues
+            and not self._delayed
+        ):
+            self._started = False
+            self._closed = False
+            self.finished.emit()
+
+    def _wake(self, delay: float):
+        msec = max(1, int(delay * 1000) + 1)
+        if not self._timer.isActive() or self._timer.remainingTime() > msec:
+            self._timer.start(msec)
+
+    def _send(self, host: str, key, qurl: QUrl, data: bytes = None, attempt: int = 0):
+        self._in_flight += 1
+        self._in_flight_by_host[host] = self._in_flight_by_host.get(host, 0) + 1
+        if data is None:
+            reply = self.network_manager.get(build_request(qurl))
+        else:
+            reply = self.network_manager.post(
+                build_request(qurl, content_type="application/json"), data
+            )
+        self._replies[reply] = (host, (key, qurl, data, attempt), time.monotonic())
+        reply.finished.connect(self._handle_finished)
+
+    def _handle_finished(self):
+        reply = self.sender()
+        host, request, sent_at = self._replies.pop(reply)
+        key, qurl, data, attempt = request
+        self._in_flight -= 1
+        self._in_flight_by_host[host] -= 1
+        try:
+            if host not in self._http2_hosts and reply.attribute(
+                QNetworkRequest.Http2WasUsedAttribute
+            ):
+                self._use_http2(host)
+            status = reply.attribute(QNetworkRequest.HttpStatusCodeAttribute)
+            failed = status in RETRY_HTTP_STATUS or (
+                status is None and reply.error() in RETRY_NETWORK_ERRORS
+            )
+            if host in self._controllers:
+                self._adapt(host, time.monotonic() - sent_at, failed)
+            if failed:
+                self._handle_failure(host, request, reply)
+            else:
+                self._breakers[host].record_success()
+                self.reply_finished.emit(key, reply)
+        finally:
+            reply.deleteLater()
+            self._dispatch()
+
+    def _use_http2(self, host: str):
+        self._http2_hosts.add(host)
+        if host in self._controllers:
+            self._controllers[host].maximum = self.max_in_flight
+        self.log(
+            message=self.tr(
+                "{} answers over HTTP/2, up to {} requests in flight"
+            ).format(host, self.max_in_flight),
+            log_level=4,
+        )
+
+    def _adapt(self, host: str, latency: float, failed: bool):
+        controller = self._controllers[host]
+        limit = controller.limit
+        if controller.on_reply(latency, failed):
+            self.log(
+                message=self.tr(
+                    "{}: {} -> {} requests in flight (latency {:.0f} ms, "
+                    "baseline {:.0f} ms, errors {:.1%})"
+                ).format(
+                    host,
+                    limit,
+                    controller.limit,
+                    (controller.latency or latency) * 1000,
+                    (controller.baseline or latency) * 1000,
+                    controller.error_rate,
+                ),
+                log_level=4,
+            )
+
+    def _handle_failure(self, host: str, request: tuple, reply: QNetworkReply):
+        key, qurl, data, attempt = request
+        breaker = self._breakers[host]
+        if breaker.record_failure():
+            if breaker.trips > self.max_retries:
+                self._drop_host(host, reply.errorString())
+                self.reply_finished.emit(key, reply)
+                return
+            else:
+                self.log(
+                    message=self.tr("{} keeps failing, paused for {:.0f} s: {}").format(
+                        host, breaker.cooldown, reply.errorString()
+                    ),
+                    log_level=1,
+                )
+
+        retry_after = parse_retry_after(bytes(reply.rawHeader(b"Retry-After")))
+        delay = retry_delay(attempt, self.max_retries, retry_after)
+        if delay is None:
+            self.reply_finished.emit(key, reply)
+            return
+        if retry_after is not None:
+            # the whole host is asked to slow down
+            self._paused_until[host] = time.monotonic() + delay
+        self.retries += 1
+        self.log(
+            message=self.tr("Retry {}/{} of {} in {:.1f} s: {}").format(
+                attempt + 1,
+                self.max_retries,
+                qurl.toString(),
+                delay,
+                reply.errorString(),
+            ),
+            log_level=4,
+        )
+        heapq.heappush(
+            self._delayed,
+            (
+                time.monotonic() + delay,
+                next(self._order),
+                host,
+                (key, qurl, data, attempt + 1),
+            ),
+        )
+
+    def _drop_host(self, host: str, message: str):
+        """Give up every request queued for a host which does not recover."""
+        self.log(
+            message=self.tr("{} is unavailable, its requests are dropped: {}").format(
+                host, message
+            ),
+            log_level=1,
+            push=True,
+        )
+        dropped = list(self._queues.pop(host, ()))
+        delayed = [item for item in self._delayed if item[2] == host]
+        if delayed:
+            self._delayed = [item for item in self._delayed if item[2] != host]
+            heapq.heapify(self._delayed)
+            dropped.extend(item[3] for item in delayed)
+        self._breakers[host].record_success()
+        for key, _, _, _ in dropped:
+            self.request_dropped.emit(key, message)
@@ -0,0 +1,240 @@
+#! python3  # noqa: E265
+
+"""
+    Background task resolving the TAXREF names of a layer.
+"""
+
+# standard
+from functools import partial
+from typing import Callable, List
+
+# PyQGIS
+from qgis.core import QgsTask, QgsVectorLayerFeatureSource
+from qgis.PyQt.QtCore import QCoreApplication, QEventLoop, Qt, QTimer, pyqtSignal
+
+# project
+from taxref_collector.core.delta import FINGERPRINT_FIELD
+from taxref_collector.core.progress import ProgressMeter
+from taxref_collector.processing.collector import JobLayer
+from taxref_collector.processing.writer import LookupTableWriter, ResultWriter
+from taxref_collector.toolbelt import PlgLogger, new_network_manager
+
+# ############################################################################
+# ########## Globals ###############
+# ##################################
+
+# how often the thread of the task checks whether it was canceled
+CANCEL_CHECK_MS = 200
+
+# how often the progress is sent to the main thread, whatever the number of keys
+# done in between
+PROGRESS_INTERVAL_MS = 100
+
+# ############################################################################
+# ########## Classes ###############
+# ##################################
+
+
+class ResolveTask(QgsTask):
+    """Run a TAXREF collector off the main thread, in the QGIS task manager.
+
+    The collector is built in the thread of the task, with its own network
+    access manager and event loop, so that the requests, the parsing of the
+    replies and the bookkeeping of the keys do not load the main thread. The
+    features are read from a source of the layer taken when the task is created.
+    The resolved values are sent to the main thread batch by batch, and written
+    there to the layer provider, or to the lookup table if one is given. The
+    progress is sent at a fixed rate, with the throughput and the time left.
+
+    Other layers can share the run, e.g. the layers of a project: the keys of
+    all of them are resolved once and the results written to their fields.
+
+    :param layer: layer holding the keys and the cd_nom, taxref_name and \
+    taxref_url fields
+    :type layer: QgsVectorLayer
+    :param collector_factory: builds the collector from the network_manager, \
+    layer, writer, source, target_field, delta and layers keyword arguments, \
+    e.g. partial(GetTaxrefFromGBIF, gbif_id_field="gbif_id")
+    :type collector_factory: Callable
+    :param lookup_table: table receiving one row per distinct value of \
+    join_field, instead of the fields of the layer
+    :type lookup_table: QgsVectorLayer, optional
+    :param join_field: field of the layer the lookup table is joined on
+    :type join_field: str, optional
+    :param delta: only resolve the features new or changed since the last run, \
+    the layer holds the fingerprint field
+    :type delta: bool, optional
+    :param layers: other layers of the run, with the cd_nom, taxref_name and \
+    taxref_url fields, and the fingerprint field in delta mode
+    :type layers: List[JobLayer], optional
+    """
+
+    # index of the layer, batch of values, to write from the main thread
+    values_ready = pyqtSignal(int, object)
+    # ProgressStats of the run, every PROGRESS_INTERVAL_MS
+    progress_updated = pyqtSignal(object)
+
+    def __init__(
+        self,
+        layer,
+        collector_factory: Callable,
+        lookup_table=None,
+        join_field: str = None,
+        delta: bool = False,
+        layers: List[JobLayer] = None,
+    ):
+        layers = list(layers or [])
+        names = [layer.name()] + [job_layer.layer.name() for job_layer in layers]
+        super().__init__(
+            QCoreApplication.translate(
+                "ResolveTask", "Resolving the TAXREF names of {}"
+            ).format(", ".join(names)),
+            QgsTask.CanCancel,
+        )
+        self.log = PlgLogger().log
+        self.layer = layer
+        self.collector_factory = collector_factory
+        self.lookup_table = lookup_table
+        # features are identified by their join value in a lookup table
+        self.join_field = join_field if lookup_table is not None else None
+        # the features of a lookup table have no fingerprint
+        self.delta = delta and lookup_table is None
+        self.exception = None
+        self.done = 0
+        self.key_count = 0
+        # keys whose requests failed, a resumed run retries them
+        self.failed = 0
+
+        # built in the main thread, used from the thread of the task
+        self.source = QgsVectorLayerFeatureSource(layer)
+        fingerprint_field = FINGERPRINT_FIELD if self.delta else None
+        if lookup_table is None:
+            self.relay = ResultWriter(
+                layer,
+                write_function=partial(self.values_ready.emit, 0),
+                fingerprint_field=fingerprint_field,
+            )
+            # writes the relayed values from the main thread
+            self.writer = ResultWriter(layer, fingerprint_field=fingerprint_field)
+        else:
+            self.relay = LookupTableWriter(
+                lookup_table,
+                join_field,
+                write_function=partial(self.values_ready.emit, 0),
+            )
+            self.writer = LookupTableWriter(lookup_table, join_field)
+        # writer of each layer of the run, in the main thread
+        self.writers = [self.writer]
+
+        # other layers are written to their fields
+        self.layers = []
+        for layer_index, job_layer in enumerate(layers, start=1):
+            relay = ResultWriter(
+                job_layer.layer,
+                write_function=partial(self.values_ready.emit, layer_index),
+                fingerprint_field=fingerprint_field,
+            )
+            self.layers.append(
+                JobLayer(
+                    job_layer.layer,
+                    job_layer.key_fields,
+                    QgsVectorLayerFeatureSource(job_layer.layer),
+                    relay,
+                )
+            )
+            self.writers.append(
+                ResultWriter(job_layer.layer, fingerprint_field=fingerprint_field)
+            )
+        self.values_ready.connect(self._write_values, Qt.QueuedConnection)
+
+        self._collector = None
+        self._meter = None
+
+    def run(self) -> bool:
+        """Resolve the keys of the layer, in the thread of the task.
+
+        :return: True if the run went to its end
+        :rtype: bool
+        """
+        try:
+            loop = QEventLoop()
+            network_manager = new_network_manager()
+            self._collector = self.collector_factory(
+                network_manager=network_manager,
+                layer=self.layer,
+                writer=self.relay,
+                source=self.source,
+                target_field=self.join_field,
+                delta=self.delta,
+                layers=self.layers,
+            )
+            self._collector.progress_changed.connect(
+                self._count_progress, Qt.DirectConnection
+            )
+            self._collector.finished_dl.connect(loop.quit)
+            self._meter = ProgressMeter()
+
+            cancel_timer = QTimer()
+            cancel_timer.timeout.connect(self._check_canceled, Qt.DirectConnection)
+            cancel_timer.start(CANCEL_CHECK_MS)
+            # the keys done between two reports are coalesced
+            progress_timer = QTimer()
+            progress_timer.timeout.connect(self._report_progress, Qt.DirectConnection)
+            progress_timer.start(PROGRESS_INTERVAL_MS)
+            loop.exec_()
+            cancel_timer.stop()
+            progress_timer.stop()
+            self._report_progress()
+            self.failed = self._collector.jobs.failed
+        except Exception as err:
+            self.exception = err
+            return False
+        finally:
+            # the objects of the thread are deleted in the thread
+            self._collector = None
+        return not self.isCanceled()
+
+    def finished(self, result: bool):
+        """Report the end of the run, called in the main thread.
+
+        :param result: value returned by run()
+        :type result: bool
+        """
+        if self.exception is not None:
+            self.log(
+                message=self.tr("Resolution of {} failed: {}").format(
+                    self.layer.name(), self.exception
+                ),
+                log_level=2,
+                push=True,
+            )
+        elif not result:
+            self.log(
+                message=self.tr("Resolution of {} canceled, {}/{} keys done").format(
+                    self.layer.name(), self.done, self.key_count
+                ),
+                log_level=1,
+                push=True,
+            )
+
+    def _write_values(self, layer_index: int, values: dict):
+        self.writers[layer_index].write(values)
+
+    def _check_canceled(self):
+        if self.isCanceled() and self._collector is not None:
+            self._collector.cancel()
+
+    def _count_progress(self, done: int, key_count: int):
+        self.done = done
+        self.key_count = key_count
+
+    def _report_progress(self):
+        self.setProgress(100 * self.done / max(1, self.key_count))
+        self.progress_updated.emit(
+            self._meter.update(
+                self.done,
+                self.key_count,
+                hit_ratio=self._collector.hit_ratio,
+                in_flight=self._collector.scheduler.in_flight,
+            )
+        )
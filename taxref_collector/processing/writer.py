@@ -0,0 +1,266 @@
+#! python3  # noqa: E265
+
+"""
+    Buffered writer of the resolved TAXREF values.
+"""
+
+# PyQGIS
+from qgis.core import QgsFeature, QgsFeatureSink, QgsField, QgsVectorDataProvider
+from qgis.PyQt.QtCore import QVariant
+
+# project
+from taxref_collector.core.delta import FINGERPRINT_FIELD
+from taxref_collector.core.taxref_store import taxref_values
+from taxref_collector.toolbelt import PlgLogger
+
+# ############################################################################
+# ########## Functions #############
+# ##################################
+
+
+def result_fields() -> list:
+    """Fields holding the resolved values.
+
+    :return: cd_nom, taxref_name and taxref_url fields
+    :rtype: List[QgsField]
+    """
+    return [
+        QgsField("cd_nom", QVariant.Int, "integer", 10),
+        QgsField("taxref_name", QVariant.String, "string", 254),
+        QgsField("taxref_url", QVariant.String, "string", 254),
+    ]
+
+
+def fingerprint_field() -> QgsField:
+    """Field holding the fingerprint of the key fields of a feature, in delta \
+    mode.
+
+    :return: taxref_key field
+    :rtype: QgsField
+    """
+    return QgsField(FINGERPRINT_FIELD, QVariant.String, "string", 254)
+
+
+# ############################################################################
+# ########## Classes ###############
+# ##################################
+
+
+class ResultWriter:
+    """Buffer resolved values and write them to the layer provider in batches.
+
+    Each flush is a single changeAttributeValues() call followed by a single
+    repaint, instead of an edit session and a repaint per resolved taxon.
+
+    Outside of the main thread, the batches are handed to write_function, which
+    passes them to the write() method of a writer of the main thread.
+
+    :param layer: layer holding the cd_nom, taxref_name and taxref_url fields
+    :type layer: QgsVectorLayer
+    :param batch_size: number of features buffered before a flush
+    :type batch_size: int, optional
+    :param write_function: called with each batch instead of writing it
+    :type write_function: Callable, optional
+    :param fingerprint_field: field receiving the fingerprint of the key fields \
+    of each feature, in delta mode
+    :type fingerprint_field: str, optional
+    """
+
+    def __init__(
+        self,
+        layer,
+        batch_size: int = 5000,
+        write_function=None,
+        fingerprint_field: str = None,
+    ):
+        self.layer = layer
+        self.batch_size = max(1, batch_size)
+        self.write_function = write_function
+        self.log = PlgLogger().log
+
+        fields = self.layer.fields()
+        self.cd_nom_index = fields.indexFromName("cd_nom")
+        self.taxref_name_index = fields.indexFromName("taxref_name")
+        self.taxref_url_index = fields.indexFromName("taxref_url")
+        self.fingerprint_index = (
+            fields.indexFromName(fingerprint_field) if fingerprint_field else -1
+        )
+
+        self._buffer = {}
+        self.written = 0
+
+    def add(self, features_id, taxref_id, taxref_name):
+        """Buffer the values of a resolved taxon for some features.
+
+        :param features_id: ids of the features sharing the taxon, or \
+        (id, fingerprint) pairs with a fingerprint field
+        :type features_id: Iterable
+        :param taxref_id: TAXREF cd_nom, None to write a "no match"
+        :param taxref_name: TAXREF scientific name
+        :type taxref_name: str
+        """
+        if taxref_id is None:
+            cd_nom = taxref_url = None
+        else:
+            cd_nom, taxref_name, taxref_url = taxref_values(taxref_id, taxref_name)
+        values = {
+            self.cd_nom_index: cd_nom,
+            self.taxref_name_index: taxref_name,
+            self.taxref_url_index: taxref_url,
+        }
+        if self.fingerprint_index == -1:
+            for feature_id in features_id:
+                self._buffer[feature_id] = values
+        else:
+            for feature_id, key_fingerprint in features_id:
+                self._buffer[feature_id] = {
+                    **values,
+                    self.fingerprint_index: key_fingerprint,
+                }
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> bool:
+        """Write the buffered values to the layer provider.
+
+        :return: True if the values were written
+        :rtype: bool
+        """
+        if not self._buffer:
+            return True
+        values, self._buffer = self._buffer, {}
+        if self.write_function is not None:
+            self.written += len(values)
+            self.write_function(values)
+            return True
+        return self.write(values)
+
+    def write(self, values: dict) -> bool:
+        """Write a batch of values to the layer provider and repaint the layer.
+
+        :param values: feature id -> {field index: value}
+        :type values: dict
+
+        :return: True if the values were written
+        :rtype: bool
+        """
+        provider = self.layer.dataProvider()
+        if not provider.capabilities() & QgsVectorDataProvider.ChangeAttributeValues:
+            self.log(
+                message="{} cannot be edited, results are not written.".format(
+                    self.layer.name()
+                ),
+                log_level=2,
+                push=True,
+            )
+            return False
+        ok = provider.changeAttributeValues(values)
+        if not ok:
+            self.log(
+                message="Error writing results to {}: {}".format(
+                    self.layer.name(), provider.lastError()
+                ),
+                log_level=2,
+            )
+        self.written += len(values)
+        self.layer.triggerRepaint()
+        return ok
+
+
+class LookupTableWriter:
+    """Buffer resolved values and add them to a lookup table in batches, one
+    feature per distinct value of the join field.
+
+    The lookup table is joined to the source layer on that field, so the source
+    is left untouched and only the distinct taxa are written. Features sharing
+    a join value share its taxon: the first result met for a value is kept.
+
+    :param table: lookup table holding the join field and the cd_nom, \
+    taxref_name and taxref_url fields
+    :type table: QgsVectorLayer
+    :param join_field: name of the join field
+    :type join_field: str
+    :param batch_size: number of rows buffered before a flush
+    :type batch_size: int, optional
+    :param write_function: called with each batch instead of writing it
+    :type write_function: Callable, optional
+    """
+
+    def __init__(
+        self, table, join_field: str, batch_size: int = 5000, write_function=None
+    ):
+        self.table = table
+        self.join_field = join_field
+        self.batch_size = max(1, batch_size)
+        self.write_function = write_function
+        self.log = PlgLogger().log
+
+        self.fields = self.table.fields()
+        self.indexes = [
+            self.fields.indexFromName(name)
+            for name in (join_field, "cd_nom", "taxref_name", "taxref_url")
+        ]
+
+        self._buffer = {}
+        # join values already buffered or written
+        self._seen = set()
+        self.written = 0
+
+    def add(self, join_values, taxref_id, taxref_name):
+        """Buffer the values of a resolved taxon for some join values.
+
+        :param join_values: values of the join field sharing the taxon
+        :type join_values: Iterable
+        :param taxref_id: TAXREF cd_nom
+        :param taxref_name: TAXREF scientific name
+        :type taxref_name: str
+        """
+        values = taxref_values(taxref_id, taxref_name)
+        for join_value in join_values:
+            if join_value not in self._seen:
+                self._seen.add(join_value)
+                self._buffer[join_value] = values
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> bool:
+        """Add the buffered rows to the lookup table.
+
+        :return: True if the rows were written
+        :rtype: bool
+        """
+        if not self._buffer:
+            return True
+        values, self._buffer = self._buffer, {}
+        if self.write_function is not None:
+            self.written += len(values)
+            self.write_function(values)
+            return True
+        return self.write(values)
+
+    def write(self, values: dict) -> bool:
+        """Add a batch of rows to the lookup table.
+
+        :param values: join value -> (cd_nom, taxref_name, taxref_url)
+        :type values: dict
+
+        :return: True if the rows were written
+        :rtype: bool
+        """
+        features = []
+        for join_value, row in values.items():
+            feature = QgsFeature(self.fields)
+            for index, value in zip(self.indexes, (join_value, *row)):
+                feature.setAttribute(index, value)
+            features.append(feature)
+        provider = self.table.dataProvider()
+        ok, _ = provider.addFeatures(features, QgsFeatureSink.FastInsert)
+        if not ok:
+            self.log(
+                message="Error writing results to {}: {}".format(
+                    self.table.name(), provider.lastError()
+                ),
+                log_level=2,
+            )
+        self.written += len(values)
+        return ok
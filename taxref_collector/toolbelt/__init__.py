@@ -1,3 +1,10 @@
 #! python3  # noqa: E265
 from .log_handler import PlgLogger  # noqa: F401
+from .network import build_request, new_network_manager, preconnect  # noqa: F401
 from .preferences import PlgOptionsManager  # noqa: F401
+from .storage import (  # noqa: F401
+    get_journal_path,
+    get_lookup_cache_path,
+    get_plugin_storage_path,
+    get_taxref_store_path,
+)
@@ -8,6 +8,7 @@ from typing import Callable
 # PyQGIS
 from qgis.core import QgsMessageLog, QgsMessageOutput
 from qgis.gui import QgsMessageBar
+from qgis.PyQt.QtCore import QCoreApplication, QThread
 from qgis.PyQt.QtWidgets import QPushButton, QWidget
 from qgis.utils import iface
 
@@ -108,8 +109,13 @@ class PlgLogger(logging.Handler):
             message=message, tag=application, notifyUser=push, level=log_level
         )
 
-        # optionally, display message on QGIS Message bar (above the map canvas)
-        if push and iface is not None:
+        # optionally, display message on QGIS Message bar (above the map canvas),
+        # only from the main thread: from a task, notifyUser flags the log panel
+        if (
+            push
+            and iface is not None
+            and QThread.currentThread() == QCoreApplication.instance().thread()
+        ):
             msg_bar = None
 
             # QGIS or custom dialog
@@ -0,0 +1,88 @@
+#! python3  # noqa: E265
+
+"""
+    Network access shared by the plugin requests.
+"""
+
+# standard
+from typing import Iterable
+
+# PyQGIS
+from qgis.core import Qgis
+from qgis.PyQt.QtCore import QUrl
+from qgis.PyQt.QtNetwork import QNetworkAccessManager, QNetworkRequest
+
+# project
+from taxref_collector.__about__ import __title_clean__, __uri_homepage__, __version__
+
+# ############################################################################
+# ########## Globals ###############
+# ##################################
+
+USER_AGENT: str = "{}/{} (QGIS {}; +{})".format(
+    __title_clean__, __version__, Qgis.QGIS_VERSION, __uri_homepage__
+)
+
+# transfers without any received byte for this long are aborted
+TRANSFER_TIMEOUT_MS: int = 30000
+
+# ############################################################################
+# ########## Functions #############
+# ##################################
+
+
+def new_network_manager(parent=None) -> QNetworkAccessManager:
+    """Create the network access manager shared by the plugin requests.
+
+    :param parent: parent object
+    :type parent: QObject, optional
+
+    :return: network access manager
+    :rtype: QNetworkAccessManager
+    """
+    manager = QNetworkAccessManager(parent)
+    manager.setRedirectPolicy(QNetworkRequest.NoLessSafeRedirectPolicy)
+    return manager
+
+
+def build_request(url, content_type: str = None) -> QNetworkRequest:
+    """Build a request to a web service.
+
+    HTTP/2 is allowed, so that all the requests to a host supporting it are
+    multiplexed on a single connection, otherwise HTTP/1.1 connections are kept
+    alive and reused. Qt asks for gzip or deflate compressed answers and
+    decompresses them as long as Accept-Encoding is not set by hand.
+
+    :param url: URL to request
+    :type url: Union[str, QUrl]
+    :param content_type: type of the request body, only for requests with a body
+    :type content_type: str, optional
+
+    :return: request
+    :rtype: QNetworkRequest
+    """
+    request = QNetworkRequest(QUrl(url))
+    request.setAttribute(QNetworkRequest.Http2AllowedAttribute, True)
+    request.setHeader(QNetworkRequest.UserAgentHeader, USER_AGENT)
+    request.setRawHeader(b"Accept", b"application/json")
+    request.setRawHeader(b"Connection", b"keep-alive")
+    request.setTransferTimeout(TRANSFER_TIMEOUT_MS)
+    if content_type:
+        request.setHeader(QNetworkRequest.ContentTypeHeader, content_type)
+    return request
+
+
+def preconnect(manager: QNetworkAccessManager, urls: Iterable[str]):
+    """Open the connections to the hosts of some URLs ahead of the first request.
+
+    :param manager: network access manager
+    :type manager: QNetworkAccessManager
+    :param urls: URLs of the hosts
+    :type urls: Iterable[str]
+    """
+    for url in urls:
+        qurl = QUrl(url)
+        if qurl.scheme() == "https":
+            manager.connectToHostEncrypted(qurl.host(), qurl.port(443))
+        else:
+            manager.connectToHost(qurl.host(), qurl.port(80))
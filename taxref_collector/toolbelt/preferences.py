@@ -13,6 +13,7 @@ from qgis.core import QgsSettings
 # package
 import taxref_collector.toolbelt.log_handler as log_hdlr
 from taxref_collector.__about__ import __title__, __version__
+from taxref_collector.core.ranks import RANK_PARENTS, format_rank_parents
 
 # ############################################################################
 # ########## Classes ###############
@@ -27,6 +28,38 @@ class PlgSettingsStructure:
     debug_mode: bool = False
     version: str = __version__
 
+    # network
+    max_concurrent_requests: int = 12
+    max_requests_per_host: int = 6
+    requests_per_second: float = 10.0
+    max_retries: int = 3
+    adaptive_concurrency: bool = True
+
+    # layer
+    scan_window_size: int = 5000
+
+    # cache
+    cache_enabled: bool = True
+    cache_ttl_days: int = 30
+    cache_negative_ttl_days: int = 1
+    cache_max_entries: int = 500000
+    memory_cache_size: int = 100000
+
+    # scientific names
+    clb_lean_query: bool = True
+    # batch mode, held back from the settings dialog: no public service follows
+    # the contract of core.batch_match, and it is off without an endpoint
+    clb_batch_mode: bool = False
+    batch_size: int = 500
+    batch_match_url: str = ""
+    # misspelled names matched to the local TAXREF release, edits summed over the
+    # words of a name, one per word at most, see fuzzy.MAX_WORD_DISTANCE; 0 to disable
+    taxref_max_distance: int = 2
+    # names without match looked up at their parent rank, see parse_rank_parents()
+    rank_fallback: bool = False
+    rank_parents: str = format_rank_parents(RANK_PARENTS)
+
+
 class PlgOptionsManager:
     @staticmethod
     def get_plg_settings() -> PlgSettingsStructure:
@@ -0,0 +1,57 @@
+#! python3  # noqa: E265
+
+"""
+    Plugin data stored in the QGIS profile folder.
+"""
+
+# standard
+from pathlib import Path
+
+# PyQGIS
+from qgis.core import QgsApplication
+
+# project
+from taxref_collector.__about__ import __title_clean__
+
+# ############################################################################
+# ########## Functions #############
+# ##################################
+
+
+def get_plugin_storage_path() -> Path:
+    """Return the folder where the plugin keeps its data, in the active QGIS \
+    profile folder. It is created if needed.
+
+    :return: plugin data folder
+    :rtype: Path
+    """
+    storage_path = Path(QgsApplication.qgisSettingsDirPath()) / __title_clean__.lower()
+    storage_path.mkdir(parents=True, exist_ok=True)
+    return storage_path
+
+
+def get_lookup_cache_path() -> Path:
+    """Return the path of the persistent lookup cache database.
+
+    :return: lookup cache path
+    :rtype: Path
+    """
+    return get_plugin_storage_path() / "lookup_cache.sqlite"
+
+
+def get_taxref_store_path() -> Path:
+    """Return the path of the local TAXREF release database.
+
+    :return: local TAXREF path
+    :rtype: Path
+    """
+    return get_plugin_storage_path() / "taxref.sqlite"
+
+
+def get_journal_path() -> Path:
+    """Return the path of the checkpoint journal of the runs.
+
+    :return: checkpoint journal path
+    :rtype: Path
+    """
+    return get_plugin_storage_path() / "journal.sqlite"
@@ -37,6 +37,67 @@ class TestPlgPreferences(unittest.TestCase):
         self.assertIsInstance(settings.version, str)
         self.assertEqual(settings.version, __version__)
 
+        # network
+        self.assertTrue(hasattr(settings, "max_concurrent_requests"))
+        self.assertIsInstance(settings.max_concurrent_requests, int)
+        self.assertEqual(settings.max_concurrent_requests, 12)
+
+        self.assertTrue(hasattr(settings, "max_requests_per_host"))
+        self.assertIsInstance(settings.max_requests_per_host, int)
+        self.assertEqual(settings.max_requests_per_host, 6)
+        self.assertTrue(hasattr(settings, "requests_per_second"))
+        self.assertIsInstance(settings.requests_per_second, float)
+        self.assertEqual(settings.requests_per_second, 10.0)
+        self.assertTrue(hasattr(settings, "max_retries"))
+        self.assertIsInstance(settings.max_retries, int)
+        self.assertEqual(settings.max_retries, 3)
+        self.assertTrue(hasattr(settings, "adaptive_concurrency"))
+        self.assertIsInstance(settings.adaptive_concurrency, bool)
+        self.assertTrue(settings.adaptive_concurrency)
+
+        # layer
+        self.assertTrue(hasattr(settings, "scan_window_size"))
+        self.assertIsInstance(settings.scan_window_size, int)
+        self.assertEqual(settings.scan_window_size, 5000)
+
+        # cache
+        self.assertTrue(hasattr(settings, "cache_enabled"))
+        self.assertIsInstance(settings.cache_enabled, bool)
+        self.assertEqual(settings.cache_enabled, True)
+
+        self.assertTrue(hasattr(settings, "cache_ttl_days"))
+        self.assertIsInstance(settings.cache_ttl_days, int)
+        self.assertEqual(settings.cache_ttl_days, 30)
+
+        self.assertTrue(hasattr(settings, "cache_negative_ttl_days"))
+        self.assertIsInstance(settings.cache_negative_ttl_days, int)
+        self.assertEqual(settings.cache_negative_ttl_days, 1)
+
+        self.assertTrue(hasattr(settings, "cache_max_entries"))
+        self.assertIsInstance(settings.cache_max_entries, int)
+        self.assertEqual(settings.cache_max_entries, 500000)
+
+        self.assertTrue(hasattr(settings, "memory_cache_size"))
+        self.assertIsInstance(settings.memory_cache_size, int)
+        self.assertEqual(settings.memory_cache_size, 100000)
+
+        # scientific names
+        self.assertTrue(hasattr(settings, "clb_lean_query"))
+        self.assertIsInstance(settings.clb_lean_query, bool)
+        self.assertEqual(settings.clb_lean_query, True)
+
+        self.assertTrue(hasattr(settings, "clb_batch_mode"))
+        self.assertIsInstance(settings.clb_batch_mode, bool)
+        self.assertEqual(settings.clb_batch_mode, False)
+
+        self.assertTrue(hasattr(settings, "batch_size"))
+        self.assertIsInstance(settings.batch_size, int)
+        self.assertEqual(settings.batch_size, 500)
+
+        self.assertTrue(hasattr(settings, "batch_match_url"))
+        self.assertIsInstance(settings.batch_match_url, str)
+        self.assertEqual(settings.batch_match_url, "")
+
 # ############################################################################
 # ####### Stand-alone run ########
 # ################################
@@ -0,0 +1,134 @@
+#! python3  # noqa E265
+
+"""
+    Usage from the repo root folder:
+
+    .. code-block:: bash
+
+        # for whole tests
+        python -m unittest tests.qgis.test_processing_algorithms
+        # for specific test
+        python -m unittest tests.qgis.test_processing_algorithms.TestAlgorithms.test_resolve_from_name
+"""
+
+# standard library
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from qgis.core import (
+    QgsFeature,
+    QgsProcessingContext,
+    QgsProcessingFeedback,
+    QgsVectorLayer,
+)
+from qgis.testing import start_app, unittest
+
+# project
+from taxref_collector.core.taxref_store import TaxrefStore
+from taxref_collector.processing import TaxrefCollectorProvider
+from taxref_collector.processing.algorithms import ResolveFromNameAlgorithm
+
+start_app()
+
+# ############################################################################
+# ########## Globals #############
+# ################################
+
+TAXREF_TXT = (
+    "CD_NOM\tCD_REF\tRANG\tLB_NOM\tNOM_COMPLET\n"
+    "116744\t116744\tES\tQuercus robur\tQuercus robur L., 1753\n"
+    "115813\t115813\tES\tFagus sylvatica\tFagus sylvatica L., 1753\n"
+)
+
+# ############################################################################
+# ########## Classes #############
+# ################################
+
+
+class TestAlgorithms(unittest.TestCase):
+    def setUp(self):
+        self.layer = QgsVectorLayer(
+            "Point?field=scientific_name:string&field=rank:string",
+            "observations",
+            "memory",
+        )
+        features = []
+        for name in ("Quercus robur", "Fagus sylvatica", "Quercus robur", None):
+            feature = QgsFeature(self.layer.fields())
+            feature["scientific_name"] = name
+            feature["rank"] = "species" if name else None
+            features.append(feature)
+        self.layer.dataProvider().addFeatures(features)
+
+        # keep the lookup cache and the TAXREF release out of the QGIS profile
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        tmp_path = Path(self.tmp_dir.name)
+        release = tmp_path / "TAXREFv17.txt"
+        release.write_text(TAXREF_TXT, encoding="utf-8")
+        store = TaxrefStore(tmp_path / "taxref.sqlite")
+        store.import_release(release)
+        store.close()
+        self.patches = [
+            mock.patch(
+                "taxref_collector.processing.algorithms.get_taxref_store_path",
+                return_value=tmp_path / "taxref.sqlite",
+            ),
+            mock.patch(
+                "taxref_collector.processing.algorithms.get_lookup_cache_path",
+                return_value=tmp_path / "lookup_cache.sqlite",
+            ),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        self.tmp_dir.cleanup()
+
+    def test_provider(self):
+        """Test the algorithms are loaded by the provider."""
+        provider = TaxrefCollectorProvider()
+        provider.loadAlgorithms()
+        self.assertEqual(
+            sorted(algorithm.name() for algorithm in provider.algorithms()),
+            ["resolve_from_gbif_id", "resolve_from_scientific_name"],
+        )
+
+    def test_resolve_from_name(self):
+        """Test the features are copied to the sink with their TAXREF values."""
+        algorithm = ResolveFromNameAlgorithm()
+        algorithm.initAlgorithm()
+        context = QgsProcessingContext()
+        feedback = QgsProcessingFeedback()
+        results, ok = algorithm.run(
+            {
+                "INPUT": self.layer,
+                "NAME_FIELD": "scientific_name",
+                "RANK_FIELD": "rank",
+                "OUTPUT": "memory:",
+            },
+            context,
+            feedback,
+        )
+        self.assertTrue(ok)
+
+        output = context.getMapLayer(results["OUTPUT"])
+        self.assertEqual(output.featureCount(), 4)
+        self.assertEqual(
+            output.fields().names(),
+            ["scientific_name", "rank", "cd_nom", "taxref_name", "taxref_url"],
+        )
+        cd_noms = [feature["cd_nom"] for feature in output.getFeatures()]
+        self.assertEqual(cd_noms.count(116744), 2)
+        self.assertEqual(cd_noms.count(115813), 1)
+        # the input layer is left as it is
+        self.assertEqual(self.layer.fields().count(), 2)
+
+
+# ############################################################################
+# ####### Stand-alone run ########
+# ################################
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+#! python3  # noqa E265
+
+"""
+    Usage from the repo root folder:
+
+    .. code-block:: bash
+
+        # for whole tests
+        python -m unittest tests.qgis.test_processing_collector
+        # for specific test
+        python -m unittest tests.qgis.test_processing_collector.TestGetTaxrefFromCLB.test_provider_calls
+"""
+
+# standard library
+import tempfile
+from pathlib import Path
+
+from qgis.core import QgsFeature, QgsProject, QgsVectorLayer
+from qgis.PyQt.QtCore import QEventLoop, QTimer
+from qgis.PyQt.QtNetwork import QNetworkAccessManager
+from qgis.testing import start_app, unittest
+
+# project
+from taxref_collector.core.cache import LruCache
+from taxref_collector.core.taxref_store import TaxrefStore
+from taxref_collector.processing.get_taxref_from_clb import GetTaxrefFromCLB
+from taxref_collector.toolbelt import PlgOptionsManager
+
+start_app()
+
+# ############################################################################
+# ########## Globals #############
+# ################################
+
+# (scientific_name, rank, species, genus)
+OBSERVATIONS = (
+    ("Quercus robur", "SPECIES", "Quercus robur", "Quercus"),
+    ("Quercus robur robur", "complex", "Quercus robur", "Quercus"),
+    ("Quercus sp.", "genus", None, "Quercus"),
+    ("Fagus sylvatica", "species", "Fagus sylvatica", "Fagus"),
+)
+
+TAXREF_TXT = (
+    "CD_NOM\tCD_REF\tRANG\tLB_NOM\tNOM_COMPLET\n"
+    "116744\t116744\tES\tQuercus robur\tQuercus robur L., 1753\n"
+    "198226\t198226\tGN\tQuercus\tQuercus L., 1753\n"
+    "115813\t115813\tES\tFagus sylvatica\tFagus sylvatica L., 1753\n"
+)
+
+# ############################################################################
+# ########## Classes #############
+# ################################
+
+
+class TestGetTaxrefFromCLB(unittest.TestCase):
+    def setUp(self):
+        self.layer = QgsVectorLayer(
+            "Point?field=scientific_name:string&field=rank:string"
+            "&field=species:string&field=genus:string"
+            "&field=cd_nom:integer&field=taxref_name:string&field=taxref_url:string",
+            "observations",
+            "memory",
+        )
+        features = []
+        for _ in range(250):
+            for name, rank, species, genus in OBSERVATIONS:
+                feature = QgsFeature(self.layer.fields())
+                feature["scientific_name"] = name
+                feature["rank"] = rank
+                feature["species"] = species
+                feature["genus"] = genus
+                features.append(feature)
+        self.layer.dataProvider().addFeatures(features)
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        release = Path(self.tmp_dir.name) / "TAXREFv17.txt"
+        release.write_text(TAXREF_TXT, encoding="utf-8")
+        self.store = TaxrefStore(":memory:")
+        self.store.import_release(release)
+
+        # count the provider requests made by the collector
+        self.calls = {"getFeatures": 0, "getFeature": 0}
+        get_features = self.layer.getFeatures
+        get_feature = self.layer.getFeature
+
+        def count_get_features(*args):
+            self.calls["getFeatures"] += 1
+            return get_features(*args)
+
+        def count_get_feature(*args):
+            self.calls["getFeature"] += 1
+            return get_feature(*args)
+
+        self.layer.getFeatures = count_get_features
+        self.layer.getFeature = count_get_feature
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp_dir.cleanup()
+
+    def collect(self, cache=None):
+        loop = QEventLoop()
+        QTimer.singleShot(10000, loop.quit)
+        collector = GetTaxrefFromCLB(
+            network_manager=QNetworkAccessManager(),
+            project=QgsProject.instance(),
+            layer=self.layer,
+            field_name="scientific_name",
+            field_rank="rank",
+            cache=cache,
+            store=self.store,
+        )
+        collector.finished_dl.connect(loop.quit)
+        loop.exec_()
+        return collector
+
+    def test_provider_calls(self):
+        """Test the names are resolved from a single scan of the layer, without \
+        any per-feature request to the provider."""
+        feature_count = self.layer.featureCount()
+        collector = self.collect()
+
+        self.assertEqual(collector.key_count, 3)
+        self.assertEqual(collector.pending_downloads, 0)
+        self.assertEqual(collector.done, 3)
+        self.assertEqual(self.calls["getFeatures"], 1)
+        self.assertEqual(self.calls["getFeature"] / feature_count, 0)
+
+        cd_noms = [feature["cd_nom"] for feature in self.layer.getFeatures()]
+        self.assertEqual(cd_noms.count(116744), 500)
+        self.assertEqual(cd_noms.count(198226), 250)
+        self.assertEqual(cd_noms.count(115813), 250)
+
+    def test_approximate_match(self):
+        """Test misspelled names are matched to the local release, without \
+        network."""
+        feature = QgsFeature(self.layer.fields())
+        feature["scientific_name"] = "Fagus silvatica"
+        feature["rank"] = "species"
+        feature["species"] = "Fagus silvatica"
+        feature["genus"] = "Fagus"
+        self.layer.dataProvider().addFeatures([feature])
+        collector = self.collect()
+
+        self.assertEqual(collector.key_count, 4)
+        self.assertEqual(collector.iterate_names, 0)
+        cd_noms = [feature["cd_nom"] for feature in self.layer.getFeatures()]
+        self.assertEqual(cd_noms.count(115813), 251)
+
+    def test_rank_fallback(self):
+        """Test names without match take the taxon of their parent rank, looked \
+        up once for all of them."""
+        # subspecies known to have no match
+        cache = LruCache()
+        features = []
+        for name in ("Quercus robur pedunculata", "Quercus robur brutia"):
+            cache.put("clb", name + "|subspecies")
+            for _ in range(100):
+                feature = QgsFeature(self.layer.fields())
+                feature["scientific_name"] = name
+                feature["rank"] = "subspecies"
+                features.append(feature)
+        self.layer.dataProvider().addFeatures(features)
+        PlgOptionsManager.set_value_from_key("rank_fallback", True)
+        try:
+            collector = self.collect(cache=cache)
+        finally:
+            PlgOptionsManager.set_value_from_key("rank_fallback", False)
+
+        # the 2 subspecies fall back to a species already in the layer
+        self.assertEqual(collector.key_count, 5)
+        self.assertEqual(collector.iterate_names, 0)
+        self.assertEqual(
+            collector.result(("Quercus robur brutia", "subspecies"))[0], "116744"
+        )
+        self.assertIsNone(collector.jobs.result(("Quercus robur brutia", "subspecies")))
+        cd_noms = [feature["cd_nom"] for feature in self.layer.getFeatures()]
+        self.assertEqual(cd_noms.count(116744), 700)
+
+
+# ############################################################################
+# ####### Stand-alone run ########
+# ################################
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+#! python3  # noqa E265
+
+"""
+    Usage from the repo root folder:
+
+    .. code-block:: bash
+
+        # for whole tests
+        python -m unittest tests.qgis.test_processing_lookup
+        # for specific test
+        python -m unittest tests.qgis.test_processing_lookup.TestLookupTable.test_join
+"""
+
+# standard library
+import tempfile
+from pathlib import Path
+
+from qgis.core import QgsFeature, QgsProject, QgsVectorLayer
+from qgis.testing import start_app, unittest
+
+# project
+from taxref_collector.processing.lookup import create_lookup_table, join_lookup_table
+from taxref_collector.processing.writer import LookupTableWriter
+
+start_app()
+
+# ############################################################################
+# ########## Classes #############
+# ################################
+
+
+class TestLookupTable(unittest.TestCase):
+    def setUp(self):
+        self.layer = QgsVectorLayer(
+            "Point?field=gbif_id:integer", "observations", "memory"
+        )
+        features = []
+        for gbif_id in (2878688, 2878688, 5284884, 1):
+            feature = QgsFeature(self.layer.fields())
+            feature["gbif_id"] = gbif_id
+            features.append(feature)
+        self.layer.dataProvider().addFeatures(features)
+        QgsProject.instance().addMapLayer(self.layer)
+
+    def tearDown(self):
+        QgsProject.instance().removeAllMapLayers()
+
+    def test_writer(self):
+        """Test a row is written once per distinct join value."""
+        table = create_lookup_table(self.layer, "gbif_id")
+        self.assertEqual(
+            table.fields().names(), ["gbif_id", "cd_nom", "taxref_name", "taxref_url"]
+        )
+        writer = LookupTableWriter(table, "gbif_id", batch_size=10)
+        writer.add([2878688, 2878688], "116744", "Quercus robur L., 1753")
+        writer.add([2878688], "999", "Other")
+        self.assertEqual(table.featureCount(), 0)
+        self.assertTrue(writer.flush())
+        self.assertEqual(writer.written, 1)
+        self.assertEqual(table.featureCount(), 1)
+        self.assertEqual(next(table.getFeatures())["cd_nom"], 116744)
+
+    def test_join(self):
+        """Test the layer reads the results of the table, its fields unchanged."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            table = create_lookup_table(
+                self.layer, "gbif_id", Path(tmp_dir) / "lookup.gpkg"
+            )
+            writer = LookupTableWriter(table, "gbif_id")
+            writer.add([2878688], "116744", "Quercus robur L., 1753")
+            writer.add([5284884], "95442", "Abies alba Mill., 1768")
+            writer.flush()
+            QgsProject.instance().addMapLayer(table)
+
+            self.assertEqual(self.layer.dataProvider().fields().names(), ["gbif_id"])
+            self.assertTrue(join_lookup_table(self.layer, table, "gbif_id"))
+            values = {
+                feature["gbif_id"]: feature["cd_nom"]
+                for feature in self.layer.getFeatures()
+            }
+            self.assertEqual(values[2878688], 116744)
+            self.assertEqual(values[5284884], 95442)
+            self.assertFalse(values[1])
+            self.assertEqual(self.layer.dataProvider().fields().names(), ["gbif_id"])
+
+            # a second run, with a table of its own, replaces the join
+            fields_count = self.layer.fields().count()
+            second_table = create_lookup_table(
+                self.layer, "gbif_id", Path(tmp_dir) / "lookup_2.gpkg"
+            )
+            writer = LookupTableWriter(second_table, "gbif_id")
+            writer.add([2878688], "116745", "Quercus robur L., 1753")
+            writer.flush()
+            QgsProject.instance().addMapLayer(second_table)
+            self.assertTrue(join_lookup_table(self.layer, second_table, "gbif_id"))
+            self.assertEqual(len(self.layer.vectorJoins()), 1)
+            self.assertEqual(self.layer.fields().count(), fields_count)
+            values = {
+                feature["gbif_id"]: feature["cd_nom"]
+                for feature in self.layer.getFeatures()
+            }
+            self.assertEqual(values[2878688], 116745)
+            QgsProject.instance().removeMapLayer(second_table)
+            QgsProject.instance().removeMapLayer(table)
+
+
+# ############################################################################
+# ####### Stand-alone run ########
+# ################################
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,252 @@
+#! python3  # noqa E265
+
+"""
+    Usage from the repo root folder:
+
+    .. code-block:: bash
+
+        # for whole tests
+        python -m unittest tests.qgis.test_processing_task
+        # for specific test
+        python -m unittest tests.qgis.test_processing_task.TestResolveTask.test_run
+"""
+
+# standard library
+import tempfile
+from functools import partial
+from pathlib import Path
+
+from qgis.core import QgsApplication, QgsFeature, QgsVectorLayer
+from qgis.PyQt.QtCore import QEventLoop, QTimer
+from qgis.testing import start_app, unittest
+
+# project
+from taxref_collector.core.journal import CheckpointJournal
+from taxref_collector.core.taxref_store import TaxrefStore
+from taxref_collector.processing import GetTaxrefFromCLB, JobLayer, ResolveTask
+from taxref_collector.processing.lookup import create_lookup_table
+from taxref_collector.processing.writer import fingerprint_field
+
+start_app()
+
+# ############################################################################
+# ########## Globals #############
+# ################################
+
+TAXREF_TXT = (
+    "CD_NOM\tCD_REF\tRANG\tLB_NOM\tNOM_COMPLET\n"
+    "116744\t116744\tES\tQuercus robur\tQuercus robur L., 1753\n"
+    "115813\t115813\tES\tFagus sylvatica\tFagus sylvatica L., 1753\n"
+)
+
+# ############################################################################
+# ########## Classes #############
+# ################################
+
+
+class TestResolveTask(unittest.TestCase):
+    def setUp(self):
+        self.layer = QgsVectorLayer(
+            "Point?field=scientific_name:string&field=rank:string"
+            "&field=cd_nom:integer&field=taxref_name:string&field=taxref_url:string",
+            "observations",
+            "memory",
+        )
+        features = []
+        for _ in range(500):
+            for name in ("Quercus robur", "Fagus sylvatica"):
+                feature = QgsFeature(self.layer.fields())
+                feature["scientific_name"] = name
+                feature["rank"] = "species"
+                features.append(feature)
+        self.layer.dataProvider().addFeatures(features)
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        release = Path(self.tmp_dir.name) / "TAXREFv17.txt"
+        release.write_text(TAXREF_TXT, encoding="utf-8")
+        self.store = TaxrefStore(Path(self.tmp_dir.name) / "taxref.sqlite")
+        self.store.import_release(release)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp_dir.cleanup()
+
+    def run_task(self, task):
+        loop = QEventLoop()
+        task.taskCompleted.connect(loop.quit)
+        task.taskTerminated.connect(loop.quit)
+        QTimer.singleShot(10000, loop.quit)
+        QgsApplication.taskManager().addTask(task)
+        loop.exec_()
+
+    def test_run(self):
+        """Test the names are resolved in the task and written from the main \
+        thread."""
+        task = ResolveTask(
+            self.layer,
+            partial(
+                GetTaxrefFromCLB,
+                field_name="scientific_name",
+                field_rank="rank",
+                store=self.store,
+            ),
+        )
+        progress = []
+        task.progress_updated.connect(progress.append)
+        self.run_task(task)
+
+        self.assertIsNone(task.exception)
+        self.assertEqual(task.status(), ResolveTask.Complete)
+        self.assertEqual((task.done, task.key_count), (2, 2))
+        self.assertEqual(task.progress(), 100)
+        self.assertEqual(progress[-1][:2], (2, 2))
+        self.assertEqual(progress[-1].eta, 0)
+        self.assertEqual(progress[-1].hit_ratio, 1)
+        self.assertEqual(task.writer.written, 1000)
+
+        cd_noms = [feature["cd_nom"] for feature in self.layer.getFeatures()]
+        self.assertEqual(cd_noms.count(116744), 500)
+        self.assertEqual(cd_noms.count(115813), 500)
+
+    def test_resume(self):
+        """Test a resumed run skips the features with a cd_nom and reads the \
+        keys of the journal."""
+        ids = [
+            feature.id()
+            for feature in self.layer.getFeatures()
+            if feature["scientific_name"] == "Quercus robur"
+        ]
+        cd_nom_index = self.layer.fields().indexFromName("cd_nom")
+        self.layer.dataProvider().changeAttributeValues(
+            {feature_id: {cd_nom_index: 116744} for feature_id in ids}
+        )
+        journal = CheckpointJournal(":memory:", "run")
+        journal.record("Fagus sylvatica|species", "115813", "Fagus sylvatica L.")
+
+        # without store, the names could only be resolved through the network
+        task = ResolveTask(
+            self.layer,
+            partial(
+                GetTaxrefFromCLB,
+                field_name="scientific_name",
+                field_rank="rank",
+                journal=journal,
+                filter_expression='"cd_nom" IS NULL',
+            ),
+        )
+        self.run_task(task)
+
+        self.assertEqual(task.status(), ResolveTask.Complete)
+        self.assertEqual((task.done, task.key_count, task.failed), (1, 1, 0))
+        self.assertEqual(task.writer.written, 500)
+        cd_noms = [feature["cd_nom"] for feature in self.layer.getFeatures()]
+        self.assertEqual(cd_noms.count(115813), 500)
+        journal.close()
+
+    def test_delta(self):
+        """Test a delta run only resolves the features added or edited since the \
+        last run."""
+        self.layer.dataProvider().addAttributes([fingerprint_field()])
+        self.layer.updateFields()
+        factory = partial(
+            GetTaxrefFromCLB,
+            field_name="scientific_name",
+            field_rank="rank",
+            store=self.store,
+        )
+        task = ResolveTask(self.layer, factory, delta=True)
+        self.run_task(task)
+        self.assertEqual(task.writer.written, 1000)
+        feature = next(self.layer.getFeatures())
+        # the key fields in the order of their names: rank, scientific_name
+        self.assertEqual(
+            feature["taxref_key"], "species|{}".format(feature["scientific_name"])
+        )
+
+        # nothing changed
+        task = ResolveTask(self.layer, factory, delta=True)
+        self.run_task(task)
+        self.assertEqual((task.key_count, task.writer.written), (0, 0))
+
+        # an edited and a new feature
+        name_index = self.layer.fields().indexFromName("scientific_name")
+        self.layer.dataProvider().changeAttributeValues(
+            {feature.id(): {name_index: "Fagus sylvatica"}}
+        )
+        new_feature = QgsFeature(self.layer.fields())
+        new_feature["scientific_name"] = "Quercus robur"
+        new_feature["rank"] = "species"
+        self.layer.dataProvider().addFeatures([new_feature])
+        task = ResolveTask(self.layer, factory, delta=True)
+        self.run_task(task)
+        self.assertEqual(task.writer.written, 2)
+        self.assertEqual(self.layer.getFeature(feature.id())["cd_nom"], 115813)
+
+    def test_layers(self):
+        """Test the keys shared by several layers, read from other fields, are \
+        resolved once and written to every layer."""
+        other_layer = QgsVectorLayer(
+            "Point?field=name:string&field=taxon_rank:string"
+            "&field=cd_nom:integer&field=taxref_name:string&field=taxref_url:string",
+            "other observations",
+            "memory",
+        )
+        features = []
+        for _ in range(200):
+            feature = QgsFeature(other_layer.fields())
+            feature["name"] = "Fagus sylvatica"
+            feature["taxon_rank"] = "species"
+            features.append(feature)
+        other_layer.dataProvider().addFeatures(features)
+
+        factory = partial(
+            GetTaxrefFromCLB,
+            field_name="scientific_name",
+            field_rank="rank",
+            store=self.store,
+        )
+        task = ResolveTask(
+            self.layer,
+            factory,
+            layers=[JobLayer(other_layer, ("name", "taxon_rank"))],
+        )
+        self.run_task(task)
+
+        self.assertEqual((task.done, task.key_count), (2, 2))
+        self.assertEqual([writer.written for writer in task.writers], [1000, 200])
+        feature = next(other_layer.getFeatures())
+        self.assertEqual(feature["cd_nom"], 115813)
+        self.assertEqual(feature["taxref_name"], "Fagus sylvatica L., 1753")
+
+    def test_lookup_table(self):
+        """Test one row per distinct name is written to a lookup table, and the \
+        layer is left untouched."""
+        table = create_lookup_table(self.layer, "scientific_name")
+        task = ResolveTask(
+            self.layer,
+            partial(
+                GetTaxrefFromCLB,
+                field_name="scientific_name",
+                field_rank="rank",
+                store=self.store,
+            ),
+            lookup_table=table,
+            join_field="scientific_name",
+        )
+        self.run_task(task)
+
+        self.assertEqual(task.status(), ResolveTask.Complete)
+        self.assertEqual(task.writer.written, 2)
+        rows = {
+            feature["scientific_name"]: feature["cd_nom"]
+            for feature in table.getFeatures()
+        }
+        self.assertEqual(rows, {"Quercus robur": 116744, "Fagus sylvatica": 115813})
+        self.assertFalse(any(feature["cd_nom"] for feature in self.layer.getFeatures()))
+
+
+# ############################################################################
+# ####### Stand-alone run ########
+# ################################
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+#! python3  # noqa E265
+
+"""
+    Usage from the repo root folder:
+
+    .. code-block:: bash
+
+        # for whole tests
+        python -m unittest tests.qgis.test_processing_writer
+        # for specific test
+        python -m unittest tests.qgis.test_processing_writer.TestResultWriter.test_flush
+"""
+
+# standard library
+from qgis.core import QgsFeature, QgsVectorLayer
+from qgis.testing import start_app, unittest
+
+# project
+from taxref_collector.processing.writer import ResultWriter
+
+start_app()
+
+# ############################################################################
+# ########## Classes #############
+# ################################
+
+
+class TestResultWriter(unittest.TestCase):
+    def setUp(self):
+        self.layer = QgsVectorLayer(
+            "Point?field=gbif_id:integer&field=cd_nom:integer"
+            "&field=taxref_name:string&field=taxref_url:string",
+            "observations",
+            "memory",
+        )
+        features = []
+        for gbif_id in (2878688, 2878688, 5284884):
+            feature = QgsFeature(self.layer.fields())
+            feature["gbif_id"] = gbif_id
+            features.append(feature)
+        self.layer.dataProvider().addFeatures(features)
+
+    def test_flush(self):
+        """Test values are buffered and written in one batch."""
+        writer = ResultWriter(self.layer, batch_size=10)
+        ids = [feature.id() for feature in self.layer.getFeatures()]
+        writer.add(ids[:2], "116744", "Quercus robur L., 1753")
+
+        # nothing written before the flush
+        self.assertFalse(self.layer.getFeature(ids[0])["cd_nom"])
+        self.assertTrue(writer.flush())
+        self.assertEqual(writer.written, 2)
+
+        feature = self.layer.getFeature(ids[1])
+        self.assertEqual(feature["cd_nom"], 116744)
+        self.assertEqual(feature["taxref_name"], "Quercus robur L., 1753")
+        self.assertEqual(
+            feature["taxref_url"], "https://inpn.mnhn.fr/espece/cd_nom/116744"
+        )
+        self.assertFalse(self.layer.getFeature(ids[2])["cd_nom"])
+
+    def test_batch_size(self):
+        """Test the buffer is flushed once full."""
+        writer = ResultWriter(self.layer, batch_size=2)
+        ids = [feature.id() for feature in self.layer.getFeatures()]
+        writer.add(ids[:2], "116744", "Quercus robur L., 1753")
+        self.assertEqual(writer.written, 2)
+
+
+# ############################################################################
+# ####### Stand-alone run ########
+# ################################
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+#! python3  # noqa E265
+
+"""
+    Usage from the repo root folder:
+
+    .. code-block:: bash
+
+        # for whole tests
+        python -m unittest tests.qgis.test_toolbelt_network
+        # for specific test
+        python -m unittest tests.qgis.test_toolbelt_network.TestNetwork.test_build_request
+"""
+
+# standard library
+from qgis.PyQt.QtNetwork import QNetworkRequest
+from qgis.testing import start_app, unittest
+
+# project
+from taxref_collector.__about__ import __version__
+from taxref_collector.toolbelt.network import USER_AGENT, build_request
+
+start_app()
+
+# ############################################################################
+# ########## Classes #############
+# ################################
+
+
+class TestNetwork(unittest.TestCase):
+    def test_build_request(self):
+        """Test the settings of a GET request."""
+        request = build_request("https://api.checklistbank.org/dataset/2008")
+
+        self.assertTrue(request.attribute(QNetworkRequest.Http2AllowedAttribute))
+        self.assertEqual(request.header(QNetworkRequest.UserAgentHeader), USER_AGENT)
+        self.assertIn(__version__, USER_AGENT)
+        self.assertEqual(bytes(request.rawHeader(b"Connection")), b"keep-alive")
+        self.assertGreater(request.transferTimeout(), 0)
+        # no body, no content type
+        self.assertIsNone(request.header(QNetworkRequest.ContentTypeHeader))
+        # left to Qt, which then decompresses the answers
+        self.assertFalse(request.hasRawHeader(b"Accept-Encoding"))
+
+    def test_build_post_request(self):
+        """Test the content type of a POST request."""
+        request = build_request(
+            "https://api.checklistbank.org/dataset/2008/match/nameusage",
+            content_type="application/json",
+        )
+        self.assertEqual(
+            request.header(QNetworkRequest.ContentTypeHeader), "application/json"
+        )
+
+
+# ############################################################################
+# ####### Stand-alone run ########
+# ################################
+if __name__ == "__main__":
+    unittest.main()
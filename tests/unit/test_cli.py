@@ -0,0 +1,204 @@
+#! python3  # noqa E265
+
+"""
+    Usage from the repo root folder:
+
+    .. code-block:: bash
+        # for whole tests
+        python -m unittest tests.unit.test_cli
+        # for specific test
+        python -m unittest tests.unit.test_cli.TestCli.test_csv
+"""
+
+# standard library
+import contextlib
+import csv
+import io
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+# project
+from taxref_collector.cli import main
+from taxref_collector.core.cache import LookupCache
+
+# ############################################################################
+# ########## Globals #############
+# ################################
+
+TAXREF_TXT = (
+    "REGNE\tFAMILLE\tCD_NOM\tCD_TAXSUP\tCD_REF\tRANG\tLB_NOM\tLB_AUTEUR\tNOM_COMPLET\n"
+    "Plantae\tFagaceae\t116744\t198226\t116744\tES\tQuercus robur\tL., 1753"
+    "\tQuercus robur L., 1753\n"
+    "Plantae\tFagaceae\t198226\t187367\t198226\tGN\tQuercus\tL., 1753"
+    "\tQuercus L., 1753\n"
+)
+
+# ############################################################################
+# ########## Classes #############
+# ################################
+
+
+class TestCli(unittest.TestCase):
+
+    """Test command line resolution from a local TAXREF release"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.folder = Path(self.tmp_dir.name)
+        self.taxref = self.folder / "TAXREFv17.txt"
+        self.taxref.write_text(TAXREF_TXT, encoding="utf-8")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def run_cli(self, *args) -> int:
+        with contextlib.redirect_stderr(io.StringIO()):
+            return main([str(arg) for arg in args])
+
+    def test_csv(self):
+        """Test a CSV file is copied with the result columns."""
+        input_path = self.folder / "observations.csv"
+        input_path.write_text(
+            "id;name;rank\n1;Quercus robur;species\n2;Quercus;genus\n3;;species\n",
+            encoding="utf-8",
+        )
+        code = self.run_cli(
+            "name",
+            input_path,
+            "--name-field=name",
+            "--rank-field=rank",
+            "--taxref",
+            self.taxref,
+            "--quiet",
+        )
+        self.assertEqual(code, 0)
+
+        with open(self.folder / "observations_taxref.csv", newline="") as csv_file:
+            rows = list(csv.DictReader(csv_file, delimiter=";"))
+        self.assertEqual([row["id"] for row in rows], ["1", "2", "3"])
+        self.assertEqual(rows[0]["cd_nom"], "116744")
+        self.assertEqual(rows[0]["taxref_name"], "Quercus robur L., 1753")
+        self.assertTrue(rows[0]["taxref_url"].endswith("/116744"))
+        self.assertEqual(rows[1]["cd_nom"], "198226")
+        self.assertEqual(rows[2]["cd_nom"], "")
+
+    def test_gpkg(self):
+        """Test a GeoPackage table is updated in a copy, by primary key."""
+        input_path = self.folder / "observations.gpkg"
+        connection = sqlite3.connect(str(input_path))
+        connection.executescript(
+            """
+            CREATE TABLE gpkg_contents (table_name TEXT, data_type TEXT);
+            INSERT INTO gpkg_contents VALUES ('observations', 'features');
+            CREATE TABLE observations (fid INTEGER PRIMARY KEY, nom TEXT, rang TEXT);
+            INSERT INTO observations VALUES (7, 'Quercus robur', 'species');
+            INSERT INTO observations VALUES (9, 'Quercus', 'genus');
+            """
+        )
+        connection.commit()
+        connection.close()
+        output_path = self.folder / "resolved.gpkg"
+
+        code = self.run_cli(
+            "name",
+            input_path,
+            "--name-field=nom",
+            "--rank-field=rang",
+            "--taxref",
+            self.taxref,
+            "--output",
+            output_path,
+        )
+        self.assertEqual(code, 0)
+
+        connection = sqlite3.connect(str(output_path))
+        rows = connection.execute(
+            "SELECT fid, cd_nom, taxref_name FROM observations ORDER BY fid"
+        ).fetchall()
+        connection.close()
+        self.assertEqual(
+            rows,
+            [(7, 116744, "Quercus robur L., 1753"), (9, 198226, "Quercus L., 1753")],
+        )
+        # the input is left untouched
+        connection = sqlite3.connect(str(input_path))
+        columns = [
+            row[1] for row in connection.execute("PRAGMA table_info(observations)")
+        ]
+        connection.close()
+        self.assertNotIn("cd_nom", columns)
+
+    def test_approximate(self):
+        """Test misspelled names are matched to the TAXREF release and reported."""
+        input_path = self.folder / "observations.csv"
+        input_path.write_text("name,rank\nQuercus robir,species\n", encoding="utf-8")
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            code = main(
+                [
+                    "name",
+                    str(input_path),
+                    "--name-field=name",
+                    "--rank-field=rank",
+                    "--taxref",
+                    str(self.taxref),
+                    "--quiet",
+                ]
+            )
+        self.assertEqual(code, 0)
+        self.assertIn(
+            "approximate match: Quercus robir (species) -> Quercus robur, distance 1",
+            stderr.getvalue(),
+        )
+        with (self.folder / "observations_taxref.csv").open(encoding="utf-8") as file:
+            self.assertEqual(next(csv.DictReader(file))["cd_nom"], "116744")
+
+    def test_rank_fallback(self):
+        """Test names without match take the taxon of their parent rank."""
+        # a subspecies known to have no match, its species is in the release
+        cache = LookupCache(self.folder / "cache.sqlite")
+        cache.put("clb", "Quercus robur pedunculata|subspecies")
+        cache.commit()
+        cache.close()
+        input_path = self.folder / "observations.csv"
+        input_path.write_text(
+            "name,rank\nQuercus robur pedunculata,subspecies\n", encoding="utf-8"
+        )
+        args = [
+            "name",
+            input_path,
+            "--name-field=name",
+            "--rank-field=rank",
+            "--taxref",
+            self.taxref,
+            "--cache",
+            self.folder / "cache.sqlite",
+            "--quiet",
+        ]
+        output_path = self.folder / "observations_taxref.csv"
+        self.assertEqual(self.run_cli(*args), 0)
+        with output_path.open(encoding="utf-8") as file:
+            self.assertEqual(next(csv.DictReader(file))["cd_nom"], "")
+
+        self.assertEqual(self.run_cli(*args, "--rank-fallback"), 0)
+        with output_path.open(encoding="utf-8") as file:
+            self.assertEqual(next(csv.DictReader(file))["cd_nom"], "116744")
+
+        with self.assertRaises(SystemExit):
+            self.run_cli(*args, "--rank-fallback=subspecies species")
+
+    def test_missing_field(self):
+        """Test unknown fields are reported before any resolution."""
+        input_path = self.folder / "observations.csv"
+        input_path.write_text("id,gbif\n1,2878688\n", encoding="utf-8")
+        with self.assertRaises(SystemExit):
+            self.run_cli("gbif", input_path, "--field=gbif_id")
+
+
+# ############################################################################
+# ####### Stand-alone run ########
+# ################################
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+#! python3  # noqa E265
+
+"""
+    Usage from the repo root folder:
+
+    .. code-block:: bash
+        # for whole tests
+        python -m unittest tests.unit.test_core_batch_match
+        # for specific test
+        python -m unittest tests.unit.test_core_batch_match.TestBatchMatch.test_stub_server
+"""
+
+# standard library
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+# project
+from taxref_collector.core.batch_match import (
+    build_batch_payload,
+    iter_batches,
+    match_batch,
+    parse_batch_response,
+)
+
+# ############################################################################
+# ########## Globals #############
+# ################################
+
+TAXREF = {("Quercus robur", "species"): ("116744", "Quercus robur L., 1753")}
+
+
+class StubMatchHandler(BaseHTTPRequestHandler):
+    """Answer a batch of names from the TAXREF dict, in reverse order."""
+
+    requests_count = 0
+
+    def do_POST(self):
+        StubMatchHandler.requests_count += 1
+        names = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        matches = []
+        for name in reversed(names):
+            match = TAXREF.get((name["scientificName"], name["rank"]))
+            if match is None:
+                matches.append({"original": {"id": name["id"]}, "type": "none"})
+            else:
+                matches.append(
+                    {
+                        "original": {"id": name["id"]},
+                        "type": "exact",
+                        "usage": {
+                            "id": match[0],
+                            "label": match[1],
+                            "status": "accepted",
+                        },
+                    }
+                )
+        body = json.dumps(matches).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+# ############################################################################
+# ########## Classes #############
+# ################################
+
+
+class TestBatchMatch(unittest.TestCase):
+
+    """Test batch name matching"""
+
+    def test_iter_batches(self):
+        """Test keys are split in bounded batches."""
+        batches = list(iter_batches(range(1050), 500))
+        self.assertEqual([len(batch) for batch in batches], [500, 500, 50])
+
+    def test_parse_by_position(self):
+        """Test matches without input id are mapped by position."""
+        keys = [("Quercus robur", "species"), ("Quercus robu", "species")]
+        data = json.dumps(
+            [
+                {"type": "exact", "usage": {"id": 116744, "label": "Quercus robur L."}},
+                {"type": "none"},
+            ]
+        )
+        self.assertEqual(
+            parse_batch_response(data, keys),
+            {keys[0]: ("116744", "Quercus robur L."), keys[1]: None},
+        )
+        self.assertEqual(len(json.loads(build_batch_payload(keys))), 2)
+
+    def test_parse_missing(self):
+        """Test keys the reply does not answer are left out, not set without \
+        match."""
+        keys = [("Quercus robur", "species"), ("Abies alba", "species")]
+        data = json.dumps([{"original": {"id": "1"}, "type": "none"}])
+        self.assertEqual(parse_batch_response(data, keys), {keys[1]: None})
+        self.assertEqual(parse_batch_response(b"[]", keys), {})
+
+    def test_stub_server(self):
+        """Test a batch round trip against a local stub server."""
+        server = HTTPServer(("127.0.0.1", 0), StubMatchHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            keys = [("Quercus robur", "species")] + [
+                ("Unknown name {}".format(i), "species") for i in range(499)
+            ]
+            results = match_batch(
+                keys, url="http://127.0.0.1:{}/".format(server.server_port)
+            )
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertEqual(StubMatchHandler.requests_count, 1)
+        self.assertEqual(len(results), 500)
+        self.assertEqual(results[keys[0]], TAXREF[keys[0]])
+        self.assertIsNone(results[keys[1]])
+
+
+# ############################################################################
+# ####### Stand-alone run ########
+# ################################
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+#! python3  # noqa E265
+
+"""
+    Usage from the repo root folder:
+
+    .. code-block:: bash
+        # for whole tests
+        python -m unittest tests.unit.test_core_cache
+        # for specific test
+        python -m unittest tests.unit.test_core_cache.TestLookupCache.test_negative_ttl
+"""
+
+# standard library
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+# project
+from taxref_collector.core.cache import CacheEntry, LookupCache, LruCache
+
+# ############################################################################
+# ########## Classes #############
+# ################################
+
+
+class TestLookupCache(unittest.TestCase):
+
+    """Test persistent lookup cache"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = LookupCache(Path(self.tmp_dir.name) / "cache.sqlite")
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp_dir.cleanup()
+
+    def test_get_put(self):
+        """Test a stored match is returned for its source only."""
+        self.assertIsNone(self.cache.get("gbif", 2878688))
+        self.cache.put("gbif", 2878688, "116744", "Quercus robur L., 1753")
+        self.assertEqual(
+            self.cache.get("gbif", "2878688"),
+            CacheEntry("116744", "Quercus robur L., 1753"),
+        )
+        self.assertIsNone(self.cache.get("clb", 2878688))
+
+    def test_negative_ttl(self):
+        """Test a missing match is cached with its own lifetime."""
+        self.cache.put("clb", "Quercus robur|species")
+        self.assertEqual(
+            self.cache.get("clb", "Quercus robur|species"), CacheEntry(None, None)
+        )
+        self.cache.negative_ttl = 0
+        self.cache.put("clb", "Quercus robur|species")
+        self.assertIsNone(self.cache.get("clb", "Quercus robur|species"))
+
+    def test_eviction(self):
+        """Test the cache is trimmed to its maximum size."""
+        self.cache.max_entries = 10
+        for i in range(25):
+            self.cache.put("gbif", i, str(i), "name")
+        self.cache.commit()
+        self.assertEqual(len(self.cache), 10)
+
+    def test_shared_database(self):
+        """Test a second connection reads committed entries."""
+        self.cache.put("gbif", 1, "1", "name")
+        self.cache.commit()
+        other = LookupCache(Path(self.tmp_dir.name) / "cache.sqlite")
+        self.assertEqual(other.get("gbif", 1), CacheEntry("1", "name"))
+        other.close()
+
+
+class TestLruCache(unittest.TestCase):
+
+    """Test in-memory resolver cache"""
+
+    def test_lru_eviction(self):
+        """Test the least recently used entry is dropped first."""
+        cache = LruCache(maxsize=2)
+        cache.put("gbif", 1, "1", "a")
+        cache.put("gbif", 2, "2", "b")
+        cache.get("gbif", 1)
+        cache.put("gbif", 3, "3", "c")
+        self.assertIsNone(cache.get("gbif", 2))
+        self.assertEqual(cache.get("gbif", 1), CacheEntry("1", "a"))
+        self.assertEqual(len(cache), 2)
+
+    def test_counters(self):
+        """Test hit and miss counters."""
+        cache = LruCache()
+        self.assertIsNone(cache.get("clb", "Quercus|genus"))
+        cache.put("clb", "Quercus|genus")
+        self.assertEqual(cache.get("clb", "Quercus|genus"), CacheEntry(None, None))
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+        self.assertEqual(cache.hit_ratio, 0.5)
+
+    def test_backend(self):
+        """Test memory misses are read from the persistent cache."""
+        backend = LookupCache(":memory:")
+        backend.put("gbif", 1, "1", "a")
+        cache = LruCache(backend=backend)
+        self.assertEqual(cache.get("gbif", 1), CacheEntry("1", "a"))
+        self.assertEqual(cache.backend_hits, 1)
+        cache.put("gbif", 2, "2", "b")
+        self.assertEqual(backend.get("gbif", 2), CacheEntry("2", "b"))
+        backend.close()
+
+    def test_expiry(self):
+        """Test entries expire in memory, "no match" first, and entries read from \
+        the persistent cache when they do there."""
+        now = [1000.0]
+        cache = LruCache(ttl=100, negative_ttl=10, clock=lambda: now[0])
+        cache.put("clb", "Quercus|genus")
+        cache.put("clb", "Abies|genus", "191256", "Abies Mill., 1754")
+        now[0] += 20
+        self.assertIsNone(cache.get("clb", "Quercus|genus"))
+        self.assertEqual(cache.get("clb", "Abies|genus").cd_nom, "191256")
+        now[0] += 100
+        self.assertIsNone(cache.get("clb", "Abies|genus"))
+        self.assertEqual(len(cache), 0)
+
+        backend = LookupCache(":memory:", ttl=100)
+        backend.put("gbif", 1, "1", "a")
+        now[0] = time.time()
+        cache = LruCache(backend=backend, ttl=1000, clock=lambda: now[0])
+        self.assertEqual(cache.get("gbif", 1), CacheEntry("1", "a"))
+        cache.backend = None
+        now[0] += 200
+        self.assertIsNone(cache.get("gbif", 1))
+        backend.close()
+
+    def test_maxsize(self):
+        """Test a smaller maxsize drops the least recently used entries at once."""
+        cache = LruCache()
+        for key in range(5):
+            cache.put("gbif", key, str(key), "a")
+        cache.get("gbif", 0)
+        cache.maxsize = 2
+        self.assertEqual(len(cache), 2)
+        self.assertIsNotNone(cache.get("gbif", 0))
+        self.assertIsNotNone(cache.get("gbif", 4))
+
+
+# ############################################################################
+# ####### Stand-alone run ########
+# ################################
+if __name__ == "__main__":
+    unittest.main()
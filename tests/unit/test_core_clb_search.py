@@ -0,0 +1,72 @@
+#! python3  # noqa E265
+
+"""
+    Usage from the repo root folder:
+
+    .. code-block:: bash
+        # for whole tests
+        python -m unittest tests.unit.test_core_clb_search
+        # for specific test
+        python -m unittest tests.unit.test_core_clb_search.TestClbSearch.test_lean_url
+"""
+
+# standard library
+import json
+import unittest
+from urllib.parse import parse_qs, urlsplit
+
+# project
+from taxref_collector.core.clb_search import build_search_url, parse_search_response
+
+# ############################################################################
+# ########## Classes #############
+# ################################
+
+
+class TestClbSearch(unittest.TestCase):
+
+    """Test ChecklistBank name search"""
+
+    def test_lean_url(self):
+        """Test the lean query asks for an exact match without facets."""
+        url = build_search_url("Quercus robur", "species")
+        params = parse_qs(urlsplit(url).query)
+
+        self.assertNotIn("facet", params)
+        self.assertEqual(params["q"], ["Quercus robur"])
+        self.assertEqual(params["rank"], ["species"])
+        self.assertEqual(params["type"], ["EXACT"])
+        self.assertEqual(params["limit"], ["2"])
+        self.assertEqual(params["datasetKey"], ["2008"])
+        self.assertEqual(params["status"], ["accepted"])
+        self.assertIn("q=Quercus%20robur", url)
+
+        legacy = build_search_url("Quercus robur", "species", lean=False)
+        params = parse_qs(urlsplit(legacy).query)
+        self.assertEqual(len(params["facet"]), 12)
+        self.assertEqual(params["type"], ["PREFIX"])
+        self.assertLess(len(url), len(legacy))
+
+    def test_parse_search_response(self):
+        """Test only a single result is used."""
+        match = {"id": "116744", "usage": {"label": "Quercus robur L., 1753"}}
+        self.assertEqual(
+            parse_search_response(
+                json.dumps({"total": 1, "result": [match]}).encode()
+            ),
+            ("116744", "Quercus robur L., 1753"),
+        )
+        self.assertIsNone(
+            parse_search_response(
+                json.dumps({"total": 2, "result": [match, match]}).encode()
+            )
+        )
+        self.assertIsNone(parse_search_response(b'{"total": 0}'))
+        self.assertIsNone(parse_search_response(b""))
+
+
+# ############################################################################
+# ####### Stand-alone run ########
+# ################################
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+#! python3  # noqa E265
+
+"""
+    Usage from the repo root folder:
+
+    .. code-block:: bash
+        # for whole tests
+        python -m unittest tests.unit.test_core_delta
+        # for specific test
+        python -m unittest tests.unit.test_core_delta.TestDelta.test_changed_filter
+"""
+
+# standard library
+import sqlite3
+import unittest
+
+# project
+from taxref_collector.core.delta import (
+    changed_filter,
+    fingerprint,
+    fingerprint_expression,
+)
+
+# ############################################################################
+# ########## Classes #############
+# ################################
+
+
+class TestDelta(unittest.TestCase):
+
+    """Test fingerprints of the key fields"""
+
+    def test_fingerprint(self):
+        """Test fingerprints of names, ranks and ids."""
+        self.assertEqual(
+            fingerprint(["Quercus robur", "species"]), "Quercus robur|species"
+        )
+        self.assertEqual(fingerprint([2878688]), "2878688")
+        self.assertEqual(fingerprint([2878688.0]), "2878688")
+        self.assertEqual(fingerprint(["Quercus", None]), "Quercus|<null>")
+        self.assertEqual(
+            fingerprint_expression(["name", "rank"]),
+            "coalesce(\"name\", '<null>') || '|' || coalesce(\"rank\", '<null>')",
+        )
+        self.assertEqual(
+            fingerprint_expression(["gbif_id"]), "coalesce(\"gbif_id\", '<null>') || ''"
+        )
+
+    def test_changed_filter(self):
+        """Test the filter, run as SQL like a GeoPackage provider would, selects \
+        the new and edited features only."""
+        connection = sqlite3.connect(":memory:")
+        connection.execute(
+            "CREATE TABLE observations (fid INTEGER PRIMARY KEY, name TEXT, "
+            "rank TEXT, gbif_id INTEGER, taxref_key TEXT)"
+        )
+        rows = [
+            (1, "Quercus robur", "species", 2878688),
+            (2, "Quercus", "genus", 2877951),
+            (3, "Abies alba", "species", 2685484),
+            (4, "Fagus sylvatica", None, None),
+        ]
+        connection.executemany(
+            "INSERT INTO observations VALUES (?, ?, ?, ?, NULL)", rows
+        )
+        for fields in (["name", "rank"], ["gbif_id"]):
+            # a first run resolves rows 1, 2 and 4, whose rank and id are NULL
+            for row in rows[:2] + rows[3:]:
+                values = dict(zip(("fid", "name", "rank", "gbif_id"), row))
+                connection.execute(
+                    "UPDATE observations SET taxref_key = ? WHERE fid = ?",
+                    (fingerprint(values[field] for field in fields), row[0]),
+                )
+            connection.execute(
+                "UPDATE observations SET name = 'Quercus petraea', gbif_id = 1 "
+                "WHERE fid = 2"
+            )
+            # a key field emptied is a change too
+            connection.execute(
+                "UPDATE observations SET rank = NULL, gbif_id = NULL WHERE fid = 1"
+            )
+            changed = connection.execute(
+                "SELECT fid FROM observations WHERE {} ORDER BY fid".format(
+                    changed_filter(fields)
+                )
+            ).fetchall()
+            self.assertEqual(changed, [(1,), (2,), (3,)])
+            connection.execute(
+                "UPDATE observations SET name = 'Quercus', gbif_id = 2877951 "
+                "WHERE fid = 2"
+            )
+            connection.execute(
+                "UPDATE observations SET rank = 'species', gbif_id = 2878688 "
+                "WHERE fid = 1"
+            )
+        connection.close()
+
+
+# ############################################################################
+# ####### Stand-alone run ########
+# ################################
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+#! python3  # noqa E265
+
+"""
+    Usage from the repo root folder:
+
+    .. code-block:: bash
+        # for whole tests
+        python -m unittest tests.unit.test_core_fuzzy
+        # for specific test
+        python -m unittest tests.unit.test_core_fuzzy.TestFuzzy.test_edit_distance
+"""
+
+# standard library
+import unittest
+
+# project
+from taxref_collector.core.fuzzy import combine_words, edit_distance, word_variants
+
+# ############################################################################
+# ########## Classes #############
+# ################################
+
+
+class TestFuzzy(unittest.TestCase):
+
+    """Test approximate matching of scientific names"""
+
+    def test_edit_distance(self):
+        """Test typing errors count as one edit each."""
+        self.assertEqual(edit_distance("robur", "robur", 2), 0)
+        self.assertEqual(edit_distance("robur", "robir", 2), 1)
+        self.assertEqual(edit_distance("robur", "rbour", 2), 1)
+        self.assertEqual(edit_distance("sylvatica", "silvatca", 2), 2)
+        self.assertEqual(edit_distance("kitten", "sitting", 2), 3)
+        self.assertEqual(edit_distance("quercus", "q", 2), 3)
+
+    def test_word_variants(self):
+        """Test words one edit apart share a variant."""
+        for word, other in (("robur", "robir"), ("robur", "rbour"), ("alba", "albx")):
+            self.assertTrue(word_variants(word) & word_variants(other))
+        self.assertFalse(word_variants("robur") & word_variants("rubra"))
+        self.assertEqual(word_variants("sp."), {"sp."})
+
+    def test_combine_words(self):
+        """Test combinations are kept within the total distance."""
+        candidates = [[("quercus", 0), ("quercas", 1)], [("robur", 1), ("rubra", 2)]]
+        self.assertEqual(
+            sorted(combine_words(candidates, 2)),
+            [
+                (["quercas", "robur"], 2),
+                (["quercus", "robur"], 1),
+                (["quercus", "rubra"], 2),
+            ],
+        )
+
+
+# ############################################################################
+# ####### Stand-alone run ########
+# ################################
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+#! python3  # noqa E265
+
+"""
+    Usage from the repo root folder:
+
+    .. code-block:: bash
+        # for whole tests
+        python -m unittest tests.unit.test_core_gbif_related
+        # for specific test
+        python -m unittest tests.unit.test_core_gbif_related.TestGbifRelated.test_url
+"""
+
+# standard library
+import json
+import unittest
+from urllib.parse import parse_qs, urlsplit
+
+# project
+from taxref_collector.core.gbif_related import (
+    GBIF_TAXREF_DATASET_KEY,
+    build_related_url,
+    gbif_key,
+    parse_related_response,
+)
+
+# ############################################################################
+# ########## Classes #############
+# ################################
+
+
+def page(results, offset=0, end=True):
+    return json.dumps(
+        {"offset": offset, "limit": 20, "endOfRecords": end, "results": results}
+    ).encode()
+
+
+class TestGbifRelated(unittest.TestCase):
+
+    """Test TAXREF usages related to a GBIF taxon"""
+
+    def test_gbif_key(self):
+        """Test ids read from a layer or a file are normalized."""
+        self.assertEqual(gbif_key(2878688), 2878688)
+        self.assertEqual(gbif_key(2878688.0), 2878688)
+        self.assertEqual(gbif_key(" 2878688 "), 2878688)
+        self.assertEqual(gbif_key("x12"), "x12")
+        self.assertIsNone(gbif_key(""))
+        self.assertIsNone(gbif_key(None))
+
+    def test_url(self):
+        """Test the URL asks for a page of the TAXREF checklist only."""
+        url = build_related_url(2878688, offset=40)
+        parts = urlsplit(url)
+        params = parse_qs(parts.query)
+
+        self.assertEqual(parts.netloc, "api.gbif.org")
+        self.assertEqual(parts.path, "/v1/species/2878688/related")
+        self.assertEqual(params["datasetKey"], [GBIF_TAXREF_DATASET_KEY])
+        self.assertEqual(params["offset"], ["40"])
+        self.assertEqual(params["limit"], ["20"])
+
+    def test_parse_accepted(self):
+        """Test the accepted usage is preferred to the synonyms."""
+        synonym = {
+            "taxonID": "116745",
+            "scientificName": "Quercus pedunculata Ehrh.",
+            "taxonomicStatus": "SYNONYM",
+        }
+        accepted = {
+            "taxonID": 116744,
+            "scientificName": "Quercus robur L.",
+            "taxonomicStatus": "ACCEPTED",
+        }
+        self.assertEqual(
+            parse_related_response(page([synonym, accepted])),
+            (("116744", "Quercus robur L."), True, None),
+        )
+        self.assertEqual(
+            parse_related_response(page([synonym])),
+            (("116745", "Quercus pedunculata Ehrh."), False, None),
+        )
+        # usages without TAXREF id are ignored
+        self.assertEqual(
+            parse_related_response(page([{"scientificName": "Quercus"}])),
+            (None, False, None),
+        )
+
+    def test_parse_pages(self):
+        """Test the offset of the next page."""
+        usages = [{"taxonID": str(i), "taxonomicStatus": "DOUBTFUL"} for i in range(20)]
+        self.assertEqual(
+            parse_related_response(page(usages, offset=20, end=False))[2], 40
+        )
+        self.assertIsNone(parse_related_response(page(usages, offset=20))[2])
+        # an empty page ends the paging
+        self.assertIsNone(parse_related_response(page([], end=False))[2])
+        self.assertEqual(parse_related_response(b""), (None, False, None))
+
+
+# ############################################################################
+# ####### Stand-alone run ########
+# ################################
+if __name__ == "__main__":
+    unittest.main()
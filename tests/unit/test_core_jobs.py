@@ -0,0 +1,84 @@
+#! python3  # noqa E265
+
+"""
+    Usage from the repo root folder:
+
+    .. code-block:: bash
+        # for whole tests
+        python -m unittest tests.unit.test_core_jobs
+        # for specific test
+        python -m unittest tests.unit.test_core_jobs.TestJobTable.test_transitions
+"""
+
+# standard library
+import unittest
+
+# project
+from taxref_collector.core.jobs import JobState, JobTable
+
+# ############################################################################
+# ########## Classes #############
+# ################################
+
+
+class TestJobTable(unittest.TestCase):
+
+    """Test state of the lookup keys"""
+
+    def test_add(self):
+        """Test features are attached to their pending key."""
+        jobs = JobTable()
+        self.assertIsNone(jobs.add("a", 1))
+        self.assertIs(jobs.add("a", 2), JobState.PENDING)
+        self.assertIsNone(jobs.add("b", 3))
+        self.assertEqual(len(jobs), 2)
+        self.assertEqual(jobs.pending, 2)
+        self.assertEqual(jobs.resolve("a", ("116744", "Quercus robur")), [1, 2])
+
+        # features scanned after the answer are not kept
+        self.assertIs(jobs.add("a", 4), JobState.RESOLVED)
+        self.assertEqual(jobs.result("a"), ("116744", "Quercus robur"))
+
+    def test_transitions(self):
+        """Test a key leaves the pending state only once."""
+        jobs = JobTable()
+        jobs.add("a", 1)
+        jobs.add("b", 2)
+        jobs.add("c", 3)
+
+        self.assertEqual(jobs.resolve("a", None), [1])
+        self.assertIsNone(jobs.resolve("a", ("116744", "Quercus robur")))
+        self.assertIsNone(jobs.result("a"))
+        self.assertFalse(jobs.fail("a"))
+
+        self.assertTrue(jobs.fail("b"))
+        self.assertFalse(jobs.fail("b"))
+        self.assertIsNone(jobs.resolve("b", None))
+        self.assertIs(jobs.add("b", 4), JobState.FAILED)
+
+        # unknown keys
+        self.assertIsNone(jobs.resolve("d", None))
+        self.assertFalse(jobs.fail("d"))
+
+        self.assertEqual(jobs.pending_keys(), ["c"])
+        self.assertEqual((jobs.pending, jobs.resolved, jobs.failed), (1, 1, 1))
+
+    def test_million_keys(self):
+        """Test a million keys go through the table."""
+        jobs = JobTable()
+        for key in range(1000000):
+            jobs.add(key, key)
+        for key in range(0, 1000000, 2):
+            jobs.resolve(key, None)
+        for key in range(1, 1000000, 2):
+            jobs.fail(key)
+        self.assertEqual(jobs.pending, 0)
+        self.assertEqual(jobs.resolved, 500000)
+        self.assertEqual(jobs.failed, 500000)
+
+
+# ############################################################################
+# ####### Stand-alone run ########
+# ################################
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+#! python3  # noqa E265
+
+"""
+    Usage from the repo root folder:
+
+    .. code-block:: bash
+        # for whole tests
+        python -m unittest tests.unit.test_core_journal
+        # for specific test
+        python -m unittest tests.unit.test_core_journal.TestCheckpointJournal.test_resume
+"""
+
+# standard library
+import tempfile
+import unittest
+from pathlib import Path
+
+# project
+from taxref_collector.core.journal import CheckpointJournal, run_id
+
+# ############################################################################
+# ########## Classes #############
+# ################################
+
+
+class TestCheckpointJournal(unittest.TestCase):
+
+    """Test checkpoint journal of the completed keys"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp_dir.name) / "journal.sqlite"
+        self.run = run_id("/data/observations.shp", "clb", "name", "rank")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_run_id(self):
+        """Test runs on other fields or layers are told apart."""
+        self.assertEqual(
+            self.run, run_id("/data/observations.shp", "clb", "name", "rank")
+        )
+        self.assertNotEqual(
+            self.run, run_id("/data/observations.shp", "gbif", "name", "rank")
+        )
+
+    def test_resume(self):
+        """Test keys flushed before an interruption are read back by a new run."""
+        journal = CheckpointJournal(self.path, self.run, flush_every=2)
+        journal.record("Quercus robur|species", "116744", "Quercus robur L., 1753")
+        journal.record("Quercus|genus")
+        journal.record("Abies alba|species", "95442", "Abies alba Mill., 1768")
+        # the last key is still buffered when the run is interrupted
+        journal.connection.close()
+
+        journal = CheckpointJournal(self.path, self.run)
+        self.assertEqual(len(journal), 2)
+        self.assertEqual(journal.get("Quercus robur|species").cd_nom, "116744")
+        self.assertIsNone(journal.get("Quercus|genus").cd_nom)
+        self.assertIsNone(journal.get("Abies alba|species"))
+        self.assertIsNone(CheckpointJournal(self.path, "other").get("Quercus|genus"))
+
+        journal.clear()
+        self.assertEqual(len(journal), 0)
+        journal.close()
+
+    def test_flush_interval(self):
+        """Test the buffer is flushed once older than the interval."""
+        journal = CheckpointJournal(self.path, self.run, flush_interval=0)
+        journal.record(2878688, "116744", "Quercus robur L., 1753")
+        self.assertEqual(
+            journal.connection.execute("SELECT count(*) FROM journal").fetchone(),
+            (1,),
+        )
+        journal.close()
+
+
+# ############################################################################
+# ####### Stand-alone run ########
+# ################################
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+#! python3  # noqa E265
+
+"""
+    Usage from the repo root folder:
+
+    .. code-block:: bash
+        # for whole tests
+        python -m unittest tests.unit.test_core_progress
+        # for specific test
+        python -m unittest tests.unit.test_core_progress.TestProgress.test_meter
+"""
+
+# standard library
+import unittest
+
+# project
+from taxref_collector.core.progress import ProgressMeter, format_duration
+
+# ############################################################################
+# ########## Classes #############
+# ################################
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestProgress(unittest.TestCase):
+
+    """Test throughput and remaining time of a run"""
+
+    def test_format_duration(self):
+        """Test durations under and over an hour."""
+        self.assertEqual(format_duration(None), "--:--")
+        self.assertEqual(format_duration(0), "0:00")
+        self.assertEqual(format_duration(61.4), "1:01")
+        self.assertEqual(format_duration(3 * 3600 + 5), "3:00:05")
+
+    def test_meter(self):
+        """Test the throughput is measured on the last seconds only."""
+        clock = Clock()
+        meter = ProgressMeter(window=10.0, clock=clock)
+        stats = meter.update(0, 1000, hit_ratio=0.5, in_flight=6)
+        self.assertEqual((stats.rate, stats.eta), (0.0, None))
+        self.assertEqual((stats.hit_ratio, stats.in_flight), (0.5, 6))
+
+        # 10 keys per second for 10 seconds
+        for second in range(1, 11):
+            clock.now = second
+            stats = meter.update(10 * second, 1000)
+        self.assertEqual(stats.rate, 10.0)
+        self.assertEqual(stats.eta, 90.0)
+
+        # then 50 keys per second
+        for second in range(11, 21):
+            clock.now = second
+            stats = meter.update(100 + 50 * (second - 10), 1000)
+        self.assertEqual(stats.rate, 50.0)
+        self.assertEqual(stats.eta, 8.0)
+
+        clock.now = 21
+        self.assertEqual(meter.update(1000, 1000).eta, 0.0)
+
+
+# ############################################################################
+# ####### Stand-alone run ########
+# ################################
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+#! python3  # noqa E265
+
+"""
+    Usage from the repo root folder:
+
+    .. code-block:: bash
+        # for whole tests
+        python -m unittest tests.unit.test_core_ranks
+        # for specific test
+        python -m unittest tests.unit.test_core_ranks.TestRanks.test_name_key
+"""
+
+# standard library
+import unittest
+
+# project
+from taxref_collector.core.ranks import (
+    RANK_PARENTS,
+    canonical_name,
+    effective_rank,
+    format_rank_parents,
+    name_key,
+    parent_key,
+    parse_rank_parents,
+    record_name_key,
+)
+
+# ############################################################################
+# ########## Classes #############
+# ################################
+
+
+class TestRanks(unittest.TestCase):
+
+    """Test ranks module"""
+
+    def test_effective_rank(self):
+        """Test rank remapping."""
+        self.assertEqual(effective_rank("SPECIES"), "species")
+        self.assertEqual(effective_rank("complex"), "species")
+        self.assertEqual(effective_rank("Section"), "genus")
+        self.assertEqual(effective_rank("subtribe"), "family")
+
+    def test_canonical_name(self):
+        """Test name normalization."""
+        self.assertEqual(canonical_name("  quercus   ROBUR "), "Quercus robur")
+        self.assertEqual(canonical_name(""), "")
+
+    def test_name_key(self):
+        """Test that spelling variants share one key and skipped rows have none."""
+        self.assertEqual(
+            name_key("Quercus robur", "SPECIES"), name_key("quercus  robur", "complex")
+        )
+        self.assertIsNone(name_key("Water", "stateofmatter"))
+        self.assertIsNone(name_key(None, "species"))
+        self.assertIsNone(name_key("Quercus", None))
+
+    def test_record_name_key(self):
+        """Test the name is read in the column of the effective rank."""
+        record = {"name": "Quercus robur aggr.", "rank": "complex", "species": ""}
+        self.assertEqual(
+            record_name_key(record, "name", "rank"),
+            ("Quercus robur aggr.", "species"),
+        )
+        record["species"] = "Quercus robur"
+        self.assertEqual(
+            record_name_key(record, "name", "rank", ("species",)),
+            ("Quercus robur", "species"),
+        )
+        record = {"name": "Quercus", "rank": None}
+        self.assertIsNone(record_name_key(record, "name", "rank"))
+
+    def test_parent_key(self):
+        """Test the parent of a name is read from its first words."""
+        key = ("Quercus robur pedunculata", "subspecies")
+        self.assertEqual(parent_key(key), ("Quercus robur", "species"))
+        self.assertEqual(parent_key(parent_key(key)), ("Quercus", "genus"))
+        self.assertIsNone(parent_key(("Quercus", "genus")))
+        self.assertIsNone(parent_key(("Quercus", "subspecies")))
+        self.assertIsNone(parent_key(key, {}))
+        # a rank falling back to itself has no parent
+        self.assertIsNone(
+            parent_key(("Quercus robur", "species"), {"species": "species"})
+        )
+
+    def test_parse_rank_parents(self):
+        """Test the rank hierarchy setting is read back."""
+        self.assertEqual(
+            parse_rank_parents(format_rank_parents(RANK_PARENTS)), RANK_PARENTS
+        )
+        self.assertEqual(
+            parse_rank_parents(" Subspecies > species,, variety>species "),
+            {"subspecies": "species", "variety": "species"},
+        )
+        self.assertEqual(parse_rank_parents(""), {})
+        with self.assertRaises(ValueError):
+            parse_rank_parents("subspecies species")
+        # the name of a family cannot be read from the name of a genus
+        with self.assertRaises(ValueError):
+            parse_rank_parents("species>genus, genus>family")
+
+
+# ############################################################################
+# ####### Stand-alone run ########
+# ################################
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+#! python3  # noqa E265
+
+"""
+    Usage from the repo root folder:
+
+    .. code-block:: bash
+        # for whole tests
+        python -m unittest tests.unit.test_core_resolution
+        # for specific test
+        python -m unittest tests.unit.test_core_resolution.TestResolution.test_fallback
+"""
+
+# standard library
+import unittest
+
+# project
+from taxref_collector.core.cache import LruCache
+from taxref_collector.core.ranks import RANK_PARENTS
+from taxref_collector.core.resolution import ClbKeySource, KeyResolution
+
+# ############################################################################
+# ########## Classes #############
+# ################################
+
+
+class TestResolution(unittest.TestCase):
+
+    """Test the keys of a run, whatever sends their requests"""
+
+    def setUp(self):
+        self.fetched = []
+        self.written = []
+
+    def resolution(self, source) -> KeyResolution:
+        return KeyResolution(
+            source,
+            fetch=self.fetched.append,
+            write=lambda targets, result: self.written.append((targets, result)),
+        )
+
+    def test_attach(self):
+        """Test a key is fetched once and written to all of its targets, cached \
+        keys without request."""
+        cache = LruCache()
+        cache.put("clb", "Abies alba|species", "95442", "Abies alba Mill., 1768")
+        resolution = self.resolution(ClbKeySource(cache=cache))
+        robur = ("Quercus robur", "species")
+        alba = ("Abies alba", "species")
+        resolution.attach([(robur, 1), (alba, 2), (robur, 3)])
+        self.assertEqual(self.fetched, [robur])
+        self.assertEqual(self.written, [([2], ("95442", "Abies alba Mill., 1768"))])
+
+        resolution.set_result(robur, ("116744", "Quercus robur L., 1753"))
+        # a target met after the answer
+        resolution.attach([(robur, 4)])
+        self.assertEqual(
+            self.written[1:],
+            [
+                ([1, 3], ("116744", "Quercus robur L., 1753")),
+                ([4], ("116744", "Quercus robur L., 1753")),
+            ],
+        )
+        self.assertEqual(cache.get("clb", "Quercus robur|species")[0], "116744")
+        self.assertEqual((resolution.done, len(resolution)), (2, 2))
+        self.assertEqual(resolution.hit_ratio, 0.5)
+
+    def test_fallback(self):
+        """Test a key without match hands its targets over to its parent, which \
+        is fetched once."""
+        resolution = self.resolution(ClbKeySource(rank_parents=RANK_PARENTS))
+        pedunculata = ("Quercus robur pedunculata", "subspecies")
+        brutia = ("Quercus robur brutia", "subspecies")
+        robur = ("Quercus robur", "species")
+        resolution.attach([(pedunculata, 1), (brutia, 2)])
+        resolution.set_result(pedunculata, None)
+        resolution.set_result(brutia, None)
+        self.assertEqual(self.fetched, [pedunculata, brutia, robur])
+
+        resolution.set_result(robur, ("116744", "Quercus robur L., 1753"))
+        self.assertEqual(self.written, [([1, 2], ("116744", "Quercus robur L., 1753"))])
+        self.assertEqual(resolution.final_key(brutia), robur)
+        self.assertEqual(resolution.result(brutia)[0], "116744")
+
+    def test_failed(self):
+        """Test failed and unanswered keys are neither written nor cached."""
+        cache = LruCache()
+        resolution = self.resolution(ClbKeySource(cache=cache))
+        keys = [("Quercus", "genus"), ("Abies", "genus"), ("Fagus", "genus")]
+        resolution.attach((key, index) for index, key in enumerate(keys))
+        self.assertTrue(resolution.set_failed(keys[0]))
+        self.assertFalse(resolution.set_failed(keys[0]))
+        resolution.set_result(keys[1], None)
+        self.assertEqual(resolution.finish(), 1)
+
+        self.assertEqual(self.written, [([1], None)])
+        self.assertEqual(resolution.jobs.failed, 2)
+        self.assertIsNone(cache.get("clb", "Quercus|genus"))
+        self.assertIsNone(cache.get("clb", "Abies|genus").cd_nom)
+
+
+# ############################################################################
+# ####### Stand-alone run ########
+# ################################
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,228 @@
+#! python3  # noqa E265
+
+"""
+    Usage from the repo root folder:
+
+    .. code-block:: bash
+        # for whole tests
+        python -m unittest tests.unit.test_core_resolver
+        # for specific test
+        python -m unittest tests.unit.test_core_resolver.TestResolver.test_gbif
+"""
+
+# standard library
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# project
+from taxref_collector.core.cache import LruCache
+from taxref_collector.core.ranks import RANK_PARENTS
+from taxref_collector.core.resolver import ClbResolver, GbifResolver
+
+# ############################################################################
+# ########## Globals #############
+# ################################
+
+ROBUR = {
+    "taxonID": "116744",
+    "scientificName": "Quercus robur L., 1753",
+    "taxonomicStatus": "ACCEPTED",
+}
+PEDUNCULATA = {
+    "taxonID": "116745",
+    "scientificName": "Quercus pedunculata Ehrh.",
+    "taxonomicStatus": "SYNONYM",
+}
+
+# GBIF id -> pages of related TAXREF usages
+RELATED = {"1": [[ROBUR]], "2": [[PEDUNCULATA], [ROBUR]], "3": [[]]}
+
+# ############################################################################
+# ########## Classes #############
+# ################################
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        self.server.paths.append(parts.path)
+        if self.server.unavailable:
+            self.server.unavailable -= 1
+            self.reply(503, b"", {"Retry-After": "0"})
+            return
+        params = parse_qs(parts.query)
+        if parts.path.endswith("/related"):
+            pages = RELATED[parts.path.split("/")[-2]]
+            offset = int(params.get("offset", ["0"])[0])
+            index = min(offset, len(pages) - 1)
+            body = {
+                "offset": offset,
+                "endOfRecords": index == len(pages) - 1,
+                "results": pages[index],
+            }
+        else:
+            name = params["q"][0]
+            result = [{"id": "198226", "usage": {"label": name + " L., 1753"}}]
+            body = {"total": 1, "result": result} if name == "Quercus" else {}
+            if name == "Broken":
+                # valid JSON, not the expected structure
+                body = []
+        self.reply(200, json.dumps(body).encode())
+
+    def reply(self, status, body, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeStore:
+    def by_name(self, name, rank):
+        if name == "Quercus robur":
+            return type("Record", (), {"cd_nom": "116744", "label": "Q. robur"})
+        return None
+
+    def nearest(self, name, rank, max_distance=2):
+        if name == "Quercus robir" and max_distance:
+            record = type(
+                "Record",
+                (),
+                {"cd_nom": "116744", "name": "Quercus robur", "label": "Q. robur"},
+            )
+            return record, 1
+        return None
+
+
+class TestResolver(unittest.TestCase):
+
+    """Test resolution of keys without QGIS"""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.paths = []
+        self.server.unavailable = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = "http://127.0.0.1:{}".format(self.server.server_port)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_gbif(self):
+        """Test distinct ids are fetched once, following the related pages."""
+        progress = []
+        resolver = GbifResolver(url=self.url, requests_per_second=0)
+        results = resolver.resolve(
+            [1, 2, None, 3, 1, 2], on_progress=lambda *args: progress.append(args)
+        )
+        self.assertEqual(
+            results,
+            {
+                1: ("116744", "Quercus robur L., 1753"),
+                2: ("116744", "Quercus robur L., 1753"),
+                3: None,
+            },
+        )
+        self.assertEqual(resolver.requests, 4)
+        self.assertEqual(progress[0], (0, 3))
+        self.assertEqual(progress[-1], (3, 3))
+        self.assertEqual(resolver.failed, [])
+
+    def test_retry(self):
+        """Test unavailable responses are retried, then reported as failed."""
+        self.server.unavailable = 2
+        resolver = GbifResolver(url=self.url, requests_per_second=0, workers=1)
+        self.assertEqual(resolver.resolve([3]), {3: None})
+        self.assertEqual(resolver.retries, 2)
+
+        self.server.unavailable = 5
+        resolver = GbifResolver(url=self.url, requests_per_second=0, max_retries=1)
+        self.assertEqual(resolver.resolve([3]), {})
+        self.assertEqual(resolver.failed, [3])
+
+    def test_unreadable_reply(self):
+        """Test a key whose reply cannot be read is reported as failed, the other \
+        keys being resolved."""
+        keys = [("Broken", "genus"), ("Quercus", "genus")]
+        resolver = ClbResolver(url=self.url + "/nameusage/search")
+        self.assertEqual(
+            resolver.resolve(keys), {keys[1]: ("198226", "Quercus L., 1753")}
+        )
+        self.assertEqual(resolver.failed, [keys[0]])
+
+    def test_clb_cache(self):
+        """Test names are read from the store and the cache before the network."""
+        cache = LruCache()
+        resolver = ClbResolver(
+            store=FakeStore(), cache=cache, url=self.url + "/nameusage/search"
+        )
+        keys = [("Quercus robur", "species"), ("Quercus", "genus"), ("Abies", "genus")]
+        self.assertEqual(
+            resolver.resolve(keys),
+            {
+                keys[0]: ("116744", "Q. robur"),
+                keys[1]: ("198226", "Quercus L., 1753"),
+                keys[2]: None,
+            },
+        )
+        self.assertEqual(resolver.requests, 2)
+
+        resolver = ClbResolver(cache=cache, url=self.url + "/nameusage/search")
+        self.assertEqual(resolver.resolve(keys[1:])[keys[1]][0], "198226")
+        self.assertEqual(resolver.requests, 0)
+        self.assertEqual(len(self.server.paths), 2)
+
+    def test_clb_approximate(self):
+        """Test misspelled names are matched by the store, without request."""
+        key = ("Quercus robir", "species")
+        resolver = ClbResolver(store=FakeStore(), url=self.url + "/nameusage/search")
+        self.assertEqual(resolver.resolve([key]), {key: ("116744", "Q. robur")})
+        self.assertEqual(resolver.approximate, {key: ("Quercus robur", 1)})
+        self.assertEqual(resolver.requests, 0)
+
+        resolver.source.max_distance = 0
+        self.assertEqual(resolver.resolve([key]), {key: None})
+        self.assertEqual(resolver.approximate, {})
+        self.assertEqual(resolver.requests, 1)
+
+    def test_clb_rank_fallback(self):
+        """Test names without match take the result of their parent, each parent \
+        being requested once."""
+        keys = [
+            ("Quercus robur pedunculata", "subspecies"),
+            ("Quercus robur brutia", "subspecies"),
+            ("Quercus petraea", "species"),
+        ]
+        resolver = ClbResolver(
+            url=self.url + "/nameusage/search", rank_parents=RANK_PARENTS
+        )
+        genus = ("Quercus", "genus")
+        self.assertEqual(
+            resolver.resolve(keys),
+            {key: ("198226", "Quercus L., 1753") for key in keys},
+        )
+        # 3 keys, then ("Quercus robur", "species") and ("Quercus", "genus")
+        self.assertEqual(resolver.requests, 5)
+        self.assertEqual(resolver.fallbacks, dict.fromkeys(keys, genus))
+        self.assertEqual(resolver.failed, [])
+
+        resolver = ClbResolver(url=self.url + "/nameusage/search")
+        self.assertEqual(resolver.resolve(keys), dict.fromkeys(keys))
+        self.assertEqual(resolver.fallbacks, {})
+
+
+# ############################################################################
+# ####### Stand-alone run ########
+# ################################
+if __name__ == "__main__":
+    unittest.main()
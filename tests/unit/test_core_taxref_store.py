@@ -0,0 +1,135 @@
+#! python3  # noqa E265
+
+"""
+    Usage from the repo root folder:
+
+    .. code-block:: bash
+        # for whole tests
+        python -m unittest tests.unit.test_core_taxref_store
+        # for specific test
+        python -m unittest tests.unit.test_core_taxref_store.TestTaxrefStore.test_by_name
+"""
+
+# standard library
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+# project
+from taxref_collector.core.taxref_store import TaxrefStore
+
+# ############################################################################
+# ########## Globals #############
+# ################################
+
+TAXREF_TXT = (
+    "REGNE\tFAMILLE\tCD_NOM\tCD_TAXSUP\tCD_REF\tRANG\tLB_NOM\tLB_AUTEUR\tNOM_COMPLET\n"
+    "Plantae\tFagaceae\t116744\t198226\t116744\tES\tQuercus robur\tL., 1753"
+    "\tQuercus robur L., 1753\n"
+    "Plantae\tFagaceae\t116745\t198226\t116744\tES\tQuercus pedunculata\tEhrh."
+    "\tQuercus pedunculata Ehrh.\n"
+    "Plantae\tFagaceae\t198226\t187367\t198226\tGN\tQuercus\tL., 1753"
+    "\tQuercus L., 1753\n"
+)
+
+COLDP_TSV = (
+    "col:ID\tcol:parentID\tcol:status\tcol:rank\tcol:scientificName\tcol:authorship\n"
+    "116744\t198226\taccepted\tspecies\tQuercus robur\tL., 1753\n"
+    "116745\t116744\tsynonym\tspecies\tQuercus pedunculata\tEhrh.\n"
+)
+
+NEAR_NAMES_TXT = (
+    "CD_NOM\tCD_REF\tRANG\tLB_NOM\tNOM_COMPLET\n"
+    "116744\t116744\tES\tQuercus robur\tQuercus robur L., 1753\n"
+    "116745\t116744\tES\tQuercus pedunculata\tQuercus pedunculata Ehrh.\n"
+    "116759\t116759\tES\tQuercus rubra\tQuercus rubra L., 1753\n"
+    "115813\t115813\tES\tFagus sylvatica\tFagus sylvatica L., 1753\n"
+    "124080\t124080\tES\tRosa canina\tRosa canina L., 1753\n"
+    "124081\t124081\tES\tRosa carina\tRosa carina L.\n"
+)
+
+# ############################################################################
+# ########## Classes #############
+# ################################
+
+
+class TestTaxrefStore(unittest.TestCase):
+
+    """Test local TAXREF release"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = TaxrefStore(":memory:")
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp_dir.cleanup()
+
+    def test_by_name(self):
+        """Test lookup of accepted names from a zipped TAXREFvXX.txt."""
+        archive_path = Path(self.tmp_dir.name) / "TAXREF_v17.zip"
+        with zipfile.ZipFile(archive_path, "w") as archive:
+            archive.writestr("TAXREFv17.txt", TAXREF_TXT)
+        self.assertTrue(self.store.is_empty())
+        self.assertEqual(self.store.import_release(archive_path), 3)
+        self.assertEqual(self.store.release, "TAXREF_v17.zip")
+
+        record = self.store.by_name("quercus  robur", "species")
+        self.assertEqual(record.cd_nom, "116744")
+        self.assertEqual(record.label, "Quercus robur L., 1753")
+        self.assertEqual(self.store.by_name("Quercus", "genus").cd_nom, "198226")
+        # synonyms are not accepted names
+        self.assertIsNone(self.store.by_name("Quercus pedunculata", "species"))
+        self.assertIsNone(self.store.by_name("Quercus robur", "genus"))
+
+    def test_by_cd_nom(self):
+        """Test lookup by TAXREF id from a ColDP export."""
+        table_path = Path(self.tmp_dir.name) / "NameUsage.tsv"
+        table_path.write_text(COLDP_TSV, encoding="utf-8")
+        self.assertEqual(self.store.import_release(table_path), 2)
+
+        record = self.store.by_cd_nom(116745)
+        self.assertEqual(record.cd_ref, "116744")
+        self.assertFalse(record.accepted)
+        self.assertIsNone(self.store.by_cd_nom(1))
+
+    def test_nearest(self):
+        """Test misspelled names are matched to the nearest accepted name."""
+        table_path = Path(self.tmp_dir.name) / "TAXREFv17.txt"
+        table_path.write_text(NEAR_NAMES_TXT, encoding="utf-8")
+        self.store.import_release(table_path)
+
+        record, distance = self.store.nearest("Quercus robir", "species")
+        self.assertEqual((record.cd_nom, distance), ("116744", 1))
+        # swapped letters, in every word
+        record, distance = self.store.nearest("qeurcus rbour", "species")
+        self.assertEqual((record.cd_nom, distance), ("116744", 2))
+        record, distance = self.store.nearest("Fagus silvatica", "species")
+        self.assertEqual((record.label, distance), ("Fagus sylvatica L., 1753", 1))
+
+        # known names, synonyms included, are not matched
+        self.assertIsNone(self.store.nearest("Quercus robur", "species"))
+        self.assertIsNone(self.store.nearest("Quercus pedunculata", "species"))
+        # too far, at another rank, or as near of two names
+        self.assertIsNone(self.store.nearest("Quercus robir", "species", 0))
+        self.assertIsNone(self.store.nearest("Qeurcus rbour", "species", 1))
+        # two edits in a single word
+        self.assertIsNone(self.store.nearest("Quercus rxbxr", "species"))
+        self.assertIsNone(self.store.nearest("Fagus silvatca", "species", 4))
+        self.assertIsNone(self.store.nearest("Quercus robir", "genus"))
+        self.assertIsNone(self.store.nearest("Rosa cauina", "species"))
+
+    def test_unknown_table(self):
+        """Test an unknown file is rejected."""
+        table_path = Path(self.tmp_dir.name) / "other.txt"
+        table_path.write_text("a\tb\n1\t2\n", encoding="utf-8")
+        with self.assertRaises(ValueError):
+            self.store.import_release(table_path)
+
+
+# ############################################################################
+# ####### Stand-alone run ########
+# ################################
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,183 @@
+#! python3  # noqa E265
+
+"""
+    Usage from the repo root folder:
+
+    .. code-block:: bash
+        # for whole tests
+        python -m unittest tests.unit.test_core_throttle
+        # for specific test
+        python -m unittest tests.unit.test_core_throttle.TestThrottle.test_token_bucket
+"""
+
+# standard library
+import unittest
+
+# project
+from taxref_collector.core.throttle import (
+    AimdController,
+    CircuitBreaker,
+    TokenBucket,
+    backoff_delay,
+    parse_retry_after,
+    retry_delay,
+)
+
+# ############################################################################
+# ########## Classes #############
+# ################################
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestThrottle(unittest.TestCase):
+
+    """Test rate limiting and retry policies"""
+
+    def test_backoff_delay(self):
+        """Test the backoff bound doubles up to the cap."""
+        self.assertEqual(backoff_delay(0, rand=lambda: 1), 1)
+        self.assertEqual(backoff_delay(3, rand=lambda: 1), 8)
+        self.assertEqual(backoff_delay(10, rand=lambda: 1), 60)
+        self.assertEqual(backoff_delay(10, rand=lambda: 0), 0)
+        for attempt in range(8):
+            self.assertLessEqual(backoff_delay(attempt, base=0.5, cap=10), 10)
+
+    def test_parse_retry_after(self):
+        """Test Retry-After in seconds and as an HTTP date."""
+        self.assertEqual(parse_retry_after("120"), 120)
+        self.assertEqual(parse_retry_after(b" 5 "), 5)
+        self.assertEqual(
+            parse_retry_after("Wed, 21 Oct 2015 07:28:30 GMT", now=1445412480), 30
+        )
+        self.assertEqual(
+            parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT", now=1445412500), 0
+        )
+        self.assertIsNone(parse_retry_after(""))
+        self.assertIsNone(parse_retry_after(b""))
+        self.assertIsNone(parse_retry_after("soon"))
+
+    def test_retry_delay(self):
+        """Test the delay asked by the service comes first, up to max_retries."""
+        self.assertEqual(retry_delay(0, 3, retry_after=5), 5)
+        self.assertLessEqual(retry_delay(2, 3), 4)
+        self.assertIsNone(retry_delay(3, 3, retry_after=5))
+        self.assertIsNone(retry_delay(0, 0))
+
+    def test_token_bucket(self):
+        """Test the sustained rate and the burst of a token bucket."""
+        clock = Clock()
+        bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+        self.assertTrue(bucket.take())
+        self.assertTrue(bucket.take())
+        self.assertFalse(bucket.take())
+        self.assertAlmostEqual(bucket.wait_time(), 0.5)
+
+        clock.now = 0.5
+        self.assertEqual(bucket.wait_time(), 0)
+        self.assertTrue(bucket.take())
+        self.assertFalse(bucket.take())
+
+        # no more tokens than the capacity after a long pause
+        clock.now = 100
+        taken = 0
+        while bucket.take():
+            taken += 1
+        self.assertEqual(taken, 2)
+
+        unlimited = TokenBucket(rate=0, clock=clock)
+        self.assertTrue(all(unlimited.take() for _ in range(1000)))
+        self.assertEqual(unlimited.wait_time(), 0)
+
+    def test_circuit_breaker(self):
+        """Test a circuit opens, allows one trial and closes on success."""
+        clock = Clock()
+        breaker = CircuitBreaker(threshold=3, cooldown=10, clock=clock)
+        self.assertFalse(breaker.record_failure())
+        self.assertFalse(breaker.record_failure())
+        self.assertTrue(breaker.allow())
+        self.assertTrue(breaker.record_failure())
+        self.assertTrue(breaker.is_open)
+        self.assertFalse(breaker.allow())
+        self.assertEqual(breaker.retry_in(), 10)
+
+        # a single trial once the pause is over, its failure opens it again
+        clock.now = 10
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        self.assertTrue(breaker.record_failure())
+        self.assertEqual(breaker.trips, 2)
+        self.assertFalse(breaker.allow())
+
+        clock.now = 20
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertFalse(breaker.is_open)
+        self.assertEqual(breaker.trips, 0)
+        self.assertTrue(breaker.allow())
+        self.assertTrue(breaker.allow())
+
+    def test_aimd_controller(self):
+        """Test the window grows with fast replies and halves on congestion."""
+        clock = Clock()
+        controller = AimdController(initial=2, maximum=6, clock=clock)
+        for _ in range(20):
+            controller.on_reply(0.1)
+        self.assertEqual(controller.limit, 6)
+        self.assertAlmostEqual(controller.baseline, 0.1)
+
+        # a burst of failures only halves the window once
+        self.assertTrue(controller.on_reply(0.1, failed=True))
+        self.assertFalse(controller.on_reply(0.1, failed=True))
+        self.assertEqual(controller.limit, 3)
+        self.assertAlmostEqual(controller.error_rate, 2 / 22)
+
+        # slow replies are seen as congestion
+        clock.now = 1
+        for _ in range(10):
+            clock.now += 1
+            controller.on_reply(1.0)
+        self.assertEqual(controller.limit, 1)
+
+        # the window never goes under the minimum
+        clock.now += 10
+        controller.on_reply(0.1, failed=True)
+        self.assertEqual(controller.limit, 1)
+        self.assertEqual(controller.window, 1)
+
+    def test_aimd_error_window(self):
+        """Test the error rate follows the last replies and stops the growth."""
+        clock = Clock()
+        controller = AimdController(
+            initial=2, maximum=6, error_window=10, max_error_rate=0.2, clock=clock
+        )
+        for _ in range(200):
+            controller.on_reply(0.1)
+        # late failures weigh on the last replies only
+        for _ in range(3):
+            clock.now += 1
+            controller.on_reply(0.1, failed=True)
+        self.assertAlmostEqual(controller.error_rate, 0.3)
+        self.assertEqual(controller.limit, 1)
+        for _ in range(7):
+            controller.on_reply(0.1)
+        self.assertEqual(controller.limit, 1)
+
+        # the window grows again once the failures left the window
+        for _ in range(10):
+            controller.on_reply(0.1)
+        self.assertEqual(controller.error_rate, 0)
+        self.assertGreater(controller.window, 1)
+
+
+# ############################################################################
+# ####### Stand-alone run ########
+# ################################
+if __name__ == "__main__":
+    unittest.main()